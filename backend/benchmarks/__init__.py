@@ -0,0 +1,5 @@
+"""
+Benchmarks for the Airtel RAG Agent backend.
+
+Run from the backend directory, e.g. `python -m benchmarks.ws_vs_sse`.
+"""
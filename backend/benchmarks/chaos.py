@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Chaos scenarios: goodput, tail latency and fallback rate under injected faults.
+
+Each scenario is a FAULTS specification (see src/agent/faults.py), and each
+policy a retry setting of the agent (LLM_MAX_RETRIES,
+LLM_RETRY_BACKOFF_SECONDS). For every scenario and policy a server is
+started from this tree with the fake LLM and hashing embeddings, so the
+baseline latency is fixed and no API key is needed, and driven with an
+open-loop load at `--rate` for `--duration` seconds.
+
+Reported per run:
+
+    goodput_rps    answers that are neither errors nor fallbacks, received
+                   within `--slo-seconds`, per second of load
+    fallback_rate  answers replaced by the apology message (the LLM failed
+                   after its retries), out of the requests sent
+    degraded       answers given without knowledge-base context (the
+                   retrieval failed), from the server's error counters
+    latency_ms     client-side latency ladder of the answered requests, and
+                   the time to the first token of streams
+    faults         faults the server injected, by upstream and kind
+
+Built-in scenarios: baseline, llm_429, llm_timeouts, llm_spikes,
+stream_drops, embedding_429 and mixed; `--scenario name=spec` adds others.
+
+Usage:
+    python -m benchmarks.chaos --rate 4 --duration 60
+    python -m benchmarks.chaos --scenarios baseline llm_429 --policy retries=1,backoff=0.5 --policy retries=3,backoff=1
+    python -m benchmarks.chaos --scenario "slow_llm=llm:spike=0.3@8" --slo-seconds 5 --output chaos.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from typing import Any, Dict, List
+
+import aiohttp
+
+from benchmarks.load_test import QUERIES, git_commit, percentile_ladder
+from benchmarks.replay import start_server, stop_server
+
+# Same text as src.agent.rag_agent.FALLBACK_RESPONSE, not imported to keep the agent's dependencies out of the client
+FALLBACK_RESPONSE = "I'm experiencing technical difficulties. Please try again in a moment"
+
+SCENARIOS = {
+    "baseline": "",
+    "llm_429": "llm:rate_limit=0.1",
+    "llm_timeouts": "llm:timeout=0.05@5",
+    "llm_spikes": "llm:spike=0.1@3",
+    "stream_drops": "llm:drop=0.1",
+    "embedding_429": "embedding:rate_limit=0.1",
+    "mixed": "llm:rate_limit=0.05,timeout=0.02@5,spike=0.05@3,drop=0.05;embedding:rate_limit=0.05",
+}
+
+
+def parse_policy(text: str) -> Dict[str, float]:
+    """
+    Parse a retry policy.
+
+    Args:
+        text: "retries=N,backoff=SECONDS" (either may be omitted)
+
+    Returns:
+        The policy, with the agent's defaults for missing values
+
+    Raises:
+        ValueError: On an unknown key
+    """
+    policy = {"retries": 3, "backoff": 1.0}
+    for entry in filter(None, (part.strip() for part in text.split(","))):
+        key, _, value = entry.partition("=")
+        if key not in policy:
+            raise ValueError(f"Unknown policy setting: {key}")
+        policy[key] = int(value) if key == "retries" else float(value)
+    return policy
+
+
+class ChaosRun:
+    """Open-loop load on one server, classifying every answer."""
+
+    def __init__(self, args: argparse.Namespace, url: str):
+        self.args = args
+        self.url = url
+        self.run_id = uuid.uuid4().hex[:8]
+        self.rng = random.Random(args.seed)
+        self.timeout = aiohttp.ClientTimeout(total=args.timeout)
+        self.latencies: List[float] = []
+        self.ttft: List[float] = []
+        self.errors: Counter = Counter()
+        self.sent = 0
+        self.fallbacks = 0
+        self.within_slo = 0
+
+    async def request(self, client: aiohttp.ClientSession, index: int, scheduled: float) -> None:
+        route = "/chat/stream" if self.rng.random() < self.args.stream_ratio else "/chat"
+        # A few turns per session, so the history grows as in real traffic
+        payload = {"session_id": f"chaos-{self.run_id}-{index // 4}", "message": QUERIES[index % len(QUERIES)]}
+        error = None
+        first_token = None
+        body = b""
+        try:
+            async with client.post(self.url + route, json=payload, timeout=self.timeout) as response:
+                if response.status != 200:
+                    error = f"http_{response.status}"
+                    await response.read()
+                elif route == "/chat":
+                    body = await response.read()
+                else:
+                    done = False
+                    async for line in response.content:
+                        if line.startswith(b"event: error"):
+                            error = "stream_error"
+                        elif line.startswith(b"data: [DONE]"):
+                            done = True
+                            break
+                        elif line.startswith(b"data:"):
+                            if first_token is None:
+                                first_token = time.perf_counter()
+                            body += line
+                    if not done and error is None:
+                        error = "stream_incomplete"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as e:
+            error = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        if error is not None:
+            self.errors[error] += 1
+            return
+        self.latencies.append(latency)
+        if first_token is not None:
+            self.ttft.append(first_token - scheduled)
+        # JSON escapes the apostrophe neither in /chat bodies nor in SSE data
+        if FALLBACK_RESPONSE.encode() in body:
+            self.fallbacks += 1
+        elif latency <= self.args.slo_seconds:
+            self.within_slo += 1
+
+    async def run(self) -> float:
+        tasks = []
+        connector = aiohttp.TCPConnector(limit=self.args.connections)
+        async with aiohttp.ClientSession(connector=connector) as client:
+            start = time.perf_counter()
+            index = 0
+            while index < self.args.rate * self.args.duration:
+                scheduled = start + index / self.args.rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self.request(client, index, scheduled)))
+                index += 1
+            self.sent = index
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - start
+
+
+def server_counters(url: str) -> Dict[str, Dict[str, float]]:
+    """Counters of the server (faults injected, errors), from /performance."""
+    with urllib.request.urlopen(f"{url}/performance", timeout=10) as response:
+        return json.load(response).get("counters", {})
+
+
+def run_scenario(args: argparse.Namespace, name: str, spec: str, policy: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Run one scenario under one retry policy on a fresh server.
+
+    Returns:
+        The report of the run
+    """
+    directory = tempfile.mkdtemp(prefix="chaos-")
+    server = start_server(args.port, {
+        "FAKE_LLM_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "FAULTS": spec,
+        "FAULTS_SEED": str(args.seed),
+        "LLM_MAX_RETRIES": str(policy["retries"]),
+        "LLM_RETRY_BACKOFF_SECONDS": str(policy["backoff"]),
+        # Cached results would hide the retrieval faults
+        "RAG_CACHE_ENABLED": "false",
+    }, directory)
+    url = f"http://127.0.0.1:{args.port}"
+    chaos = ChaosRun(args, url)
+    try:
+        elapsed = asyncio.run(chaos.run())
+        counters = server_counters(url)
+    finally:
+        stop_server(server)
+
+    errors_total = Counter()
+    for labels, value in counters.get("errors_total", {}).items():
+        errors_total[dict(label.split("=", 1) for label in labels.split(","))["type"]] += value
+    return {
+        "scenario": name,
+        "faults_spec": spec,
+        "policy": policy,
+        "duration_seconds": round(elapsed, 1),
+        "requests": chaos.sent,
+        "answered": len(chaos.latencies),
+        "errors": dict(chaos.errors),
+        "goodput_rps": round(chaos.within_slo / args.duration, 3),
+        "fallback_rate": round(chaos.fallbacks / chaos.sent, 4) if chaos.sent else 0.0,
+        "degraded": int(errors_total.get("retrieval", 0)),
+        "latency_ms": percentile_ladder(chaos.latencies),
+        "ttft_ms": percentile_ladder(chaos.ttft),
+        "faults": counters.get("faults_injected_total", {}),
+        "server_errors": dict(errors_total),
+    }
+
+
+def print_summary(runs: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<16}{'policy':<20}{'goodput/s':>10}{'fallback':>10}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}",
+          file=sys.stderr)
+    for run in runs:
+        policy = f"retries={run['policy']['retries']},backoff={run['policy']['backoff']:g}"
+        print(f"{run['scenario']:<16}{policy:<20}{run['goodput_rps']:>10.2f}{run['fallback_rate']:>10.1%}"
+              f"{sum(run['errors'].values()):>8}{run['latency_ms'].get('p50') or 0:>10.0f}"
+              f"{run['latency_ms'].get('p99') or 0:>10.0f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Goodput, tail latency and fallback rate under injected faults.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS),
+                        help=f"Built-in scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--scenario", action="append", default=[], metavar="NAME=SPEC",
+                        help="Extra scenario as a FAULTS specification (repeatable)")
+    parser.add_argument("--policy", action="append", default=[], metavar="retries=N,backoff=S",
+                        help="Retry policy to compare (repeatable; default: retries=3,backoff=1)")
+    parser.add_argument("--rate", type=float, default=4.0, help="Requests per second (default: 4)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load per run (default: 30)")
+    parser.add_argument("--stream-ratio", type=float, default=0.5,
+                        help="Fraction of requests sent to /chat/stream (default: 0.5)")
+    parser.add_argument("--slo-seconds", type=float, default=10.0,
+                        help="Latency within which an answer counts as goodput (default: 10)")
+    parser.add_argument("--first-token-ms", type=float, default=300, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="Fake LLM streaming rate")
+    parser.add_argument("--port", type=int, default=8012, help="Port of the test servers (default: 8012)")
+    parser.add_argument("--connections", type=int, default=100, help="Connection pool size (default: 100)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout in seconds (default: 120)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the faults and of the route mix")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    scenarios = {}
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"Unknown scenario: {name}")
+        scenarios[name] = SCENARIOS[name]
+    for entry in args.scenario:
+        name, _, spec = entry.partition("=")
+        scenarios[name] = spec
+    try:
+        policies = [parse_policy(text) for text in args.policy] or [parse_policy("")]
+        from src.agent.faults import parse_faults
+        for spec in scenarios.values():
+            parse_faults(spec)
+    except ValueError as e:
+        parser.error(str(e))
+
+    runs = []
+    for name, spec in scenarios.items():
+        for policy in policies:
+            print(f"Running {name} with {policy}...", file=sys.stderr)
+            runs.append(run_scenario(args, name, spec, policy))
+    print_summary(runs)
+
+    report = {"git_commit": git_commit(), "config": {key: value for key, value in vars(args).items()
+                                                      if key not in ("output", "scenario", "policy")},
+              "runs": runs}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
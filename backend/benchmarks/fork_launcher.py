@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Startup time and per-worker memory of serve.py in spawn versus fork mode.
+
+The workers serve the real FastAPI app with a stub preload that stands in
+for the index: a flat FAISS index of `--vectors` embeddings plus the chunk
+texts, built in `--build-seconds` or more. In spawn mode every worker
+builds its own copy; in fork mode the master builds it once and the
+workers inherit it copy-on-write. Startup is measured until every worker
+has answered; memory is read from /proc/<pid>/smaps_rollup, where PSS
+splits shared pages between the processes that map them and USS
+(private pages) is what each extra worker really costs.
+
+Usage:
+    python -m benchmarks.fork_launcher --workers 4 --vectors 100000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.worker_scaling import free_port
+
+
+class StubIndexAgent:
+    """Agent double holding an index the size of a real deployment's."""
+
+    def __init__(self, vectors: int, dimension: int, build_seconds: float):
+        import faiss
+        import numpy as np
+
+        start = time.time()
+        rng = np.random.default_rng(0)
+        self.index = faiss.IndexFlatIP(dimension)
+        self.index.add(rng.random((vectors, dimension), dtype=np.float32))
+        self.chunks = [f"chunk {i} " + "x" * 200 for i in range(vectors)]
+        # Stands in for embedding API calls and document parsing
+        time.sleep(max(0.0, build_seconds - (time.time() - start)))
+
+
+def create_app():
+    """App factory used by the workers: the real app with the stub index."""
+    from src.api import main as api
+
+    vectors = int(os.environ.get("BENCH_VECTORS", 100000))
+    dimension = int(os.environ.get("BENCH_DIMENSION", 384))
+    build_seconds = float(os.environ.get("BENCH_BUILD_SECONDS", 2))
+    api.preload_documents = lambda: StubIndexAgent(vectors, dimension, build_seconds)
+
+    @api.app.get("/_pid", include_in_schema=False)
+    async def worker_pid():
+        return {"pid": os.getpid(), "ready": api.warmup.ready}
+
+    return api.app
+
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": round(fields["Rss"] / 1024, 1),
+        "pss_mb": round(fields["Pss"] / 1024, 1),
+        "uss_mb": round((fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, 1),
+    }
+
+
+async def wait_all_workers(base_url: str, process: subprocess.Popen, workers: int,
+                           timeout: float = 600.0) -> set:
+    deadline = time.monotonic() + timeout
+    pids = set()
+    async with aiohttp.ClientSession() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                # Fresh connections so the kernel spreads them over the workers
+                async with client.get(base_url + "/_pid", headers={"Connection": "close"}) as response:
+                    body = await response.json()
+                    # A worker counts once its background warm-up has finished
+                    if response.status == 200 and body["ready"]:
+                        pids.add(body["pid"])
+                        if len(pids) == workers:
+                            return pids
+                        continue
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.05)
+    raise RuntimeError("workers did not start in time")
+
+
+def run(mode: str, args) -> dict:
+    port = free_port()
+    state_dir = tempfile.mkdtemp(prefix="fork-launcher-")
+    env = {
+        **os.environ,
+        "SHARED_STATE_URL": f"sqlite:///{os.path.join(state_dir, 'state.db')}",
+        "BENCH_VECTORS": str(args.vectors),
+        "BENCH_DIMENSION": str(args.dimension),
+        "BENCH_BUILD_SECONDS": str(args.build_seconds),
+    }
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--mode", mode, "--workers", str(args.workers), "--host", "127.0.0.1",
+         "--port", str(port), "--app", "benchmarks.fork_launcher:create_app", "--factory"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pids = asyncio.run(wait_all_workers(f"http://127.0.0.1:{port}", process, args.workers))
+        startup = time.perf_counter() - start
+        workers = [memory_kb(pid) for pid in sorted(pids)]
+        master = memory_kb(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    def total(key):
+        return round(sum(worker[key] for worker in workers) + master[key], 1)
+
+    return {
+        "mode": mode,
+        "startup_seconds": round(startup, 2),
+        "master": master,
+        "workers": workers,
+        "total_pss_mb": total("pss_mb"),
+        "total_uss_mb": total("uss_mb"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spawn versus fork-after-load launcher.")
+    parser.add_argument("--workers", type=int, default=4, help="Worker count (default: 4)")
+    parser.add_argument("--vectors", type=int, default=100000, help="Index size (default: 100000)")
+    parser.add_argument("--dimension", type=int, default=384, help="Embedding dimension (default: 384)")
+    parser.add_argument("--build-seconds", type=float, default=2,
+                        help="Minimum time to build the index (default: 2)")
+    parser.add_argument("--modes", nargs="+", default=["spawn", "fork"], choices=["spawn", "fork"])
+    args = parser.parse_args()
+
+    report = {"cpus": os.cpu_count(), "vectors": args.vectors, "dimension": args.dimension,
+              "results": [run(mode, args) for mode in args.modes]}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+In-process harness: the real API and agent with a fake LLM, timed per stage.
+
+Runs the FastAPI app in this process (TestClient, with its lifespan and
+warm-up) around the real agent, built on hashing embeddings and the fake
+chat model, so no API key or network is needed and the LLM's latency is
+known. Every request is traced (spans kept in memory), which gives the
+duration of each pipeline stage; the LLM's own time is subtracted to get
+our overhead per request, for /chat and /chat/stream. Each session runs
+`--turns` turns, so the history grows as in real use.
+
+With `--max-overhead-ms`, exits with status 1 when the median overhead of
+an endpoint exceeds it, to catch regressions in CI.
+
+Usage:
+    python -m benchmarks.harness --requests 200
+    python -m benchmarks.harness --first-token-ms 300 --tokens-per-second 50 --max-overhead-ms 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+os.environ["EMBEDDINGS_BACKEND"] = "hashing"
+os.environ["LLM_BACKEND"] = "fake"
+
+# Stages of the LLM itself, excluded from our overhead
+LLM_SPANS = ("llm_complete",)
+
+
+class CollectingExporter:
+    """Span exporter keeping finished traces in memory."""
+
+    def __init__(self):
+        self.traces = []
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, trace) -> None:
+        self.traces.append(trace)
+        self.exported += 1
+
+    def close(self) -> None:
+        pass
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Count, mean, p50, p90 and p99 of durations in seconds, in milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.mean(ordered) * 1000, 3),
+        "p50": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p90": round(ordered[min(int(len(ordered) * 0.9), len(ordered) - 1)] * 1000, 3),
+        "p99": round(ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1000, 3),
+    }
+
+
+def run_requests(client, endpoint: str, requests: int, turns: int, prefix: str = "harness") -> Dict[str, List[float]]:
+    """Send the requests; returns client-side times (total, and first token for streaming)."""
+    from benchmarks.tracing_overhead import QUERIES
+
+    times = defaultdict(list)
+    for i in range(requests):
+        payload = {"session_id": f"{prefix}-{endpoint.strip('/').replace('/', '-')}-{i // turns}",
+                   "message": QUERIES[i % len(QUERIES)]}
+        start = time.perf_counter()
+        if endpoint == "/chat":
+            response = client.post(endpoint, json=payload)
+            response.raise_for_status()
+        else:
+            first = None
+            with client.stream("POST", endpoint, json=payload) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line.startswith("data:") and first is None:
+                        first = time.perf_counter()
+                    if line.startswith("data: [DONE]"):
+                        break
+            times["first_token"].append(first - start)
+        times["total"].append(time.perf_counter() - start)
+    return times
+
+
+def stage_report(traces) -> Dict[str, Dict]:
+    """Stage durations and our overhead (root span minus LLM time), by route."""
+    report = {}
+    by_route = defaultdict(list)
+    for trace in traces:
+        by_route[trace.root.name].append(trace)
+    for route, route_traces in by_route.items():
+        stages = defaultdict(list)
+        overhead = []
+        for trace in route_traces:
+            llm = 0.0
+            for span in trace.spans:
+                stages[span.name].append(span.duration)
+                if span.name in LLM_SPANS:
+                    llm += span.duration
+            stages["total"].append(trace.root.duration)
+            overhead.append(trace.root.duration - llm)
+        report[route] = {
+            "stages_ms": {name: summarize(samples) for name, samples in sorted(stages.items())},
+            "overhead_ms": summarize(overhead),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage overhead of the API and agent, in process, with a fake LLM.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint (default: 200)")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session (default: 5)")
+    parser.add_argument("--first-token-ms", type=float, default=0.0,
+                        help="Fake LLM first-token latency (default: 0)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Fake LLM token rate, 0 for instant (default: 0)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fake LLM failure rate (default: 0)")
+    parser.add_argument("--max-overhead-ms", type=float, default=None,
+                        help="Fail if the median overhead of an endpoint exceeds this")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    from fastapi.testclient import TestClient
+
+    import src.api.main as api
+    from src.agent.fake_llm import FakeChatModel
+    from src.agent.rag_agent import LangGraphRAGAgent
+    from src.monitoring.tracing import Tracer
+
+    llm = FakeChatModel(first_token_seconds=args.first_token_ms / 1000, tokens_per_second=args.tokens_per_second,
+                        failure_rate=args.failure_rate)
+    agent = LangGraphRAGAgent("src/rag/static_document.txt", checkpointer=api.checkpointer, llm=llm)
+    api.preload_documents = lambda: agent
+    exporter = CollectingExporter()
+
+    client_times = {}
+    with TestClient(api.app) as client:
+        # Warm caches and code paths, untraced
+        run_requests(client, "/chat", 20, args.turns, prefix="warmup")
+        run_requests(client, "/chat/stream", 20, args.turns, prefix="warmup")
+        api.tracer = Tracer(exporter, sample_rate=1.0)
+        for endpoint in ("/chat", "/chat/stream"):
+            times = run_requests(client, endpoint, args.requests, args.turns)
+            client_times[endpoint] = {name: summarize(samples) for name, samples in times.items()}
+
+    report = stage_report(exporter.traces)
+    for endpoint, times in client_times.items():
+        report.setdefault(endpoint, {})["client_ms"] = times
+    result = {
+        "requests_per_endpoint": args.requests,
+        "fake_llm": {"first_token_ms": args.first_token_ms, "tokens_per_second": args.tokens_per_second,
+                     "failure_rate": args.failure_rate},
+        "endpoints": report,
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.max_overhead_ms is not None:
+        over = [endpoint for endpoint, data in report.items()
+                if data.get("overhead_ms", {}).get("p50", 0) > args.max_overhead_ms]
+        if over:
+            print(f"Median overhead above {args.max_overhead_ms} ms on: {', '.join(over)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
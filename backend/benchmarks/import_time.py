@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Import-time report and cold-start budget check for the API module.
+
+Imports the module in fresh interpreters with `python -X importtime`, then
+reports the median cumulative import time, the slowest modules and the
+cost per top-level package. The run fails (exit code 1) when the import
+exceeds `--budget-ms`, or when a module that must stay lazy (the agent's
+LLM clients, faiss, numpy, the LangGraph graph) is imported eagerly again,
+so the check can gate CI or a pre-deploy step.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 800 --runs 5 --top 30
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Imported on first chat request in cold start mode, never by `import src.api.main`
+LAZY_MODULES = ["faiss", "numpy", "langchain_google_genai", "google.genai", "langgraph.graph"]
+
+
+def import_profile(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Import a module in a fresh interpreter.
+
+    Args:
+        module: Dotted module name
+
+    Returns:
+        Mapping of every module imported to its (self, cumulative) time in microseconds
+    """
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def report(module: str, runs: int, top: int) -> dict:
+    profiles = [import_profile(module) for _ in range(runs)]
+    totals = [profile[module][1] for profile in profiles]
+    # Slowest modules and packages of the median run
+    median_profile = profiles[totals.index(sorted(totals)[len(totals) // 2])]
+
+    slowest: List[Tuple[str, int, int]] = sorted(
+        ((name, self_us, cumulative_us) for name, (self_us, cumulative_us) in median_profile.items()),
+        key=lambda item: item[2], reverse=True)[:top]
+    packages = defaultdict(int)
+    for name, (self_us, _) in median_profile.items():
+        packages[name.split(".")[0]] += self_us
+
+    return {
+        "module": module,
+        "runs": runs,
+        "import_ms": round(statistics.median(totals) / 1000, 1),
+        "modules_imported": len(median_profile),
+        "slowest_modules": [{"module": name, "self_ms": round(self_us / 1000, 1),
+                             "cumulative_ms": round(cumulative_us / 1000, 1)}
+                            for name, self_us, cumulative_us in slowest],
+        "packages_ms": {name: round(self_us / 1000, 1) for name, self_us in
+                        sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]},
+        "eager_lazy_modules": [name for name in LAZY_MODULES if name in median_profile],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time report with a cold-start budget.")
+    parser.add_argument("--module", default="src.api.main", help="Module to import (default: src.api.main)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters, median kept (default: 3)")
+    parser.add_argument("--top", type=int, default=15, help="Modules and packages listed (default: 15)")
+    parser.add_argument("--budget-ms", type=float, default=1000,
+                        help="Maximum median import time in ms (default: 1000)")
+    args = parser.parse_args()
+
+    result = report(args.module, args.runs, args.top)
+    result["budget_ms"] = args.budget_ms
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if result["import_ms"] > args.budget_ms:
+        failures.append(f"import {args.module} took {result['import_ms']}ms, budget is {args.budget_ms}ms")
+    if result["eager_lazy_modules"]:
+        failures.append(f"modules meant to load on first use are imported eagerly: "
+                        f"{', '.join(result['eager_lazy_modules'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Load generator for the chat API: open-loop and closed-loop modes.
+
+Closed loop (`--mode closed`): `--users` virtual users each run
+conversations turn after turn, waiting `--think-time` between turns. The
+load adapts to the server, which hides its queueing: use it to find the
+throughput at a given concurrency.
+
+Open loop (`--mode open`): requests arrive at a constant `--rate` per
+second whatever the server does, like real users. Each arrival is a turn
+of an idle virtual user (a new one is created when all are busy), and its
+latency is measured from its scheduled arrival, so time spent waiting for
+an overloaded server is counted (no coordinated omission).
+
+Every virtual user has its own session and starts a new one after
+`--turns` turns, so the history stays realistic instead of growing on a
+shared session. All requests share one connection pool (`--connections`).
+For `/chat/stream`, time to first token (first SSE data event) and to last
+token are measured. The report gives a percentile ladder up to p99.99 per
+endpoint, throughput and an error breakdown, as JSON (stdout or
+`--output`) for comparison across runs.
+
+Usage:
+    python -m benchmarks.load_test --url http://localhost:8000 --mode open --rate 5 --duration 60
+    python -m benchmarks.load_test --mode closed --users 20 --think-time 2 --stream-ratio 1
+    python -m benchmarks.load_test --mode open --rate 10 --duration 120 --warmup 10 --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import aiohttp
+
+QUERIES = [
+    "Bonjour, quels sont vos forfaits internet ?",
+    "Combien coûte un forfait voix de 24h ?",
+    "Comment activer Airtel Money ?",
+    "Quels sont vos forfaits nocturnes ?",
+    "Pouvez-vous me donner les codes d'activation ?",
+    "Comment recharger mon compte ?",
+    "Quels sont vos forfaits mensuels ?",
+    "Comment transférer de l'argent ?",
+    "Quel est le prix des appels vers l'international ?",
+    "Comment contacter le service client ?",
+]
+
+FOLLOW_UPS = [
+    "Et pour le forfait le moins cher ?",
+    "Comment je l'active ?",
+    "Est-ce valable le week-end ?",
+    "Merci, et en roaming ?",
+    "Quelle est la durée de validité ?",
+]
+
+PERCENTILES = (50, 75, 90, 95, 99, 99.9, 99.99)
+
+
+def percentile_ladder(samples: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Exact percentiles of durations, in milliseconds.
+
+    Args:
+        samples: Durations in seconds
+
+    Returns:
+        Count, mean, min, p50 ... p99.99 and max (nearest rank)
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    ladder = {"count": len(ordered), "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+              "min": round(ordered[0] * 1000, 2)}
+    for q in PERCENTILES:
+        rank = max(math.ceil(q / 100 * len(ordered)), 1)
+        ladder[f"p{q:g}"] = round(ordered[rank - 1] * 1000, 2)
+    ladder["max"] = round(ordered[-1] * 1000, 2)
+    return ladder
+
+
+class VirtualUser:
+    """A user holding a session, with a scripted conversation."""
+
+    def __init__(self, user_id: int, run_id: str, turns: int, rng: random.Random):
+        self.user_id = user_id
+        self.run_id = run_id
+        self.turns = turns
+        self.rng = rng
+        self.conversation = 0
+        self.turn = 0
+        self.session_id = ""
+        self._new_session()
+
+    def _new_session(self) -> None:
+        self.session_id = f"load-{self.run_id}-{self.user_id}-{self.conversation}"
+        self.conversation += 1
+        self.turn = 0
+
+    def next_message(self) -> str:
+        """The next message of the conversation, starting a new session after `turns` turns."""
+        if self.turn >= self.turns:
+            self._new_session()
+        self.turn += 1
+        return self.rng.choice(QUERIES if self.turn == 1 else QUERIES + FOLLOW_UPS)
+
+
+class LoadRun:
+    """Sends the requests and collects the results."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.timeout = aiohttp.ClientTimeout(total=args.timeout)
+        # Per endpoint: total latencies, times to first token, statuses
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.ttft: List[float] = []
+        self.errors: Counter = Counter()
+        self.completed = 0
+        self.succeeded = 0
+        self.late_starts = 0
+        self.measure_from = 0.0
+        self.users: List[VirtualUser] = []
+        self.idle_users: List[VirtualUser] = []
+
+    def _new_user(self) -> VirtualUser:
+        user = VirtualUser(len(self.users), self.run_id, self.args.turns, self.rng)
+        self.users.append(user)
+        return user
+
+    def _endpoint(self) -> str:
+        return "/chat/stream" if self.rng.random() < self.args.stream_ratio else "/chat"
+
+    async def request(self, client: aiohttp.ClientSession, user: VirtualUser, scheduled: float) -> None:
+        """One turn of a user; `scheduled` is when it should have started (latency origin)."""
+        endpoint = self._endpoint()
+        payload = {"session_id": user.session_id, "message": user.next_message()}
+        error = None
+        first_token = None
+        try:
+            async with client.post(self.args.url + endpoint, json=payload, timeout=self.timeout) as response:
+                if response.status != 200:
+                    error = f"http_{response.status}"
+                    await response.read()
+                elif endpoint == "/chat":
+                    body = await response.json()
+                    if not body.get("response"):
+                        error = "empty_response"
+                else:
+                    done = False
+                    async for line in response.content:
+                        if line.startswith(b"event: error"):
+                            error = "stream_error"
+                        elif line.startswith(b"data: [DONE]"):
+                            done = True
+                            break
+                        elif line.startswith(b"data:") and first_token is None:
+                            first_token = time.perf_counter()
+                    if not done and error is None:
+                        error = "stream_incomplete"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientConnectionError:
+            error = "connection"
+        except aiohttp.ClientError as e:
+            error = type(e).__name__
+        end = time.perf_counter()
+
+        if scheduled < self.measure_from:
+            return  # warm-up
+        self.completed += 1
+        if error is not None:
+            self.errors[error] += 1
+            return
+        self.succeeded += 1
+        self.latencies[endpoint].append(end - scheduled)
+        if first_token is not None:
+            self.ttft.append(first_token - scheduled)
+
+    async def run_closed(self, client: aiohttp.ClientSession, deadline: float) -> None:
+        async def user_loop(user: VirtualUser):
+            # Spread the users' first turns over one think time
+            await asyncio.sleep(self.rng.uniform(0, self.args.think_time))
+            while time.perf_counter() < deadline:
+                await self.request(client, user, time.perf_counter())
+                if self.args.think_time:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.args.think_time))
+
+        await asyncio.gather(*(user_loop(self._new_user()) for _ in range(self.args.users)))
+
+    async def run_open(self, client: aiohttp.ClientSession, start: float, deadline: float) -> None:
+        tasks = set()
+
+        async def turn(user: VirtualUser, scheduled: float):
+            try:
+                await self.request(client, user, scheduled)
+            finally:
+                self.idle_users.append(user)
+
+        interval = 1 / self.args.rate
+        i = 0
+        while True:
+            scheduled = start + i * interval
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -interval:
+                # The generator itself fell behind the schedule (client saturated)
+                self.late_starts += 1
+            user = self.idle_users.pop() if self.idle_users else self._new_user()
+            task = asyncio.create_task(turn(user, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            i += 1
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def run(self) -> Dict:
+        connector = aiohttp.TCPConnector(limit=self.args.connections)
+        async with aiohttp.ClientSession(connector=connector) as client:
+            start = time.perf_counter()
+            self.measure_from = start + self.args.warmup
+            deadline = start + self.args.warmup + self.args.duration
+            if self.args.mode == "closed":
+                await self.run_closed(client, deadline)
+            else:
+                await self.run_open(client, start, deadline)
+            # Open loop: requests arriving before the deadline may finish after it
+            elapsed = max(time.perf_counter() - self.measure_from, 1e-9)
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict:
+        all_latencies = [latency for samples in self.latencies.values() for latency in samples]
+        return {
+            "run_id": self.run_id,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": git_commit(),
+            "config": {key: value for key, value in vars(self.args).items() if key != "output"},
+            "duration_seconds": round(elapsed, 2),
+            "requests": self.completed,
+            "succeeded": self.succeeded,
+            "throughput_rps": round(self.succeeded / elapsed, 2),
+            "offered_rps": self.args.rate if self.args.mode == "open" else None,
+            "virtual_users": len(self.users),
+            "sessions": sum(user.conversation for user in self.users),
+            "errors": dict(self.errors),
+            "error_rate": round(sum(self.errors.values()) / self.completed, 4) if self.completed else 0,
+            "late_starts": self.late_starts,
+            "latency_ms": {
+                "all": percentile_ladder(all_latencies),
+                **{endpoint: percentile_ladder(samples) for endpoint, samples in sorted(self.latencies.items())},
+            },
+            "stream_ms": {
+                "time_to_first_token": percentile_ladder(self.ttft),
+                "time_to_last_token": percentile_ladder(self.latencies.get("/chat/stream", [])),
+            },
+        }
+
+
+def git_commit() -> Optional[str]:
+    """Commit of the working tree, to tell runs apart when comparing reports."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_summary(report: Dict) -> None:
+    """Human-readable summary on stderr; stdout stays machine-readable."""
+    out = sys.stderr
+    print(f"{report['requests']} requests in {report['duration_seconds']}s: "
+          f"{report['throughput_rps']} req/s succeeded, error rate {report['error_rate']:.2%}", file=out)
+    if report["errors"]:
+        print("errors: " + ", ".join(f"{name}={count}" for name, count in report["errors"].items()), file=out)
+    rows = [(name, ladder) for name, ladder in report["latency_ms"].items() if ladder["count"]]
+    rows += [(f"stream {name}", ladder) for name, ladder in report["stream_ms"].items() if ladder["count"]]
+    columns = ["p50", "p90", "p99", "p99.9", "max"]
+    print(f"{'ms':<28}" + "".join(f"{column:>10}" for column in columns), file=out)
+    for name, ladder in rows:
+        print(f"{name:<28}" + "".join(f"{ladder[column]:>10}" for column in columns), file=out)
+    if report["late_starts"]:
+        print(f"warning: {report['late_starts']} arrivals started late, the load generator is saturated", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop and closed-loop load generator for the chat API.")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open",
+                        help="open: constant arrival rate; closed: fixed number of users (default: open)")
+    parser.add_argument("--rate", type=float, default=5.0, help="Open loop: requests per second (default: 5)")
+    parser.add_argument("--users", type=int, default=10, help="Closed loop: virtual users (default: 10)")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="Closed loop: mean seconds between a user's turns (default: 1)")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session before a user starts a new one")
+    parser.add_argument("--stream-ratio", type=float, default=0.5,
+                        help="Fraction of requests sent to /chat/stream instead of /chat (default: 0.5)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Measured seconds (default: 60)")
+    parser.add_argument("--warmup", type=float, default=0.0, help="Seconds of load before measuring (default: 0)")
+    parser.add_argument("--connections", type=int, default=100, help="Connection pool size (default: 100)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Request timeout in seconds (default: 120)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the conversation scripts")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    args.url = args.url.rstrip("/")
+
+    report = asyncio.run(LoadRun(args).run())
+    print_summary(report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(0 if report["succeeded"] else 1)
+
+
+if __name__ == "__main__":
+    main()
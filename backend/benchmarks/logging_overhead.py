@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Cost of logging on the chat request path.
+
+Runs the real agent offline (see tracing_overhead) with several logging
+setups and reports the extra time per request over a run with logging
+disabled, measured on the request thread:
+
+    sync_text_debug : the former setup, synchronous console + file handlers
+                      with every per-request line (now DEBUG) written
+    sync_text_info  : synchronous handlers, INFO only
+    queue_json_info : the default setup, JSON records written by a background thread
+    queue_json_sampled : same, with DEBUG lines kept for every request (sample rate 1)
+
+Console output goes to a temporary file, as when stdout is redirected by
+a process manager; a terminal would make the synchronous setups slower.
+
+Usage:
+    python -m benchmarks.logging_overhead --requests 400
+"""
+
+import argparse
+import contextvars
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.tracing_overhead import QUERIES, build_agent
+from langchain_core.messages import HumanMessage
+from src.config.settings import Settings
+from src.monitoring import structured_logging
+from src.monitoring.tracing import current_request_id, new_request_id
+
+logger = logging.getLogger("src.api.main")
+
+
+def one_request(agent, sessions, i: int) -> float:
+    """One /chat-like request in its own request ID context; returns its duration."""
+    start = time.perf_counter()
+    current_request_id.set(new_request_id())
+    session_id = f"bench-{i % 50}"
+    messages = sessions.get_session(session_id)
+    messages.append(HumanMessage(content=QUERIES[i % len(QUERIES)]))
+    logger.debug("Received chat request for session %s", session_id)
+    agent.invoke_with_memory(messages, thread_id=session_id)
+    response_time = time.perf_counter() - start
+    logger.info("Processed chat request in %.2fs", response_time,
+                extra={"session_id": session_id, "duration_ms": round(response_time * 1000, 1)})
+    return time.perf_counter() - start
+
+
+def configure(mode: str, directory: str) -> None:
+    """Set up logging for a mode; console output goes to a file in `directory`."""
+    structured_logging.shutdown_logging()
+    logging.disable(logging.NOTSET)
+    console = open(os.path.join(directory, f"{mode}.console"), "w", encoding="utf-8")
+    log_file = os.path.join(directory, f"{mode}.log")
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elif mode.startswith("sync"):
+        logging.basicConfig(
+            level=logging.DEBUG if mode == "sync_text_debug" else logging.INFO, force=True,
+            format=structured_logging.TEXT_FORMAT,
+            handlers=[logging.StreamHandler(console), logging.FileHandler(log_file)])
+    else:
+        Settings.log_format = "json"
+        Settings.log_level = "INFO"
+        Settings.log_debug_sample_rate = 1.0 if mode == "queue_json_sampled" else 0.0
+        # Far above what this benchmark produces, so sampled lines are not rate-limited
+        Settings.log_debug_max_per_second = 1e6
+        stdout = sys.stdout
+        sys.stdout = console
+        try:
+            structured_logging.configure_logging(log_file=log_file, force=True)
+        finally:
+            sys.stdout = stdout
+
+
+def count_lines(directory: str, mode: str) -> int:
+    path = os.path.join(directory, f"{mode}.log")
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead on the offline chat pipeline.")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per mode (default: 400)")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Rounds over all modes, to spread noise evenly (default: 3)")
+    args = parser.parse_args()
+
+    from src.memory.session_manager import SessionManager
+
+    directory = tempfile.mkdtemp(prefix="logging-")
+    logging.disable(logging.CRITICAL)
+    agent = build_agent()
+    sessions = SessionManager(store=agent.checkpointer)
+    for i in range(50):
+        contextvars.copy_context().run(one_request, agent, sessions, i)
+
+    modes = ["off", "sync_text_debug", "sync_text_info", "queue_json_info", "queue_json_sampled"]
+    durations = {mode: [] for mode in modes}
+    per_round = max(args.requests // args.rounds, 1)
+    for _ in range(args.rounds):
+        for mode in modes:
+            configure(mode, directory)
+            for i in range(per_round):
+                durations[mode].append(contextvars.copy_context().run(one_request, agent, sessions, i))
+    structured_logging.shutdown_logging()
+    logging.disable(logging.NOTSET)
+
+    baseline = statistics.mean(durations["off"])
+    requests = per_round * args.rounds
+    results = {}
+    for mode in modes:
+        mean = statistics.mean(durations[mode])
+        results[mode] = {
+            "mean_ms": round(mean * 1000, 3),
+            "p50_ms": round(statistics.median(durations[mode]) * 1000, 3),
+            "overhead_us_per_request": round((mean - baseline) * 1e6, 1),
+            "lines_per_request": round(count_lines(directory, mode) / requests, 1),
+        }
+    print(json.dumps({"requests_per_mode": requests, "modes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
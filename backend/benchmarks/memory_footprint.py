@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Memory footprint per session, per knowledge-base chunk and per RAG cache entry.
+
+Synthesizes the data through the real components and measures what stays
+allocated (tracemalloc, after a full collection):
+
+    sessions : N sessions of M turns, written through SessionManager and
+               Checkpointer as the agent does (messages, retrieved chunks,
+               tool calls)
+    corpus   : K chunks cut by DocumentProcessor and added to a VectorStore
+               (hashing embeddings, computed beforehand), with the chunk
+               registry
+    cache    : E RAGCache entries
+
+FAISS keeps its vectors in C++ memory that tracemalloc does not see: the
+index size is reported apart (`faiss_bytes`, 4 bytes per dimension per
+chunk) and included in the per-chunk figure. The largest allocation sites
+are listed for each measurement, with the nearest frame in our code.
+RSS is not compared: tracemalloc's own bookkeeping inflates it.
+
+With `--instance-mb`, estimates how many sessions, or chunks, fit in an
+instance of that size next to the server's fixed footprint (the RSS of
+this process once the agent is built, on the real knowledge base), keeping
+`--headroom` free for request processing and fragmentation.
+
+Usage:
+    python -m benchmarks.memory_footprint --sessions 1000 5000 --turns 4 --chunks 1000 10000
+    python -m benchmarks.memory_footprint --instance-mb 512 --top 15
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+os.environ["EMBEDDINGS_BACKEND"] = "hashing"
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from benchmarks.tracing_overhead import QUERIES, build_agent  # noqa: E402
+from src.rag.vector_store import VectorStore  # noqa: E402
+
+DOCUMENT_PATH = "src/rag/static_document.txt"
+# Frames kept per allocation: enough to reach our code from inside LangChain/pydantic
+FRAMES = 12
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def corpus_text(chunks: int, chunk_size: int = 1000) -> str:
+    """Text long enough for about `chunks` chunks: the knowledge base, reshuffled by paragraph."""
+    with open(DOCUMENT_PATH, encoding="utf-8") as f:
+        paragraphs = [p for p in f.read().split("\n\n") if p.strip()]
+    rng = random.Random(chunks)
+    parts, length, copy = [], 0, 0
+    while length < chunks * chunk_size:
+        copy += 1
+        for paragraph in rng.sample(paragraphs, len(paragraphs)):
+            # Numbered so every chunk is distinct, as in a real corpus
+            parts.append(f"[{copy}] {paragraph}")
+            length += len(parts[-1]) + 2
+    return "\n\n".join(parts)
+
+
+def build_sessions(sessions: int, turns: int, chunks: List[str], answer_chars: int):
+    """Write `sessions` conversations of `turns` turns as the agent does."""
+    from src.agent.agent_state import append_tool_call
+    from src.memory.checkpointer import Checkpointer
+    from src.memory.session_manager import SessionManager
+
+    store = Checkpointer()
+    manager = SessionManager(timeout_minutes=30, store=store)
+    rng = random.Random(sessions)
+    answer = "Airtel Niger propose plusieurs offres adaptées à vos besoins. "
+    for session in range(sessions):
+        session_id = f"session-{session}"
+        tool_calls = []
+        for turn in range(turns):
+            messages = manager.get_session(session_id)
+            query = f"{QUERIES[(session + turn) % len(QUERIES)]} ({session}.{turn})"
+            messages.append(HumanMessage(content=query))
+            # Retrieved chunks are the stored texts themselves, shared with the index
+            docs = rng.sample(chunks, 2)
+            tool_calls = append_tool_call(tool_calls, {"tool": "rag", "result": docs})
+            text = f"{session}.{turn} " + (answer * (answer_chars // len(answer) + 1))[:answer_chars]
+            store.save_state({"messages": messages + [AIMessage(content=text)], "retrieved_docs": docs,
+                              "current_query": query, "tool_calls": tool_calls}, session_id)
+    return manager, store
+
+
+class PrecomputedEmbeddings:
+    """Vectors computed before tracing starts: the hashing model is slow under tracemalloc."""
+
+    def __init__(self, texts: List[str]):
+        from src.rag.embeddings import Embeddings
+
+        self.vectors = dict(zip(texts, Embeddings(backend="hashing").embed_documents(texts)))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors[text]
+
+
+def prepare_corpus(chunks: int):
+    """Cut a corpus of about `chunks` chunks; returns a function indexing it."""
+    from src.rag.document_processor import DocumentProcessor
+
+    prepared = DocumentProcessor().load_text(corpus_text(chunks), {"source": "synthetic"})[:chunks]
+    embeddings = PrecomputedEmbeddings([document["text"] for document in prepared])
+
+    def build():
+        # Fresh copies, so the texts and metadata the store keeps are counted
+        documents = [{"text": document["text"].encode().decode(), "metadata": dict(document["metadata"])}
+                     for document in prepared]
+        store = VectorStore(embedding_dim=768, embeddings_model=embeddings)
+        store.add_documents(documents)
+        return store
+
+    return build
+
+
+def build_cache(entries: int, chunks: List[str]):
+    """Fill a RAGCache with `entries` results of 2 chunks each."""
+    from src.rag.cache import RAGCache
+
+    cache = RAGCache(max_size=entries)
+    rng = random.Random(entries)
+    for i in range(entries):
+        cache.set(f"{QUERIES[i % len(QUERIES)]} {i}", rng.sample(chunks, 2))
+    return cache
+
+
+def allocation_sites(after: tracemalloc.Snapshot, before: tracemalloc.Snapshot, top: int) -> List[Dict[str, Any]]:
+    """Largest allocation growths, by call stack, with the nearest frame in our code."""
+    ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    stats = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "traceback")
+    sites = []
+    for stat in stats[:top]:
+        if stat.size_diff <= 0:
+            break
+        frames = list(stat.traceback)
+        ours = (next((frame for frame in reversed(frames) if "/src/" in frame.filename), None)
+                or next((frame for frame in reversed(frames) if "/benchmarks/" in frame.filename), None))
+        innermost = frames[-1]
+        sites.append({
+            "site": f"{_short(innermost.filename)}:{innermost.lineno}",
+            "via": f"{_short(ours.filename)}:{ours.lineno}" if ours and ours is not innermost else None,
+            "bytes": stat.size_diff,
+            "blocks": stat.count_diff,
+        })
+    return sites
+
+
+def _short(filename: str) -> str:
+    for marker in ("/site-packages/", "/backend/", "/lib/python"):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+
+def measure(build: Callable[[], Any], units: int, top: int) -> Dict[str, Any]:
+    """
+    Memory retained by what `build` returns.
+
+    Args:
+        build: Builds the data and returns it (it is kept alive until measured)
+        units: Number of sessions, chunks or entries built, for the per-unit figure
+        top: Number of allocation sites to report
+
+    Returns:
+        Traced bytes, FAISS bytes, bytes per unit and top allocation sites
+    """
+    gc.collect()
+    tracemalloc.start(FRAMES)
+    before = tracemalloc.take_snapshot()
+    retained = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    traced = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    tracemalloc.stop()
+    faiss_bytes = 0
+    if isinstance(retained, VectorStore):
+        faiss_bytes = retained.index.ntotal * retained.index.d * 4
+    result = {
+        "units": units,
+        "traced_bytes": traced,
+        "faiss_bytes": faiss_bytes,
+        "bytes_per_unit": int((traced + faiss_bytes) / units),
+        "top_allocations": allocation_sites(after, before, top),
+    }
+    if isinstance(retained, tuple):
+        result["store"] = retained[1].memory_stats()
+    del retained, before, after
+    gc.collect()
+    return result
+
+
+def capacity(instance_mb: float, headroom: float, fixed_bytes: int, per_unit: int) -> int:
+    """Units that fit in the instance next to the fixed footprint."""
+    available = instance_mb * 1024 * 1024 * (1 - headroom) - fixed_bytes
+    return max(int(available // per_unit), 0) if per_unit > 0 else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per session, per chunk and per cache entry.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 5000], help="Session counts")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per session (default: 4)")
+    parser.add_argument("--answer-chars", type=int, default=600, help="Characters per answer (default: 600)")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000], help="Corpus sizes in chunks")
+    parser.add_argument("--cache-entries", type=int, default=1000, help="RAG cache entries (default: 1000)")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites per measurement (default: 10)")
+    parser.add_argument("--instance-mb", type=float, default=None, help="Estimate capacity for this instance size")
+    parser.add_argument("--headroom", type=float, default=0.25,
+                        help="Fraction of the instance kept free (default: 0.25)")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    # The server's fixed footprint: libraries, the agent and the real knowledge base
+    with contextlib.redirect_stdout(sys.stderr):
+        agent = build_agent()
+    gc.collect()
+    fixed_rss = rss_bytes()
+    chunks = [document["text"] for document in agent.rag_tool.vector_store.documents]
+
+    report: Dict[str, Any] = {"fixed_rss_bytes": fixed_rss, "turns": args.turns,
+                              "answer_chars": args.answer_chars, "sessions": {}, "corpus": {}}
+    for count in args.sessions:
+        report["sessions"][str(count)] = measure(
+            lambda: build_sessions(count, args.turns, chunks, args.answer_chars), count, args.top)
+    for count in args.chunks:
+        from src.rag.chunk_registry import chunk_registry
+        registered = dict(chunk_registry.texts)
+        report["corpus"][str(count)] = measure(prepare_corpus(count), count, args.top)
+        # The synthetic chunks stay registered otherwise, and would count in the next measurement
+        chunk_registry.texts = registered
+    report["cache"] = measure(lambda: build_cache(args.cache_entries, chunks), args.cache_entries, args.top)
+
+    if args.instance_mb:
+        per_session = report["sessions"][str(max(args.sessions))]["bytes_per_unit"]
+        per_chunk = report["corpus"][str(max(args.chunks))]["bytes_per_unit"]
+        report["capacity"] = {
+            "instance_mb": args.instance_mb,
+            "headroom": args.headroom,
+            "sessions": capacity(args.instance_mb, args.headroom, fixed_rss, per_session),
+            "chunks": capacity(args.instance_mb, args.headroom, fixed_rss, per_chunk),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
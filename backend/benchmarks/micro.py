@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the hot-path components, with baselines and a regression gate.
+
+Each benchmark times one operation in a loop, timeit-style: the loop count
+is calibrated so a run lasts at least `--min-time`, the run is repeated
+`--repeat` times with the garbage collector off, and the median time per
+operation is kept. Covered: chunking (`DocumentProcessor.load_text`),
+`VectorStore.similarity_search` at several corpus sizes, `RAGCache` get/set
+on a full cache and from concurrent threads, the message trimmer at
+growing history lengths, the tool router, prompt assembly and
+`SessionManager` under thread contention. Everything runs offline
+(hashing embeddings, fake LLM token counter).
+
+`run` prints the results as JSON (or writes them with `--output`); saved
+as a baseline, they are compared with a later run by `compare`, which
+exits with status 1 when a benchmark is slower than its baseline by more
+than `--tolerance`. Baselines depend on the machine: record them on the
+one that runs the comparison.
+
+Usage:
+    python -m benchmarks.micro run --output benchmarks/baselines/micro.json
+    python -m benchmarks.micro run --filter vector_search --repeat 9
+    python -m benchmarks.micro compare benchmarks/baselines/micro.json --tolerance 0.15
+    python -m benchmarks.micro compare before.json after.json
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ["EMBEDDINGS_BACKEND"] = "hashing"
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from benchmarks.tracing_overhead import QUERIES, build_agent  # noqa: E402
+
+DOCUMENT_PATH = "src/rag/static_document.txt"
+CORPUS_SIZES = (100, 1000, 10000)
+# Messages in the history
+HISTORY_LENGTHS = (10, 50, 200)
+THREADS = 4
+
+# name -> (setup returning the operation to time, operations per call)
+BENCHMARKS: Dict[str, tuple] = {}
+
+_agent = None
+
+
+def benchmark(name: str, ops_per_call: int = 1):
+    """Register a setup function; it returns the zero-argument operation to time."""
+    def register(setup: Callable[[], Callable[[], Any]]):
+        BENCHMARKS[name] = (setup, ops_per_call)
+        return setup
+    return register
+
+
+def shared_agent():
+    """The offline agent, built once for the benchmarks that need it."""
+    global _agent
+    if _agent is None:
+        _agent = build_agent()
+    return _agent
+
+
+def history(turns: int) -> List:
+    """A conversation of `turns` human/AI exchanges."""
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=QUERIES[i % len(QUERIES)]))
+        messages.append(AIMessage(content="Airtel Niger propose plusieurs forfaits adaptés à vos besoins. " * 4))
+    return messages
+
+
+@benchmark("chunking")
+def setup_chunking():
+    from src.rag.document_processor import DocumentProcessor
+
+    with open(DOCUMENT_PATH, encoding="utf-8") as f:
+        text = f.read()
+    processor = DocumentProcessor()
+    return lambda: processor.load_text(text, {"source": DOCUMENT_PATH})
+
+
+def _register_vector_search(size: int):
+    @benchmark(f"vector_search[{size}]")
+    def setup():
+        from src.rag.embeddings import Embeddings
+        from src.rag.vector_store import VectorStore
+
+        rng = random.Random(size)
+        words = " ".join(QUERIES).split()
+        store = VectorStore(embedding_dim=768, embeddings_model=Embeddings(backend="hashing"))
+        store.add_documents([{"text": " ".join(rng.choices(words, k=60)), "metadata": {"chunk_index": i}}
+                             for i in range(size)])
+        queries = iter(QUERIES * 10 ** 6)
+        return lambda: store.similarity_search(next(queries), k=4)
+
+
+for _size in CORPUS_SIZES:
+    _register_vector_search(_size)
+
+
+def _full_cache():
+    from src.rag.cache import RAGCache
+
+    cache = RAGCache(max_size=1000)
+    for i in range(cache.max_size):
+        cache.set(f"question {i}", [f"chunk {i}"])
+    return cache
+
+
+@benchmark("rag_cache_get_hit")
+def setup_cache_get_hit():
+    cache = _full_cache()
+    keys = [f"question {i}" for i in range(cache.max_size)]
+    position = iter(range(10 ** 9))
+    return lambda: cache.get(keys[next(position) % len(keys)])
+
+
+@benchmark("rag_cache_get_miss")
+def setup_cache_get_miss():
+    cache = _full_cache()
+    return lambda: cache.get("question absente du cache")
+
+
+@benchmark("rag_cache_set_evicting")
+def setup_cache_set():
+    # Full cache: every set evicts the oldest item
+    cache = _full_cache()
+    position = iter(range(10 ** 9))
+    return lambda: cache.set(f"new question {next(position)}", ["chunk"])
+
+
+@benchmark("rag_cache_mixed_threads", ops_per_call=THREADS * 250)
+def setup_cache_threads():
+    # 90% hits and 10% evicting sets, from THREADS threads at once
+    cache = _full_cache()
+    pool = ThreadPoolExecutor(THREADS)
+
+    def work(worker: int):
+        rng = random.Random(worker)
+        for i in range(250):
+            if rng.random() < 0.1:
+                cache.set(f"question {worker}-{i}-{rng.random()}", ["chunk"])
+            else:
+                cache.get(f"question {rng.randrange(cache.max_size)}")
+
+    return lambda: list(pool.map(work, range(THREADS)))
+
+
+def _register_trim(length: int):
+    @benchmark(f"trim[{length}]")
+    def setup():
+        trimmer = shared_agent().message_trimmer
+        messages = history(length // 2)
+        return lambda: trimmer.invoke(messages)
+
+
+for _length in HISTORY_LENGTHS:
+    _register_trim(_length)
+
+
+@benchmark("detect_tool_calls", ops_per_call=len(QUERIES) + 3)
+def setup_detect_tool_calls():
+    agent = shared_agent()
+    queries = QUERIES + ["calculate 12 * (3 + 4)", "summarize les offres internet", "what is 2+2"]
+    return lambda: [agent._detect_tool_calls(query) for query in queries]
+
+
+@benchmark("prompt_build")
+def setup_prompt_build():
+    agent = shared_agent()
+    docs = agent.rag_tool(QUERIES[0])
+    trimmed = agent.message_trimmer.invoke(history(5))
+
+    def build():
+        context = "\n\n".join([f"Document chunk {i+1}:\n{doc}" for i, doc in enumerate(docs)])
+        return agent._build_llm_messages(context, trimmed)
+
+    return build
+
+
+@benchmark("session_contention", ops_per_call=THREADS * 200)
+def setup_session_contention():
+    # Each thread reads a session and saves a turn, over 1000 sessions
+    from src.memory.checkpointer import Checkpointer
+    from src.memory.session_manager import SessionManager
+
+    store = Checkpointer()
+    manager = SessionManager(timeout_minutes=30, store=store)
+    turn = history(2)
+    for i in range(1000):
+        store.save_state({"messages": list(turn), "retrieved_docs": [], "current_query": "", "tool_calls": []},
+                         f"session-{i}")
+    pool = ThreadPoolExecutor(THREADS)
+
+    def work(worker: int):
+        rng = random.Random(worker)
+        for _ in range(200):
+            session_id = f"session-{rng.randrange(1000)}"
+            messages = manager.get_session(session_id)[-4:]
+            store.save_state({"messages": messages, "retrieved_docs": [], "current_query": "",
+                              "tool_calls": []}, session_id)
+
+    return lambda: list(pool.map(work, range(THREADS)))
+
+
+def measure(operation: Callable[[], Any], ops_per_call: int, min_time: float, repeat: int) -> Dict[str, Any]:
+    """
+    Time an operation.
+
+    Args:
+        operation: Zero-argument callable
+        ops_per_call: Operations done by one call, to report the time per operation
+        min_time: Minimum duration of one run, in seconds
+        repeat: Number of runs
+
+    Returns:
+        Median and minimum time per operation in microseconds, spread and loop count
+    """
+    operation()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        if time.perf_counter() - start >= min_time or loops >= 2 ** 20:
+            break
+        loops *= 2
+
+    runs = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                operation()
+            runs.append((time.perf_counter() - start) / (loops * ops_per_call))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    median = statistics.median(runs)
+    return {
+        "median_us": round(median * 1e6, 3),
+        "min_us": round(min(runs) * 1e6, 3),
+        "spread_pct": round((max(runs) - min(runs)) / median * 100, 1),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(names: List[str], min_time: float, repeat: int) -> Dict[str, Any]:
+    """Run benchmarks; returns the report with machine metadata."""
+    import logging
+    logging.disable(logging.WARNING)
+
+    results = {}
+    for name in names:
+        setup, ops_per_call = BENCHMARKS[name]
+        # Some components print while loading; stdout stays for the report
+        with contextlib.redirect_stdout(sys.stderr):
+            operation = setup()
+        results[name] = measure(operation, ops_per_call, min_time, repeat)
+        print(f"{name:28} {results[name]['median_us']:>12.3f} us/op  (±{results[name]['spread_pct']}%)",
+              file=sys.stderr)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """
+    Compare two reports.
+
+    Args:
+        baseline: Report of the reference run
+        current: Report of the run to check
+        tolerance: Allowed slowdown, as a fraction of the baseline median
+
+    Returns:
+        Ratio and status of each benchmark, and the names of the regressions
+    """
+    rows = {}
+    regressions = []
+    for name in sorted(set(baseline["benchmarks"]) | set(current["benchmarks"])):
+        before = baseline["benchmarks"].get(name)
+        after = current["benchmarks"].get(name)
+        if before is None or after is None:
+            rows[name] = {"status": "new" if before is None else "missing"}
+            continue
+        ratio = after["median_us"] / before["median_us"]
+        if ratio > 1 + tolerance:
+            status = "regressed"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            status = "improved"
+        else:
+            status = "unchanged"
+        rows[name] = {"baseline_us": before["median_us"], "current_us": after["median_us"],
+                      "ratio": round(ratio, 3), "status": status}
+    return {"tolerance": tolerance, "benchmarks": rows, "regressions": regressions}
+
+
+def selected(filters: Optional[List[str]]) -> List[str]:
+    return [name for name in BENCHMARKS if not filters or any(f in name for f in filters)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of hot-path components.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command in ("run", "compare"):
+        sub = commands.add_parser(command)
+        sub.add_argument("--filter", nargs="+", help="Only benchmarks whose name contains one of these")
+        sub.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per run (default: 0.2)")
+        sub.add_argument("--repeat", type=int, default=5, help="Runs per benchmark (default: 5)")
+    commands.choices["run"].add_argument("--output", help="Write the report to this file instead of stdout")
+    commands.choices["run"].add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    compare_parser = commands.choices["compare"]
+    compare_parser.add_argument("baseline", help="Baseline report")
+    compare_parser.add_argument("current", nargs="?", help="Report to check (default: run the benchmarks now)")
+    compare_parser.add_argument("--tolerance", type=float, default=0.2,
+                                help="Allowed slowdown over the baseline median (default: 0.2)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if args.list:
+            print("\n".join(selected(args.filter)))
+            return
+        report = run(selected(args.filter), args.min_time, args.repeat)
+        if args.output:
+            os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        names = [name for name in selected(args.filter) if name in baseline["benchmarks"]]
+        current = run(names, args.min_time, args.repeat)
+        baseline["benchmarks"] = {name: baseline["benchmarks"][name] for name in names}
+    result = compare(baseline, current, args.tolerance)
+    print(json.dumps(result, indent=2))
+    for name, row in result["benchmarks"].items():
+        if "ratio" in row:
+            print(f"{name:28} {row['baseline_us']:>12.3f} -> {row['current_us']:>12.3f} us/op  "
+                  f"x{row['ratio']:.2f}  {row['status']}", file=sys.stderr)
+        else:
+            print(f"{name:28} {row['status']}", file=sys.stderr)
+    if baseline["meta"].get("platform") != current["meta"].get("platform"):
+        print("Warning: baseline recorded on another platform", file=sys.stderr)
+    if result["regressions"]:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(result['regressions'])}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Accuracy, memory and speed of the query popularity log on a Zipf workload.
+
+Queries are drawn from `--distinct` templates with Zipf-distributed
+frequencies (user traffic is dominated by a few questions), with random
+case, spacing and punctuation variants. The top-N of the log is compared
+with the exact top-N of a Counter over the normalized queries, which is
+what the log replaces: its memory grows with every distinct query, the
+log's does not.
+
+Usage:
+    python -m benchmarks.query_popularity --queries 200000 --distinct 50000 --top 50
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from src.rag.query_popularity import QueryPopularity, normalize_query
+
+
+def workload(queries: int, distinct: int, skew: float, seed: int = 0):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(distinct)]
+    ranks = rng.choices(range(distinct), weights=weights, k=queries)
+    variants = ["{}", "{} ?", "{}?", "  {}", "{} !"]
+    for rank in ranks:
+        text = f"quel est le prix du forfait {rank} par mois"
+        if rng.random() < 0.3:
+            text = text.capitalize()
+        yield rng.choice(variants).format(text)
+
+
+def measure(factory, queries):
+    tracemalloc.start()
+    structure, record = factory()
+    start = time.perf_counter()
+    for query in queries:
+        record(query)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return structure, elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query popularity log versus an exact counter.")
+    parser.add_argument("--queries", type=int, default=200000, help="Queries recorded (default: 200000)")
+    parser.add_argument("--distinct", type=int, default=50000, help="Distinct questions (default: 50000)")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent (default: 1.1)")
+    parser.add_argument("--top", type=int, default=50, help="Top-N compared (default: 50)")
+    parser.add_argument("--top-k", type=int, default=200, help="Heavy hitters tracked (default: 200)")
+    args = parser.parse_args()
+
+    queries = list(workload(args.queries, args.distinct, args.skew))
+
+    def exact():
+        counter = Counter()
+        return counter, lambda query: counter.update((normalize_query(query),))
+
+    def sketch():
+        log = QueryPopularity(top_k=args.top_k, decay_seconds=0)
+        return log, log.record
+
+    counter, exact_seconds, exact_bytes = measure(exact, queries)
+    log, sketch_seconds, sketch_bytes = measure(sketch, queries)
+
+    true_top = [query for query, _ in counter.most_common(args.top)]
+    found_top = [query for query, _ in log.top(args.top)]
+    overestimates = [log.sketch.estimate(query) / counter[query] - 1 for query in true_top]
+
+    print(json.dumps({
+        "queries": args.queries,
+        "distinct_normalized": len(counter),
+        "top_n": args.top,
+        "recall_at_n": round(len(set(true_top) & set(found_top)) / args.top, 3),
+        "max_count_overestimate": f"{max(overestimates):.2%}",
+        "exact_counter": {"memory_kb": round(exact_bytes / 1024, 1),
+                          "record_us": round(exact_seconds / args.queries * 1e6, 2)},
+        "popularity_log": {"memory_kb": round(sketch_bytes / 1024, 1),
+                           "record_us": round(sketch_seconds / args.queries * 1e6, 2)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Replay captured traffic and compare stage latencies between builds.
+
+Reads traffic captured with CAPTURE_PATH (see src/monitoring/capture.py)
+and reproduces it: each request is sent at its original offset from the
+first one, divided by `--speed`, on the same route, with its (anonymized)
+message, and the turns of a captured session go to the same replay
+session. Arrivals are open loop, as in production; `--max-gap-seconds`
+shortens idle periods.
+
+With `--start-server`, a server is started from this tree with the fake
+LLM and hashing embeddings and its own capture, so the run needs no API
+key and the LLM latency is fixed (`--first-token-ms`,
+`--tokens-per-second`); otherwise point `--url` at a server running with
+CAPTURE_PATH and pass that file as `--server-capture`. The report has the
+client-side latencies and, from the server's capture, the distribution of
+each pipeline stage per route.
+
+`summary` gives the same stage distributions for a capture file (e.g.
+production), and `compare` exits with status 1 when a stage's p50 or p90
+is slower than in the reference report by more than `--tolerance`.
+
+Usage:
+    python -m benchmarks.replay summary capture.jsonl.2 capture.jsonl.1 capture.jsonl --output prod.json
+    python -m benchmarks.replay run capture.jsonl --start-server --speed 2 --output build-a.json
+    python -m benchmarks.replay run capture.jsonl --url http://localhost:8000 --server-capture /tmp/replay.jsonl
+    python -m benchmarks.replay compare build-a.json build-b.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from benchmarks.load_test import QUERIES, git_commit, percentile_ladder
+
+ROUTES = ("/chat", "/chat/stream")
+
+
+def read_capture(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Read capture files.
+
+    Args:
+        paths: Capture files, in any order (rotated files included)
+
+    Returns:
+        The records, by arrival time
+    """
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Line cut by a crash or a rotation
+    return sorted(records, key=lambda record: record["t"])
+
+
+def stage_summary(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Percentiles of total time, time to first token and each stage, per route, in milliseconds."""
+    samples: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        if record.get("status") != "ok" or record.get("resumed"):
+            continue
+        route = samples[record["route"]]
+        route["total"].append(record["ms"] / 1000)
+        if "ttft_ms" in record:
+            route["ttft"].append(record["ttft_ms"] / 1000)
+        for stage, ms in record.get("stages", {}).items():
+            route[stage].append(ms / 1000)
+    return {route: {stage: percentile_ladder(values) for stage, values in sorted(stages.items())}
+            for route, stages in sorted(samples.items())}
+
+
+def schedule(records: List[Dict[str, Any]], speed: float, max_gap: Optional[float]) -> List[float]:
+    """Offset of each request from the start of the replay, in seconds."""
+    offsets = []
+    offset = 0.0
+    for previous, record in zip([None] + records[:-1], records):
+        if previous is not None:
+            gap = max(record["t"] - previous["t"], 0.0)
+            if max_gap is not None:
+                gap = min(gap, max_gap)
+            offset += gap / speed
+        offsets.append(offset)
+    return offsets
+
+
+class ReplayRun:
+    """Sends the captured requests on schedule and collects client-side results."""
+
+    def __init__(self, args: argparse.Namespace, records: List[Dict[str, Any]]):
+        self.args = args
+        self.records = [record for record in records if record["route"] in ROUTES and not record.get("resumed")]
+        self.run_id = uuid.uuid4().hex[:8]
+        self.timeout = aiohttp.ClientTimeout(total=args.timeout)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.ttft: List[float] = []
+        self.errors: Counter = Counter()
+        self.late_starts = 0
+        self.started_at = 0.0
+
+    def payload(self, index: int, record: Dict[str, Any]) -> Dict[str, str]:
+        # Messages not kept by the capture are replaced by a query of the knowledge base
+        message = record.get("message") or QUERIES[index % len(QUERIES)]
+        return {"session_id": f"replay-{self.run_id}-{record['session']}", "message": message}
+
+    async def request(self, client: aiohttp.ClientSession, index: int, record: Dict[str, Any],
+                      scheduled: float) -> None:
+        route = record["route"]
+        error = None
+        first_token = None
+        try:
+            async with client.post(self.args.url + route, json=self.payload(index, record),
+                                   timeout=self.timeout) as response:
+                if response.status != 200:
+                    error = f"http_{response.status}"
+                    await response.read()
+                elif route == "/chat":
+                    await response.read()
+                else:
+                    async for line in response.content:
+                        if line.startswith(b"event: error"):
+                            error = "stream_error"
+                        elif line.startswith(b"data: [DONE]"):
+                            break
+                        elif line.startswith(b"data:") and first_token is None:
+                            first_token = time.perf_counter()
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as e:
+            error = type(e).__name__
+        if error is not None:
+            self.errors[error] += 1
+            return
+        self.latencies[route].append(time.perf_counter() - scheduled)
+        if first_token is not None:
+            self.ttft.append(first_token - scheduled)
+
+    async def run(self) -> float:
+        offsets = schedule(self.records, self.args.speed, self.args.max_gap_seconds)
+        tasks = []
+        connector = aiohttp.TCPConnector(limit=self.args.connections)
+        async with aiohttp.ClientSession(connector=connector) as client:
+            start = time.perf_counter()
+            self.started_at = time.time()
+            for index, (record, offset) in enumerate(zip(self.records, offsets)):
+                scheduled = start + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -0.1:
+                    self.late_starts += 1
+                tasks.append(asyncio.create_task(self.request(client, index, record, scheduled)))
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - start
+
+
+def start_server(port: int, env: Dict[str, str], directory: str) -> subprocess.Popen:
+    """
+    Start this tree's server offline (fake LLM, hashing embeddings).
+
+    Args:
+        port: Port to listen on
+        env: Settings of the server (environment variables), over the offline defaults
+        directory: Where the server log is written
+
+    Returns:
+        The server process, once /readyz answers
+
+    Raises:
+        RuntimeError: If the server exits or is not ready within 120 s
+    """
+    log_file = os.path.join(directory, "server.log")
+    env = {**os.environ, "LLM_BACKEND": "fake", "EMBEDDINGS_BACKEND": "hashing", "LOG_LEVEL": "WARNING",
+           **env, "PORT": str(port), "LOG_FILE": log_file}
+    server = subprocess.Popen([sys.executable, "start_server.py"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}, see {log_file}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=2) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Server not ready after 120 s")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    """Stop the server gracefully, so its capture is flushed."""
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    records = read_capture(args.capture)
+    if args.limit:
+        records = records[:args.limit]
+    replay = ReplayRun(args, records)
+    server = None
+    directory = tempfile.mkdtemp(prefix="replay-")
+    server_capture = args.server_capture
+    if args.start_server:
+        server_capture = os.path.join(directory, "capture.jsonl")
+        server = start_server(args.port, {
+            "FAKE_LLM_FIRST_TOKEN_MS": str(args.first_token_ms),
+            "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+            "CAPTURE_PATH": server_capture,
+            "CAPTURE_SAMPLE_RATE": "1",
+        }, directory)
+        args.url = f"http://127.0.0.1:{args.port}"
+    try:
+        elapsed = asyncio.run(replay.run())
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    report = {
+        "git_commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "command")},
+        "captured_seconds": round(records[-1]["t"] - records[0]["t"], 1) if records else 0,
+        "duration_seconds": round(elapsed, 1),
+        "requests": len(replay.records),
+        "errors": dict(replay.errors),
+        "late_starts": replay.late_starts,
+        "client_ms": {route: percentile_ladder(samples) for route, samples in sorted(replay.latencies.items())},
+        "client_ttft_ms": percentile_ladder(replay.ttft),
+    }
+    if server_capture and os.path.exists(server_capture):
+        # Only the requests of this run, if the capture file holds earlier ones
+        served = [record for record in read_capture([server_capture]) if record["t"] >= replay.started_at]
+        report["stages_ms"] = stage_summary(served)
+        report["server_requests"] = len(served)
+    return report
+
+
+def compare(reference: Dict[str, Any], candidate: Dict[str, Any], tolerance: float, min_ms: float) -> Dict[str, Any]:
+    """
+    Compare the stage distributions of two reports.
+
+    Args:
+        reference: Report of the reference build
+        candidate: Report of the build to check
+        tolerance: Allowed slowdown, as a fraction of the reference percentile
+        min_ms: Differences smaller than this are never regressions (noise on tiny stages)
+
+    Returns:
+        p50/p90 of each stage in both reports with the ratio, and the regressions
+    """
+    rows = {}
+    regressions = []
+    for route, stages in reference.get("stages_ms", {}).items():
+        for stage, before in stages.items():
+            after = candidate.get("stages_ms", {}).get(route, {}).get(stage)
+            if not after or not after.get("count") or not before.get("count"):
+                continue
+            row = {}
+            for q in ("p50", "p90"):
+                ratio = after[q] / before[q] if before[q] else 1.0
+                row[q] = {"reference": before[q], "candidate": after[q], "ratio": round(ratio, 3)}
+                if ratio > 1 + tolerance and after[q] - before[q] > min_ms:
+                    regressions.append(f"{route} {stage} {q}")
+            rows[f"{route} {stage}"] = row
+    return {"tolerance": tolerance, "stages": rows, "regressions": regressions}
+
+
+def write(report: Dict[str, Any], output: Optional[str]) -> None:
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic and compare stage latencies.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summary_parser = commands.add_parser("summary", help="Stage distributions of capture files")
+    summary_parser.add_argument("capture", nargs="+", help="Capture files")
+    summary_parser.add_argument("--output", help="Write the report to this file instead of stdout")
+
+    run_parser = commands.add_parser("run", help="Replay capture files against a server")
+    run_parser.add_argument("capture", nargs="+", help="Capture files")
+    run_parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    run_parser.add_argument("--server-capture", help="Capture file written by the server at --url")
+    run_parser.add_argument("--start-server", action="store_true",
+                            help="Start this tree's server offline on --port and use its capture")
+    run_parser.add_argument("--port", type=int, default=8011, help="Port of the started server (default: 8011)")
+    run_parser.add_argument("--first-token-ms", type=float, default=300,
+                            help="Fake LLM first-token latency of the started server (default: 300)")
+    run_parser.add_argument("--tokens-per-second", type=float, default=50,
+                            help="Fake LLM token rate of the started server (default: 50)")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="Timing scale: 2 replays twice as fast")
+    run_parser.add_argument("--max-gap-seconds", type=float, default=None, help="Shorten longer idle periods")
+    run_parser.add_argument("--limit", type=int, default=None, help="Replay only the first N requests")
+    run_parser.add_argument("--connections", type=int, default=100, help="Connection pool size (default: 100)")
+    run_parser.add_argument("--timeout", type=float, default=120, help="Request timeout in seconds (default: 120)")
+    run_parser.add_argument("--output", help="Write the report to this file instead of stdout")
+
+    compare_parser = commands.add_parser("compare", help="Compare the stage latencies of two reports")
+    compare_parser.add_argument("reference", help="Report of the reference build")
+    compare_parser.add_argument("candidate", help="Report of the build to check")
+    compare_parser.add_argument("--tolerance", type=float, default=0.2,
+                                help="Allowed slowdown of a stage's p50/p90 (default: 0.2)")
+    compare_parser.add_argument("--min-ms", type=float, default=1.0,
+                                help="Ignore differences below this many milliseconds (default: 1)")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        records = read_capture(args.capture)
+        write({"requests": len(records), "stages_ms": stage_summary(records)}, args.output)
+    elif args.command == "run":
+        report = run(args)
+        write(report, args.output)
+        print(f"{report['requests']} requests replayed in {report['duration_seconds']}s "
+              f"(captured over {report['captured_seconds']}s), errors: {report['errors'] or 'none'}", file=sys.stderr)
+    else:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+        with open(args.candidate, encoding="utf-8") as f:
+            candidate = json.load(f)
+        result = compare(reference, candidate, args.tolerance, args.min_ms)
+        print(json.dumps(result, indent=2))
+        if result["regressions"]:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(result['regressions'])}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
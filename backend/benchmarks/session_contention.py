@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Multi-threaded contention benchmark for the session store.
+
+Worker threads mix session reads (`get_session`) and turn writes while a
+separate thread keeps listing all sessions, as `/sessions` does. Compares
+the previous layout (one dict behind one global RLock, listing by full
+copy) with the sharded, lock-striped Checkpointer.
+
+Usage:
+    python -m benchmarks.session_contention --sessions 20000 --threads 1 8
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.memory.checkpointer import Checkpointer
+from src.memory.session_manager import SessionManager
+
+
+class GlobalLockSessions:
+    """The previous SessionManager layout: every operation under one RLock."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.RLock()
+
+    def get_session(self, session_id):
+        with self.lock:
+            if session_id not in self.sessions:
+                self.sessions[session_id] = {"messages": [], "last_activity": time.time()}
+            else:
+                self.sessions[session_id]["last_activity"] = time.time()
+            return self.sessions[session_id]["messages"]
+
+    def save_turn(self, session_id, messages):
+        with self.lock:
+            self.sessions[session_id] = {"messages": messages, "last_activity": time.time()}
+
+    def list_sessions(self):
+        with self.lock:
+            sessions = self.sessions.copy()
+        return sum(len(data["messages"]) for data in sessions.values())
+
+
+class ShardedSessions:
+    """The current layout: SessionManager over the sharded Checkpointer."""
+
+    def __init__(self):
+        self.store = Checkpointer()
+        self.manager = SessionManager(timeout_minutes=30, store=self.store)
+
+    def get_session(self, session_id):
+        return self.manager.get_session(session_id)
+
+    def save_turn(self, session_id, messages):
+        self.store.save_state({"messages": messages, "retrieved_docs": [],
+                               "current_query": "", "tool_calls": []}, session_id)
+
+    def list_sessions(self):
+        return sum(len(messages) for _, messages, _ in self.manager.iter_sessions())
+
+
+def run(store, sessions: int, threads: int, duration: float, write_ratio: float) -> dict:
+    turn = [HumanMessage(content="Quels sont vos forfaits ?"), AIMessage(content="Voici nos forfaits.")]
+    for i in range(sessions):
+        store.save_turn(f"session-{i}", list(turn))
+
+    stop = threading.Event()
+    latencies = [[] for _ in range(threads)]
+    listings = []
+
+    def worker(index: int):
+        rng = random.Random(index)
+        samples = latencies[index]
+        while not stop.is_set():
+            session_id = f"session-{rng.randrange(sessions)}"
+            start = time.perf_counter()
+            messages = store.get_session(session_id)
+            if rng.random() < write_ratio:
+                store.save_turn(session_id, list(messages) + turn)
+            samples.append(time.perf_counter() - start)
+
+    def lister():
+        while not stop.is_set():
+            start = time.perf_counter()
+            store.list_sessions()
+            listings.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    pool.append(threading.Thread(target=lister))
+    for thread in pool:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in pool:
+        thread.join()
+
+    samples = sorted(sample for per_thread in latencies for sample in per_thread)
+    return {
+        "threads": threads,
+        "ops_per_second": int(len(samples) / duration),
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+        "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 1),
+        "max_us": round(samples[-1] * 1e6, 1),
+        "listings": len(listings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session store contention benchmark.")
+    parser.add_argument("--sessions", type=int, default=20000, help="Stored sessions (default: 20000)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16], help="Worker thread counts")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run (default: 3)")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of ops that write")
+    args = parser.parse_args()
+
+    report = {"sessions": args.sessions, "global_lock": [], "sharded": []}
+    for threads in args.threads:
+        report["global_lock"].append(run(GlobalLockSessions(), args.sessions, threads, args.duration, args.write_ratio))
+        report["sharded"].append(run(ShardedSessions(), args.sessions, threads, args.duration, args.write_ratio))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
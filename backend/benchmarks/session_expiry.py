@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Lock hold time of session expiry at large session counts.
+
+Compares the previous sweep (scan every session while holding the global
+lock) with the heap-driven `SessionManager.expire_due_sessions`, at the
+same session count and the same fraction of sessions due.
+
+Usage:
+    python -m benchmarks.session_expiry --sessions 100000 --due 0.01
+"""
+
+import argparse
+import json
+import threading
+import time
+
+from src.memory.checkpointer import Checkpointer
+from src.memory.session_manager import SessionManager
+
+
+class TimedLock:
+    """Lock wrapper recording how long each acquisition is held."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.holds = []
+        self._acquired_at = 0.0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self._acquired_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.holds.append(time.perf_counter() - self._acquired_at)
+        self.lock.release()
+
+    def acquire(self, *args, **kwargs):
+        return self.__enter__()
+
+    def release(self):
+        self.__exit__()
+
+
+def ages(sessions: int, due_fraction: float, timeout_seconds: float):
+    """Yield (session_id, age); the first `due` sessions are past their timeout, the rest are recent."""
+    due = int(sessions * due_fraction)
+    for i in range(sessions):
+        yield f"session-{i}", timeout_seconds + 1 if i < due else timeout_seconds / 2
+
+
+def full_scan_sweep(sessions: dict, lock: TimedLock, now: float, timeout_seconds: float) -> int:
+    """The previous algorithm: scan and delete every expired session under one lock."""
+    with lock:
+        expired = [session_id for session_id, data in sessions.items()
+                   if now - data["last_activity"] > timeout_seconds]
+        for session_id in expired:
+            del sessions[session_id]
+    return len(expired)
+
+
+def summarize(holds: list, seconds: float, expired: int) -> dict:
+    return {
+        "expired": expired,
+        "sweep_ms": round(seconds * 1000, 2),
+        "lock_acquisitions": len(holds),
+        "max_lock_hold_us": round(max(holds) * 1e6, 1) if holds else 0,
+        "total_lock_hold_ms": round(sum(holds) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session expiry lock hold time.")
+    parser.add_argument("--sessions", type=int, default=100000, help="Active sessions (default: 100000)")
+    parser.add_argument("--due", type=float, default=0.01, help="Fraction of sessions due (default: 0.01)")
+    args = parser.parse_args()
+
+    timeout_minutes = 30
+    timeout_seconds = timeout_minutes * 60
+    now = time.time()
+
+    # Previous layout: one dict of sessions behind one global lock
+    sessions = {session_id: {"messages": [], "last_activity": now - age}
+                for session_id, age in ages(args.sessions, args.due, timeout_seconds)}
+    lock = TimedLock(threading.RLock())
+    start = time.perf_counter()
+    expired = full_scan_sweep(sessions, lock, now, timeout_seconds)
+    before = summarize(lock.holds, time.perf_counter() - start, expired)
+
+    # Create the manager on an empty store so its cleanup thread idles, then
+    # schedule every session the way get_session does on first activity
+    store = Checkpointer()
+    manager = SessionManager(timeout_minutes=timeout_minutes, store=store)
+    state = {"messages": (), "retrieved_docs": (), "current_query": "", "tool_calls": ()}
+    for session_id, age in ages(args.sessions, args.due, timeout_seconds):
+        store._shard(session_id).states[session_id] = (state, now - age, 0)
+        manager._schedule(session_id, now - age + timeout_seconds)
+
+    manager.heap_lock = TimedLock(manager.heap_lock)
+    for shard in store.shards:
+        shard.lock = TimedLock(shard.lock)
+    start = time.perf_counter()
+    expired = manager.expire_due_sessions(now=now)
+    shard_holds = [hold for shard in store.shards for hold in shard.lock.holds]
+    after = summarize(manager.heap_lock.holds + shard_holds, time.perf_counter() - start, expired)
+
+    due = int(args.sessions * args.due)
+    print(json.dumps({"sessions": args.sessions, "due": due,
+                      "full_scan": before, "heap": after}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Memory used per conversation session, before and after the single conversation store.
+
+"before" replays the previous layout: each turn's messages kept in the
+SessionManager's own dict, in the Checkpointer's backup dict, and in a
+LangGraph MemorySaver attached to the compiled workflow. "after" drives the
+current SessionManager/Checkpointer pair with one write per turn. With
+--budget-mb, "budgeted" runs the same workload under a global memory budget,
+spilling idle sessions to compressed bytes.
+
+Usage:
+    python -m benchmarks.session_memory --sessions 10000 --turns 4
+    python -m benchmarks.session_memory --sessions 10000 --turns 4 --budget-mb 16
+"""
+
+import argparse
+import functools
+import gc
+import json
+import time
+import tracemalloc
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, StateGraph
+
+from src.agent.agent_state import AgentState
+from src.memory.checkpointer import Checkpointer
+from src.memory.session_manager import SessionManager
+
+
+def user_text(session: int, turn: int) -> str:
+    return f"Session {session} turn {turn}: quels sont vos forfaits internet et leurs prix ? " * 3
+
+
+def answer_text(session: int, turn: int) -> str:
+    return f"Session {session} turn {turn}: voici les forfaits disponibles chez Airtel Niger. " * 10
+
+
+def build_before(sessions: int, turns: int):
+    """Replay the previous triple-storage layout."""
+    def agent_node(state: AgentState):
+        session, turn = state["current_query"].split(":")
+        return {
+            "messages": state["messages"] + [AIMessage(content=answer_text(int(session), int(turn)))],
+            "retrieved_docs": state["retrieved_docs"],
+            "current_query": state["current_query"],
+            "tool_calls": state["tool_calls"]
+        }
+
+    workflow = StateGraph(state_schema=AgentState)
+    workflow.add_node("agent", agent_node)
+    workflow.add_edge(START, "agent")
+    graph = workflow.compile(checkpointer=MemorySaver())
+
+    session_store = {}
+    backup_states = {}
+    for session in range(sessions):
+        session_id = f"session-{session}"
+        config = {"configurable": {"thread_id": session_id}}
+        for turn in range(turns):
+            messages = session_store.setdefault(
+                session_id, {"messages": [], "last_activity": time.time()})["messages"]
+            messages.append(HumanMessage(content=user_text(session, turn)))
+            state = {"messages": messages, "retrieved_docs": [],
+                     "current_query": f"{session}:{turn}", "tool_calls": []}
+            result = graph.invoke(state, config)
+            session_store[session_id] = {"messages": result["messages"], "last_activity": time.time()}
+            backup_states[session_id] = {**state, "messages": result["messages"]}
+    return graph, session_store, backup_states
+
+
+def build_after(sessions: int, turns: int, memory_budget_bytes: int = 0):
+    """Drive the single conversation store with one write per turn."""
+    store = Checkpointer(memory_budget_bytes=memory_budget_bytes)
+    session_manager = SessionManager(timeout_minutes=30, store=store)
+    for session in range(sessions):
+        session_id = f"session-{session}"
+        for turn in range(turns):
+            messages = session_manager.get_session(session_id)
+            messages.append(HumanMessage(content=user_text(session, turn)))
+            store.save_state({
+                "messages": messages + [AIMessage(content=answer_text(session, turn))],
+                "retrieved_docs": [],
+                "current_query": f"{session}:{turn}",
+                "tool_calls": []
+            }, session_id)
+    return session_manager, store
+
+
+def measure(builder, sessions: int, turns: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    retained = builder(sessions, turns)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    result = {
+        "total_mb": round(used / 1024 / 1024, 1),
+        "bytes_per_session": int(used / sessions),
+        "seconds": round(elapsed, 2),
+    }
+    store = retained[-1]
+    if isinstance(store, Checkpointer):
+        result["store"] = store.memory_stats()
+    del retained
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure conversation-state memory per session.")
+    parser.add_argument("--sessions", type=int, default=10000, help="Active sessions (default: 10000)")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per session (default: 4)")
+    parser.add_argument("--budget-mb", type=float, default=0,
+                        help="Also measure the store under this memory budget (default: off)")
+    args = parser.parse_args()
+
+    report = {
+        "sessions": args.sessions,
+        "turns": args.turns,
+        "before": measure(build_before, args.sessions, args.turns),
+        "after": measure(build_after, args.sessions, args.turns),
+    }
+    if args.budget_mb:
+        budgeted = functools.partial(build_after, memory_budget_bytes=int(args.budget_mb * 1024 * 1024))
+        report["budgeted"] = measure(budgeted, args.sessions, args.turns)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
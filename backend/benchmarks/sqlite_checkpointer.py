@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Write throughput and read latency of the SQLite checkpointer.
+
+Populates a database with `--threads` conversation states, then measures
+batched write throughput, cold reads (LRU misses served from SQLite) and
+hot reads (served from the in-memory LRU).
+
+Usage:
+    python -m benchmarks.sqlite_checkpointer --threads 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.memory.sqlite_checkpointer import SQLiteCheckpointer
+
+
+def make_state(thread: int, turns: int) -> dict:
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"Thread {thread} turn {turn}: quels sont vos forfaits internet ?"))
+        messages.append(AIMessage(content=f"Thread {thread} turn {turn}: voici les forfaits Airtel Niger. " * 5))
+    return {"messages": messages, "retrieved_docs": [], "current_query": "", "tool_calls": []}
+
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1e6  # noqa: E731
+    return {"p50_us": round(pick(0.5), 1), "p90_us": round(pick(0.9), 1), "p99_us": round(pick(0.99), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite checkpointer.")
+    parser.add_argument("--threads", type=int, default=100000, help="Stored threads (default: 100000)")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per stored thread (default: 3)")
+    parser.add_argument("--reads", type=int, default=5000, help="Reads per latency sample (default: 5000)")
+    parser.add_argument("--cache-size", type=int, default=1024, help="LRU size (default: 1024)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="checkpointer-bench-")
+    db_path = os.path.join(directory, "checkpoints.db")
+    states = [make_state(i, args.turns) for i in range(min(args.threads, 1000))]
+
+    store = SQLiteCheckpointer(db_path, cache_size=args.cache_size)
+    start = time.perf_counter()
+    for i in range(args.threads):
+        store.save_state(states[i % len(states)], f"thread-{i}")
+    store.flush()
+    populate_seconds = time.perf_counter() - start
+    store.close()
+
+    # Cold reads: a fresh instance has an empty LRU
+    store = SQLiteCheckpointer(db_path, cache_size=args.cache_size)
+    ids = [f"thread-{random.randrange(args.threads)}" for _ in range(args.reads)]
+    cold = []
+    for thread_id in ids:
+        start = time.perf_counter()
+        store.get_state(thread_id)
+        cold.append(time.perf_counter() - start)
+
+    # Hot reads: a working set that fits in the LRU
+    hot_ids = [f"thread-{i}" for i in range(min(args.cache_size, args.threads))]
+    for thread_id in hot_ids:
+        store.get_state(thread_id)
+    hot = []
+    for _ in range(args.reads):
+        thread_id = random.choice(hot_ids)
+        start = time.perf_counter()
+        store.get_state(thread_id)
+        hot.append(time.perf_counter() - start)
+
+    # Sustained updates against the populated database
+    updates = min(args.threads, 20000)
+    start = time.perf_counter()
+    for i in range(updates):
+        store.save_state(states[i % len(states)], f"thread-{random.randrange(args.threads)}")
+    store.flush()
+    update_seconds = time.perf_counter() - start
+    store.close()
+
+    report = {
+        "threads": args.threads,
+        "db_size_mb": round(os.path.getsize(db_path) / 1024 / 1024, 1),
+        "populate_writes_per_second": int(args.threads / populate_seconds),
+        "update_writes_per_second": int(updates / update_seconds),
+        "cold_read_latency": percentiles(cold),
+        "hot_read_latency": percentiles(hot),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Encode/decode throughput and size of agent states: pickle vs the LangGraph
+JsonPlusSerializer vs the compact StateCodec (with the full and the bounded
+tool-call history).
+
+States are built like the agent builds them: every turn adds a human and
+an AI message, replaces `retrieved_docs` with knowledge-base chunks and
+records a RAG tool call holding the same chunks.
+
+Usage:
+    python -m benchmarks.state_codec --turns 10 --iterations 2000
+"""
+
+import argparse
+import json
+import pickle
+import random
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.agent.agent_state import MAX_TOOL_CALL_HISTORY, append_tool_call
+from src.memory.state_codec import StateCodec
+from src.rag.chunk_registry import chunk_registry
+from src.rag.document_processor import DocumentProcessor
+
+
+def build_state(chunks, turns: int, bounded: bool) -> dict:
+    rng = random.Random(turns)
+    state = {"messages": [], "retrieved_docs": [], "current_query": "", "tool_calls": []}
+    for turn in range(turns):
+        query = f"Tour {turn} : quels sont les forfaits internet disponibles et leurs prix ?"
+        docs = rng.sample(chunks, 2)
+        call = {"tool": "rag", "result": docs}
+        state = {
+            "messages": state["messages"] + [
+                HumanMessage(content=query),
+                AIMessage(content="Voici les forfaits Airtel Niger disponibles. " * 8)],
+            "retrieved_docs": docs,
+            "current_query": query,
+            "tool_calls": (append_tool_call(state["tool_calls"], call) if bounded
+                           else state["tool_calls"] + [call]),
+        }
+    return state
+
+
+def measure(name, dumps, loads, state, iterations: int) -> dict:
+    blob = dumps(state)
+    size = len(blob[1]) if isinstance(blob, tuple) else len(blob)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        dumps(state)
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        loads(blob)
+    decode = time.perf_counter() - start
+    return {
+        "codec": name,
+        "bytes": size,
+        "encode_per_second": int(iterations / encode),
+        "decode_per_second": int(iterations / decode),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent state codec benchmark.")
+    parser.add_argument("--document", default="src/rag/static_document.txt", help="Knowledge-base document")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per state (default: 10)")
+    parser.add_argument("--iterations", type=int, default=2000, help="Encode/decode iterations (default: 2000)")
+    args = parser.parse_args()
+
+    chunks = [doc["text"] for doc in DocumentProcessor(chunk_size=400, chunk_overlap=50).load_file(args.document)]
+    chunk_registry.register(chunks)
+
+    jsonplus = JsonPlusSerializer()
+    codec = StateCodec()
+    unbounded = build_state(chunks, args.turns, bounded=False)
+    bounded = build_state(chunks, args.turns, bounded=True)
+
+    results = [
+        measure("pickle", pickle.dumps, pickle.loads, unbounded, args.iterations),
+        measure("jsonplus", jsonplus.dumps_typed, jsonplus.loads_typed, unbounded, args.iterations),
+        measure("state_codec", codec.dumps_typed, codec.loads_typed, unbounded, args.iterations),
+        measure("state_codec_bounded", codec.dumps_typed, codec.loads_typed, bounded, args.iterations),
+    ]
+    for result in results:
+        result["bytes_per_turn"] = int(result["bytes"] / args.turns)
+
+    assert codec.dumps_typed(bounded)[0] == "agentstate"
+    assert codec.loads_typed(codec.dumps_typed(bounded)) == bounded
+    print(json.dumps({
+        "turns": args.turns,
+        "chunks": len(chunks),
+        "tool_call_history": MAX_TOOL_CALL_HISTORY,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
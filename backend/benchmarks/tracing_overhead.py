@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cost of request tracing on the chat pipeline.
+
+Runs the real agent (router, retrieval with RAG cache, trim, prompt build,
+state save) offline: hashing embeddings and the fake chat model answering
+instantly, so the pipeline time is only our own CPU work. Requests alternate
+between untraced and traced (by default every trace is exported to a
+temporary JSONL file, the worst case), and the extra time per request is compared with the
+offline pipeline time and with a request that includes `--llm-seconds` of
+LLM latency. Exits with status 1 if the overhead exceeds `--budget-pct` of
+that request time.
+
+Usage:
+    python -m benchmarks.tracing_overhead --requests 400 --llm-seconds 0.5
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["EMBEDDINGS_BACKEND"] = "hashing"
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from src.monitoring.tracing import JsonlSpanExporter, Tracer, span  # noqa: E402
+
+QUERIES = [
+    "forfaits internet", "prix des appels vers l'international", "comment activer airtel money",
+    "forfait illimité week-end", "service client airtel niger", "recharger mon crédit",
+    "transfert d'argent airtel money", "offres sms", "forfait mensuel 5 Go", "roaming au Nigeria",
+]
+
+
+def build_agent():
+    """The real agent with local embeddings and an instant fake LLM."""
+    from src.agent.fake_llm import FakeChatModel
+    from src.agent.rag_agent import LangGraphRAGAgent
+
+    return LangGraphRAGAgent("src/rag/static_document.txt", llm=FakeChatModel())
+
+
+def one_request(agent, sessions, tracer, i: int) -> float:
+    """One /chat-like request; returns its duration."""
+    start = time.perf_counter()
+    session_id = f"bench-{i % 50}"
+    trace = tracer.start_trace("/chat", session_id=session_id) if tracer else None
+    with span("session_load"):
+        messages = sessions.get_session(session_id)
+    messages.append(HumanMessage(content=QUERIES[i % len(QUERIES)]))
+    agent.invoke_with_memory(messages, thread_id=session_id)
+    if tracer:
+        tracer.finish_trace(trace, "ok")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request tracing overhead on the offline chat pipeline.")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per mode (default: 400)")
+    parser.add_argument("--llm-seconds", type=float, default=0.5,
+                        help="LLM latency of a real request, for the overhead ratio (default: 0.5)")
+    parser.add_argument("--sample-rate", type=float, default=1.0,
+                        help="Fraction of traced requests exported (default: 1, every trace)")
+    parser.add_argument("--budget-pct", type=float, default=1.0, help="Maximum overhead in %% (default: 1)")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    from src.memory.session_manager import SessionManager
+
+    agent = build_agent()
+    sessions = SessionManager(store=agent.checkpointer)
+    directory = tempfile.mkdtemp(prefix="traces-")
+    exporter = JsonlSpanExporter(os.path.join(directory, "spans.jsonl"), max_bytes=50 * 1024 * 1024)
+    tracer = Tracer(exporter, sample_rate=args.sample_rate)
+
+    # Warm caches and code paths in both modes
+    for i in range(50):
+        contextvars.copy_context().run(one_request, agent, sessions, tracer if i % 2 else None, i)
+
+    durations = {"off": [], "on": []}
+    for i in range(2 * args.requests):
+        traced = i % 2 == 1
+        # A fresh context per request, like a request task
+        duration = contextvars.copy_context().run(one_request, agent, sessions, tracer if traced else None, i // 2)
+        durations["on" if traced else "off"].append(duration)
+    exporter.close()
+
+    off = statistics.mean(durations["off"])
+    on = statistics.mean(durations["on"])
+    overhead = on - off
+    request_seconds = off + args.llm_seconds
+    percent = overhead / request_seconds * 100
+    spans = 0
+    if os.path.exists(exporter.path):
+        with open(exporter.path) as f:
+            spans = sum(1 for _ in f)
+    print(json.dumps({
+        "requests_per_mode": args.requests,
+        "pipeline_ms": {"untraced_mean": round(off * 1000, 3), "traced_mean": round(on * 1000, 3),
+                        "untraced_p50": round(statistics.median(durations["off"]) * 1000, 3),
+                        "traced_p50": round(statistics.median(durations["on"]) * 1000, 3)},
+        "overhead_us_per_request": round(overhead * 1e6, 1),
+        "overhead_pct_of_offline_pipeline": round(overhead / off * 100, 2),
+        "overhead_pct_of_request": round(percent, 3),
+        "assumed_llm_seconds": args.llm_seconds,
+        "sample_rate": args.sample_rate,
+        "spans_per_exported_request": round(spans / exporter.exported, 1) if exporter.exported else 0,
+        "traces_dropped": exporter.dropped,
+        "budget_pct": args.budget_pct,
+    }, indent=2))
+    sys.exit(0 if percent <= args.budget_pct else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Throughput of `/chat` versus the number of workers started by serve.py.
+
+Each worker serves the real FastAPI app with a stub agent: it blocks for
+`--llm-ms` like the synchronous LLM call does, then saves the turn to the
+shared conversation store. Sessions send their turns one after the other,
+so consecutive turns of a session usually land on different workers; each
+stub response carries the history length it saw, which checks that no
+worker lost a follow-up's history.
+
+Usage:
+    python -m benchmarks.worker_scaling --workers 1 2 4 --sessions 64 --turns 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+
+class StubAgent:
+    """Agent double: blocks like the LLM call, then saves the turn once."""
+
+    def __init__(self, checkpointer, llm_seconds: float):
+        self.checkpointer = checkpointer
+        self.llm_seconds = llm_seconds
+
+    def invoke_with_memory(self, messages, thread_id: str = "default"):
+        from langchain_core.messages import AIMessage
+
+        time.sleep(self.llm_seconds)
+        response = str(len(messages))
+        updated = messages + [AIMessage(content=response)]
+        self.checkpointer.save_state({
+            "messages": updated, "retrieved_docs": [], "current_query": messages[-1].content,
+            "tool_calls": []}, thread_id)
+        return response, updated
+
+
+def create_app():
+    """App factory used by the workers: the real app with the stub agent."""
+    from src.api import main as api
+
+    llm_seconds = float(os.environ.get("BENCH_LLM_MS", 50)) / 1000
+    api.preload_documents = lambda: StubAgent(api.checkpointer, llm_seconds)
+    return api.app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    # /readyz turns 200 once the background warm-up has set the agent
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                async with client.get(base_url + "/readyz") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start in time")
+
+
+async def drive(base_url: str, sessions: int, turns: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    lost = 0
+
+    async def conversation(client: aiohttp.ClientSession, session: int):
+        nonlocal lost
+        session_id = f"bench-{session}-{time.time_ns()}"
+        for turn in range(turns):
+            async with semaphore:
+                start = time.perf_counter()
+                async with client.post(base_url + "/chat", json={
+                        "session_id": session_id, "message": f"question {turn}"}) as response:
+                    body = await response.json()
+                latencies.append(time.perf_counter() - start)
+            # The stub answers with the history length it received
+            if body.get("response") != str(2 * turn + 1):
+                lost += 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(client, session) for session in range(sessions)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1),
+        "lost_history": lost,
+    }
+
+
+def run(workers: int, args) -> dict:
+    port = free_port()
+    state_dir = tempfile.mkdtemp(prefix="worker-scaling-")
+    env = {
+        **os.environ,
+        "SHARED_STATE_URL": f"sqlite:///{os.path.join(state_dir, 'state.db')}",
+        "BENCH_LLM_MS": str(args.llm_ms),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+         "--app", "benchmarks.worker_scaling:create_app", "--factory"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_ready(base_url, process))
+        result = asyncio.run(drive(base_url, args.sessions, args.turns, args.concurrency))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {"workers": workers, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput versus worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts")
+    parser.add_argument("--sessions", type=int, default=64, help="Concurrent conversations (default: 64)")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per conversation (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=32, help="In-flight requests (default: 32)")
+    parser.add_argument("--llm-ms", type=float, default=50, help="Simulated LLM call in ms (default: 50)")
+    args = parser.parse_args()
+
+    report = {"cpus": os.cpu_count(), "llm_ms": args.llm_ms,
+              "results": [run(workers, args) for workers in args.workers]}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Per-turn overhead of the WebSocket chat endpoint versus the SSE endpoint.
+
+Runs the FastAPI app in a background uvicorn server with a stub agent that
+streams a fixed number of tokens instantly, so the measured time is our own
+per-turn overhead (session lookup, request parsing, framing, transport)
+rather than LLM latency.
+
+Usage:
+    python -m benchmarks.ws_vs_sse --turns 200 --tokens 20
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+import aiohttp
+import uvicorn
+
+
+class StubAgent:
+    """Agent stand-in that streams `tokens` chunks without any I/O."""
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+
+    def count_message_tokens(self, messages):
+        return sum(len(str(message.content).split()) for message in messages)
+
+    async def invoke_with_memory_streaming(self, messages, thread_id="default", trimmed_messages=None):
+        for i in range(self.tokens):
+            yield f"token{i} "
+
+
+def start_server(port: int, tokens: int) -> uvicorn.Server:
+    """Start the API with a stub agent in a background thread."""
+    import src.api.main as api
+
+    stub = StubAgent(tokens)
+    api.preload_documents = lambda: stub
+    config = uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    # Serving starts before the background warm-up has set the agent
+    while not (server.started and api.warmup.ready):
+        if not thread.is_alive():
+            raise RuntimeError("Benchmark server failed to start")
+        time.sleep(0.05)
+    return server
+
+
+async def run_sse(base_url: str, turns: int) -> list:
+    """Run `turns` sequential turns over `/chat/stream` and return per-turn latencies."""
+    latencies = []
+    async with aiohttp.ClientSession() as session:
+        for i in range(turns):
+            start = time.perf_counter()
+            async with session.post(f"{base_url}/chat/stream",
+                                    json={"session_id": "bench-sse", "message": f"question {i}"}) as response:
+                async for line in response.content:
+                    if line.startswith(b"data: [DONE]"):
+                        break
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_ws(base_url: str, turns: int) -> list:
+    """Run `turns` sequential turns over `/ws/chat` and return per-turn latencies."""
+    latencies = []
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f"{base_url}/ws/chat?session_id=bench-ws") as ws:
+            await ws.receive_bytes()  # ready frame
+            for i in range(turns):
+                start = time.perf_counter()
+                await ws.send_str(json.dumps({"message": f"question {i}"}))
+                while True:
+                    frame = await ws.receive_bytes()
+                    if frame[0] == 0x02:
+                        break
+                latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(name: str, latencies: list) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "transport": name,
+        "turns": len(latencies),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-turn overhead of /ws/chat and /chat/stream.")
+    parser.add_argument("--turns", type=int, default=200, help="Turns per transport (default: 200)")
+    parser.add_argument("--tokens", type=int, default=20, help="Tokens streamed per turn (default: 20)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the in-process server")
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.tokens)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        sse = summarize("sse", asyncio.run(run_sse(base_url, args.turns)))
+        ws = summarize("websocket", asyncio.run(run_ws(base_url, args.turns)))
+    finally:
+        server.should_exit = True
+
+    print(json.dumps([sse, ws], indent=2))
+    print(f"WebSocket per-turn overhead is {sse['mean_ms'] / ws['mean_ms']:.1f}x lower than SSE (mean)")
+
+
+if __name__ == "__main__":
+    main()
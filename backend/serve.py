@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Lanceur de production : démarre N workers uvicorn sur un état partagé.
+
+Les sessions, les checkpoints et le cache RAG passent par le backend
+d'état partagé (SHARED_STATE_URL) dès qu'il y a plus d'un worker, afin
+qu'un message de suivi traité par un autre worker retrouve l'historique.
+
+Deux modes :
+    fork  (défaut) : le processus maître construit l'index une seule fois
+                     puis forke les workers, qui le partagent en copy-on-write ;
+                     recyclage des workers par SIGHUP, --max-requests ou --max-worker-age
+    spawn          : chaque worker uvicorn importe l'application et précharge lui-même
+
+Usage:
+    python serve.py --workers 4
+    python serve.py --workers 4 --max-requests 10000
+    SHARED_STATE_URL=redis://localhost:6379/0 python serve.py --workers 8
+    kill -HUP <pid du maître>   # recyclage progressif des workers
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import tempfile
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Logs écrits par un thread d'arrière-plan ; chaque worker forké a le sien
+from src.monitoring.structured_logging import configure_logging  # noqa: E402
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+def default_shared_state_url() -> str:
+    """URL du backend SQLite local, en mémoire partagée (/dev/shm) si disponible."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return f"sqlite:///{os.path.join(directory, 'airtel-shared-state.db')}"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Lanceur de production multi-workers.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1)),
+                        help="Nombre de workers (défaut : WEB_CONCURRENCY ou 1)")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"), help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)), help="Port d'écoute")
+    parser.add_argument("--app", default="src.api.main:app", help="Application ASGI à servir")
+    parser.add_argument("--factory", action="store_true", help="--app désigne une fabrique d'application")
+    parser.add_argument("--mode", choices=["fork", "spawn"], default="fork" if hasattr(os, "fork") else "spawn",
+                        help="fork : préchargement unique puis fork des workers (défaut) ; spawn : workers uvicorn")
+    parser.add_argument("--max-requests", type=int, default=None,
+                        help="Requêtes avant remplacement d'un worker (mode fork)")
+    parser.add_argument("--max-worker-age", type=float, default=None,
+                        help="Durée de vie maximale d'un worker en secondes (mode fork)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="Délai laissé à un worker pour terminer ses requêtes (défaut : 30 s)")
+    return parser.parse_args(argv)
+
+
+def serve_forked(args: argparse.Namespace):
+    """Précharger dans le maître puis forker les workers."""
+    if args.factory:
+        # La fabrique configure src.api.main (ex. agent de test) avant le préchargement
+        module_name, _, attribute = args.app.partition(":")
+        getattr(importlib.import_module(module_name), attribute)()
+
+    from src.api import main as api
+    from src.api.prefork import PreforkServer
+
+    PreforkServer(api, host=args.host, port=args.port, workers=args.workers,
+                  max_requests=args.max_requests, max_worker_age=args.max_worker_age,
+                  graceful_timeout=args.graceful_timeout).serve()
+
+
+def main(argv=None):
+    """Fonction principale."""
+    args = parse_args(argv)
+
+    # Plusieurs workers : l'état doit être partagé, sinon chaque worker a ses propres sessions
+    if args.workers > 1 and not os.environ.get("SHARED_STATE_URL"):
+        os.environ["SHARED_STATE_URL"] = default_shared_state_url()
+        logger.info(f"🔗 État partagé local : {os.environ['SHARED_STATE_URL']}")
+
+    logger.info(f"🚀 Démarrage de {args.workers} worker(s) sur {args.host}:{args.port} (mode {args.mode})")
+    if args.mode == "fork":
+        serve_forked(args)
+        return
+
+    import uvicorn
+    uvicorn.run(args.app, host=args.host, port=args.port, workers=args.workers,
+                log_level="info", factory=args.factory, log_config=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,30 @@
 Agent state management for LangGraph RAG agent.
 """
 
-from typing import TypedDict, List, Dict, Any
+from typing import TypedDict, List, Dict, Any, Sequence
 from langchain_core.messages import BaseMessage
 
+# Number of tool calls kept in a state; older ones are dropped
+MAX_TOOL_CALL_HISTORY = 8
+
 class AgentState(TypedDict):
     messages: List[BaseMessage]
     retrieved_docs: List[str]
     current_query: str
-    tool_calls: List[Dict[str, Any]] 
\ No newline at end of file
+    tool_calls: List[Dict[str, Any]]
+
+
+def append_tool_call(tool_calls: Sequence[Dict[str, Any]], call: Dict[str, Any],
+                     limit: int = MAX_TOOL_CALL_HISTORY) -> List[Dict[str, Any]]:
+    """
+    Append a tool call, keeping only the most recent `limit` calls.
+
+    Args:
+        tool_calls: The existing tool calls
+        call: The new tool call
+        limit: Maximum number of tool calls kept
+
+    Returns:
+        A new list of tool calls
+    """
+    return (list(tool_calls) + [call])[-limit:]
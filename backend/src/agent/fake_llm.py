@@ -0,0 +1,168 @@
+"""
+Deterministic local stand-in for the Gemini chat model.
+
+Answers from a fixed list after a configurable first-token latency, at a
+configurable token rate, and fails a configurable fraction of calls. It
+needs no API key or network, so the pipeline around the LLM (routing,
+retrieval, trimming, state, API, streaming) can be run and timed on its
+own, in benchmarks, load tests and CI. Selected with LLM_BACKEND=fake.
+"""
+
+import asyncio
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+DEFAULT_RESPONSES = [
+    "Airtel Niger propose des forfaits internet journaliers, hebdomadaires et mensuels. "
+    "Composez *141# pour voir les offres disponibles et les activer depuis votre solde principal.",
+    "Pour activer Airtel Money, rendez-vous dans une agence Airtel avec une pièce d'identité valide, "
+    "puis composez *400# pour créer votre code secret.",
+    "Les appels vers l'international sont facturés à la minute selon la destination. "
+    "Les forfaits voix internationaux réduisent ce tarif pour les pays les plus appelés.",
+]
+
+_TOKEN_SPLIT = re.compile(r"(?<=\s)")
+
+
+class FakeLLMError(RuntimeError):
+    """Failure injected by FakeChatModel (stands in for an API error)."""
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model answering canned responses with simulated latency and failures.
+
+    Responses are split into word tokens. A call waits `first_token_seconds`,
+    then emits `tokens_per_second` tokens per second (0: all at once). A
+    `failure_rate` fraction of calls fail: "error" raises at once, "timeout"
+    raises after `timeout_seconds`, "mid_stream" raises halfway through the
+    answer. The sequence of answers and failures is fixed by `seed`.
+    """
+
+    responses: List[str] = DEFAULT_RESPONSES
+    first_token_seconds: float = 0.0
+    tokens_per_second: float = 0.0
+    failure_rate: float = 0.0
+    failure_kind: str = "error"
+    timeout_seconds: float = 1.0
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr()
+    _calls: int = PrivateAttr(default=0)
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _next_call(self):
+        """Pick the answer of the next call and whether it fails."""
+        response = self.responses[self._calls % len(self.responses)]
+        self._calls += 1
+        fails = self.failure_rate > 0 and self._rng.random() < self.failure_rate
+        return _TOKEN_SPLIT.split(response), fails
+
+    def _usage(self, messages: List[BaseMessage], tokens: List[str]) -> dict:
+        input_tokens = self.get_num_tokens_from_messages(messages)
+        return {"input_tokens": input_tokens, "output_tokens": len(tokens),
+                "total_tokens": input_tokens + len(tokens)}
+
+    def _token_delay(self, index: int) -> float:
+        """Time from the first token to token `index`."""
+        return index / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens, fails = self._next_call()
+        if fails and self.failure_kind == "timeout":
+            time.sleep(self.timeout_seconds)
+            raise FakeLLMError("Simulated LLM timeout")
+        if fails:
+            raise FakeLLMError("Simulated LLM error")
+        time.sleep(self.first_token_seconds + self._token_delay(len(tokens)))
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens, fails = self._next_call()
+        if fails and self.failure_kind == "timeout":
+            await asyncio.sleep(self.timeout_seconds)
+            raise FakeLLMError("Simulated LLM timeout")
+        if fails:
+            raise FakeLLMError("Simulated LLM error")
+        await asyncio.sleep(self.first_token_seconds + self._token_delay(len(tokens)))
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens, fails = self._next_call()
+        if fails and self.failure_kind != "mid_stream":
+            time.sleep(self.timeout_seconds if self.failure_kind == "timeout" else 0)
+            raise FakeLLMError(f"Simulated LLM {self.failure_kind}")
+        time.sleep(self.first_token_seconds)
+        start = time.perf_counter()
+        for i, token in enumerate(tokens):
+            if fails and i == len(tokens) // 2:
+                raise FakeLLMError("Simulated LLM failure mid-stream")
+            delay = start + self._token_delay(i) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield self._chunk(token, i, messages, tokens)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens, fails = self._next_call()
+        if fails and self.failure_kind != "mid_stream":
+            await asyncio.sleep(self.timeout_seconds if self.failure_kind == "timeout" else 0)
+            raise FakeLLMError(f"Simulated LLM {self.failure_kind}")
+        await asyncio.sleep(self.first_token_seconds)
+        start = time.perf_counter()
+        for i, token in enumerate(tokens):
+            if fails and i == len(tokens) // 2:
+                raise FakeLLMError("Simulated LLM failure mid-stream")
+            # Sleep to each token's due time, so the rate holds whatever the consumer costs
+            delay = start + self._token_delay(i) - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield self._chunk(token, i, messages, tokens)
+
+    def _chunk(self, token: str, index: int, messages: List[BaseMessage], tokens: List[str]) -> ChatGenerationChunk:
+        # Usage is reported with the last chunk, as the Gemini client does
+        usage = self._usage(messages, tokens) if index == len(tokens) - 1 else None
+        return ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+
+    def get_num_tokens(self, text: str) -> int:
+        """Estimate tokens as about 4 characters each (the default needs a tokenizer download)."""
+        return max(len(text) // 4, 1) if text else 0
+
+    def get_num_tokens_from_messages(self, messages: List[BaseMessage], tools: Any = None) -> int:
+        """Estimate the tokens of a message list."""
+        return sum(self.get_num_tokens(str(message.content)) + 4 for message in messages)
+
+
+def create_fake_llm() -> FakeChatModel:
+    """
+    Create the fake chat model configured by the FAKE_LLM_* settings.
+
+    Returns:
+        The model
+    """
+    from src.config.settings import Settings
+    settings = Settings()
+    return FakeChatModel(first_token_seconds=settings.fake_llm_first_token_ms / 1000,
+                         tokens_per_second=settings.fake_llm_tokens_per_second,
+                         failure_rate=settings.fake_llm_failure_rate,
+                         failure_kind=settings.fake_llm_failure_kind,
+                         seed=settings.fake_llm_seed)
@@ -0,0 +1,279 @@
+"""
+Fault injection on the upstream calls (LLM, query embeddings), for chaos tests.
+
+Each upstream gets a FaultInjector drawing, per call, one fault among:
+
+    spike      : the call is delayed by a latency spike, then succeeds
+    rate_limit : the call fails at once with a 429 (RateLimitError)
+    timeout    : the call hangs for the timeout, then fails (UpstreamTimeoutError)
+    drop       : a streamed answer stops partway (StreamDroppedError); streams only
+
+FaultyChatModel and FaultyEmbeddings wrap the real clients and look their
+injector up on every call, so faults can be changed at runtime. FAULTS
+configures them at startup, as "upstream:fault=rate[@seconds],..." groups
+separated by ";", for example
+"llm:rate_limit=0.1,timeout=0.05@30,spike=0.1@3,drop=0.05;embedding:rate_limit=0.05".
+Only query embeddings are affected: the index is built before faults apply.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.monitoring.metrics import metrics
+
+metrics.describe("faults_injected_total", "Faults injected on upstream calls, by upstream and kind")
+
+UPSTREAMS = ("llm", "embedding")
+FAULT_KINDS = ("spike", "rate_limit", "timeout", "drop")
+
+
+class UpstreamError(RuntimeError):
+    """Injected upstream failure."""
+
+    status_code = 500
+
+
+class RateLimitError(UpstreamError):
+    """Injected 429 Too Many Requests."""
+
+    status_code = 429
+
+
+class UpstreamTimeoutError(UpstreamError, TimeoutError):
+    """Injected upstream timeout."""
+
+    status_code = 504
+
+
+class StreamDroppedError(UpstreamError):
+    """Injected drop of a streamed answer."""
+
+
+class FaultInjector:
+    """Draws and applies the faults of one upstream."""
+
+    def __init__(self, upstream: str, spike: float = 0.0, spike_seconds: float = 3.0, rate_limit: float = 0.0,
+                 timeout: float = 0.0, timeout_seconds: float = 30.0, drop: float = 0.0, seed: Optional[int] = None):
+        """
+        Initialize the injector.
+
+        Args:
+            upstream: "llm" or "embedding"
+            spike: Fraction of calls delayed by `spike_seconds`
+            spike_seconds: Extra latency of a spike
+            rate_limit: Fraction of calls rejected with a 429
+            timeout: Fraction of calls failing after `timeout_seconds`
+            timeout_seconds: Time a timed-out call hangs before failing
+            drop: Fraction of streamed calls cut partway
+            seed: Seed of the fault sequence
+        """
+        if spike + rate_limit + timeout + drop > 1:
+            raise ValueError(f"Fault rates of {upstream} add up to more than 1")
+        self.upstream = upstream
+        self.rates = {"spike": spike, "rate_limit": rate_limit, "timeout": timeout, "drop": drop}
+        self.spike_seconds = spike_seconds
+        self.timeout_seconds = timeout_seconds
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def draw(self, stream: bool = False) -> Optional[str]:
+        """
+        Pick the fault of the next call, counting it.
+
+        Args:
+            stream: Whether the call streams (drops only apply to streams)
+
+        Returns:
+            The fault kind, or None
+        """
+        with self.lock:
+            roll = self.rng.random()
+        for kind in FAULT_KINDS:
+            roll -= self.rates[kind]
+            if roll < 0:
+                if kind == "drop" and not stream:
+                    return None
+                metrics.inc("faults_injected_total", upstream=self.upstream, kind=kind)
+                return kind
+        return None
+
+    def _error(self, kind: str) -> UpstreamError:
+        if kind == "rate_limit":
+            return RateLimitError(f"Injected 429 from {self.upstream}")
+        return UpstreamTimeoutError(f"Injected timeout of {self.upstream} after {self.timeout_seconds}s")
+
+    def apply(self, stream: bool = False) -> bool:
+        """
+        Apply the fault of a call before it is made.
+
+        Returns:
+            True if a stream must be dropped partway
+
+        Raises:
+            UpstreamError: For rate limits and timeouts
+        """
+        kind = self.draw(stream)
+        if kind == "spike":
+            time.sleep(self.spike_seconds)
+        elif kind == "timeout":
+            time.sleep(self.timeout_seconds)
+        if kind in ("rate_limit", "timeout"):
+            raise self._error(kind)
+        return kind == "drop"
+
+    async def aapply(self, stream: bool = False) -> bool:
+        """Async version of `apply`, sleeping without blocking the event loop."""
+        kind = self.draw(stream)
+        if kind == "spike":
+            await asyncio.sleep(self.spike_seconds)
+        elif kind == "timeout":
+            await asyncio.sleep(self.timeout_seconds)
+        if kind in ("rate_limit", "timeout"):
+            raise self._error(kind)
+        return kind == "drop"
+
+
+# Injectors by upstream; replaced as a whole by configure_faults
+_injectors: Dict[str, FaultInjector] = {}
+
+
+def parse_faults(spec: str, seed: Optional[int] = None) -> Dict[str, FaultInjector]:
+    """
+    Parse a FAULTS specification.
+
+    Args:
+        spec: "upstream:fault=rate[@seconds],...;upstream:..."
+        seed: Seed of the fault sequences (each upstream gets its own)
+
+    Returns:
+        Injectors by upstream
+
+    Raises:
+        ValueError: On an unknown upstream or fault, or a malformed entry
+    """
+    injectors = {}
+    for group in filter(None, (part.strip() for part in spec.split(";"))):
+        upstream, _, faults = group.partition(":")
+        upstream = upstream.strip()
+        if upstream not in UPSTREAMS:
+            raise ValueError(f"Unknown upstream in FAULTS: {upstream}")
+        kwargs: Dict[str, float] = {}
+        for entry in filter(None, (part.strip() for part in faults.split(","))):
+            kind, _, value = entry.partition("=")
+            if kind not in FAULT_KINDS or not value:
+                raise ValueError(f"Invalid fault in FAULTS: {entry}")
+            rate, _, seconds = value.partition("@")
+            kwargs[kind] = float(rate)
+            if seconds and kind in ("spike", "timeout"):
+                kwargs[f"{kind}_seconds"] = float(seconds)
+        injectors[upstream] = FaultInjector(
+            upstream, seed=None if seed is None else seed + UPSTREAMS.index(upstream), **kwargs)
+    return injectors
+
+
+def configure_faults(spec: str, seed: Optional[int] = None) -> None:
+    """
+    Replace the injected faults (an empty spec removes them).
+
+    Args:
+        spec: FAULTS specification
+        seed: Seed of the fault sequences
+    """
+    global _injectors
+    _injectors = parse_faults(spec, seed)
+
+
+def get_injector(upstream: str) -> Optional[FaultInjector]:
+    """The injector of an upstream, or None when it has no faults."""
+    return _injectors.get(upstream)
+
+
+def configure_faults_from_settings() -> bool:
+    """
+    Configure the faults from FAULTS and FAULTS_SEED.
+
+    Returns:
+        True if fault injection is on (the upstreams must then be wrapped)
+    """
+    from src.config.settings import Settings
+    settings = Settings()
+    if not settings.faults:
+        return False
+    configure_faults(settings.faults, settings.faults_seed)
+    return True
+
+
+class FaultyChatModel(BaseChatModel):
+    """Chat model passing calls to `inner` after applying the "llm" faults."""
+
+    inner: BaseChatModel
+    upstream: str = "llm"
+
+    @property
+    def _llm_type(self) -> str:
+        return f"faulty-{self.inner._llm_type}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        injector = get_injector(self.upstream)
+        if injector is not None:
+            injector.apply()
+        return self.inner._generate(messages, stop=stop, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        injector = get_injector(self.upstream)
+        if injector is not None:
+            await injector.aapply()
+        return await self.inner._agenerate(messages, stop=stop, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        injector = get_injector(self.upstream)
+        drop = injector.apply(stream=True) if injector is not None else False
+        for i, chunk in enumerate(self.inner._stream(messages, stop=stop, **kwargs)):
+            # Dropped after a few chunks, so part of the answer has been sent
+            if drop and i == 3:
+                raise StreamDroppedError(f"Injected drop of the {self.upstream} stream")
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        injector = get_injector(self.upstream)
+        drop = await injector.aapply(stream=True) if injector is not None else False
+        i = 0
+        async for chunk in self.inner._astream(messages, stop=stop, **kwargs):
+            if drop and i == 3:
+                raise StreamDroppedError(f"Injected drop of the {self.upstream} stream")
+            i += 1
+            yield chunk
+
+    def get_num_tokens(self, text: str) -> int:
+        return self.inner.get_num_tokens(text)
+
+    def get_num_tokens_from_messages(self, messages: List[BaseMessage], tools: Any = None) -> int:
+        return self.inner.get_num_tokens_from_messages(messages)
+
+
+class FaultyEmbeddings:
+    """Embedding model applying the "embedding" faults to query embeddings."""
+
+    def __init__(self, inner: Any, upstream: str = "embedding"):
+        self.inner = inner
+        self.upstream = upstream
+
+    def embed_query(self, text: str) -> List[float]:
+        injector = get_injector(self.upstream)
+        if injector is not None:
+            injector.apply()
+        return self.inner.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
@@ -4,32 +4,45 @@ Main LangGraph RAG agent implementation.
 
 from src.tools.rag_tool import RAGTool
 from src.tools.placeholder_tools import CalculatorTool, SummarizerTool
-from src.agent.agent_state import AgentState
+from src.agent.agent_state import AgentState, append_tool_call
+from src.agent.fake_llm import create_fake_llm
+from src.agent.faults import FaultyChatModel, FaultyEmbeddings, configure_faults_from_settings
 from src.memory.checkpointer import Checkpointer
+from src.config.settings import Settings
 from src.prompts.system_prompt import AIRTEL_NIGER_OPTIMIZED_PROMPT
+from src.rag.query_popularity import get_query_popularity, normalize_query
+from src.monitoring.metrics import count_error, metrics, observe_stage, timed_stage
+from src.monitoring.tracing import add_span, fail_trace, span
 from langgraph.graph import START, StateGraph
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, trim_messages
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, trim_messages
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.runnables import RunnableConfig
 import os
 import time
 import logging
 import re
-from typing import List, Any, AsyncGenerator, Tuple, Optional
+from typing import Dict, List, Any, AsyncGenerator, Tuple, Optional
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Maximum number of tokens to keep in conversation history - OPTIMIZED FOR SPEED
 MAX_HISTORY_TOKENS = 3000
 
+# Answer given when the LLM keeps failing
+FALLBACK_RESPONSE = "I'm experiencing technical difficulties. Please try again in a moment or contact Airtel customer service for immediate assistance."
+
+
+def _token_usage(message) -> Dict[str, int]:
+    """Get the token counts reported by the LLM with a response, if any."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {key: usage[key] for key in ("input_tokens", "output_tokens") if key in usage}
+
 
 class LangGraphRAGAgent:
     """LangGraph-based RAG agent with memory, RAG tool, and LLM node."""
 
-    def __init__(self, document_path: str, model_name: str = "gemini-1.5-flash", checkpointer=None, additional_documents: Optional[List[str]] = None):
+    def __init__(self, document_path: str, model_name: str = "gemini-1.5-flash", checkpointer=None, additional_documents: Optional[List[str]] = None,
+                 index_path: Optional[str] = None, llm=None, embeddings_model=None):
         """
         Initialize the RAG agent with document path and model.
 
@@ -38,22 +51,39 @@ class LangGraphRAGAgent:
             model_name: Name of the Google Generative AI model to use
             checkpointer: Optional checkpointer instance for memory persistence
             additional_documents: List of additional document paths to load
+            index_path: Optional prebuilt index directory loaded instead of embedding the documents
+            llm: Optional chat model used instead of Gemini (e.g. FakeChatModel); defaults to the LLM_BACKEND setting
+            embeddings_model: Optional embedding model for the documents and queries (defaults to EMBEDDINGS_BACKEND)
         """
         logger.info(f"Initializing RAG agent with document: {document_path}")
         if additional_documents:
             logger.info(
                 f"Additional documents to load: {additional_documents}")
 
+        settings = Settings()
+        # Retry policy of the non-streaming LLM call
+        self.max_retries = max(settings.llm_max_retries, 1)
+        self.retry_backoff_seconds = settings.llm_retry_backoff_seconds
+
         # Initialize LLM for regular (non-streaming) calls - OPTIMIZED FOR SPEED
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            google_api_key=os.environ.get("GOOGLE_API_KEY"),
-            temperature=0.1,  # Lower temperature for faster, more consistent responses
-            top_p=0.8,  # Reduced for faster generation
-            top_k=20,  # Reduced for faster generation
-            # Reduced timeout for faster responses
-            timeout=int(os.environ.get("LLM_TIMEOUT", 60))
-        )
+        if llm is not None:
+            self.llm = llm
+        elif settings.llm_backend == "fake":
+            self.llm = create_fake_llm()
+        else:
+            self.llm = ChatGoogleGenerativeAI(
+                model=model_name,
+                google_api_key=os.environ.get("GOOGLE_API_KEY"),
+                temperature=0.1,  # Lower temperature for faster, more consistent responses
+                top_p=0.8,  # Reduced for faster generation
+                top_k=20,  # Reduced for faster generation
+                # Reduced timeout for faster responses
+                timeout=int(os.environ.get("LLM_TIMEOUT", 60))
+            )
+        # Chaos tests: upstream calls go through the injected faults (FAULTS)
+        faults_enabled = configure_faults_from_settings()
+        if faults_enabled:
+            self.llm = FaultyChatModel(inner=self.llm)
 
         # Initialize message trimmer
         self.message_trimmer = trim_messages(
@@ -65,15 +95,24 @@ class LangGraphRAGAgent:
             start_on="human"  # Start with a human message
         )
 
-        # Initialize tools with multiple documents
-        self.rag_tool = RAGTool(
-            document_path, additional_documents=additional_documents or [])
+        # Knowledge-base sources, kept for refresh_knowledge_base
+        self.document_path = document_path
+        self.additional_documents = additional_documents or []
+        self.index_path = index_path
+        self.embeddings_model = embeddings_model
+        self.faults_enabled = faults_enabled
+        self.rag_tool = self._load_rag_tool()
         self.calculator_tool = CalculatorTool()
         self.summarizer_tool = SummarizerTool(llm=self.llm)
 
-        # Initialize memory
+        # Conversation-state store shared with the API; written once per turn
         self.checkpointer = checkpointer or Checkpointer()
 
+        # Frequencies of user queries (used to prime caches on startup) and
+        # precomputed answers to popular opening questions, by normalized query
+        self.popularity = get_query_popularity()
+        self.first_turn_answers: Dict[str, str] = {}
+
         # Build workflow
         self.workflow = self._build_workflow()
         logger.info("RAG agent initialized successfully")
@@ -113,12 +152,27 @@ class LangGraphRAGAgent:
         # Default to RAG tool
         return "rag", query
 
+    def _build_llm_messages(self, context: str, trimmed_messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Assemble the messages sent to the LLM.
+
+        Args:
+            context: Tool output (retrieved chunks, calculation or summary)
+            trimmed_messages: Conversation history, already trimmed
+
+        Returns:
+            The system prompt with the context, followed by the history
+        """
+        context_message = SystemMessage(
+            content=f"{AIRTEL_NIGER_OPTIMIZED_PROMPT}\n\nRelevant Information:\n{context}")
+        return [context_message] + trimmed_messages
+
     def _build_workflow(self):
         """Build the LangGraph workflow."""
         workflow = StateGraph(state_schema=AgentState)
 
         def agent_node(state: AgentState):
-            max_retries = 3
+            max_retries = self.max_retries
             for attempt in range(max_retries):
                 try:
                     # Get the latest user message
@@ -128,35 +182,39 @@ class LangGraphRAGAgent:
                             [str(item) for item in user_message])
                     elif not isinstance(user_message, str):
                         user_message = str(user_message)
-                    logger.info(f"Processing query: {user_message}")
+                    logger.debug("Processing query: %s", user_message)
 
                     # Trim messages to prevent context window overflow
-                    trimmed_messages = self.message_trimmer.invoke(
-                        state["messages"])
-                    logger.info(
-                        f"Trimmed message history from {len(state['messages'])} to {len(trimmed_messages)} messages")
+                    with timed_stage("trim"), span("trim", messages_in=len(state["messages"])) as trim_span:
+                        trimmed_messages = self.message_trimmer.invoke(
+                            state["messages"])
+                        trim_span.set(messages_out=len(trimmed_messages))
+                    logger.debug("Trimmed message history from %d to %d messages",
+                                 len(state["messages"]), len(trimmed_messages))
 
                     # Detect which tool to use
-                    tool_name, tool_input = self._detect_tool_calls(
-                        user_message)
-                    logger.info(f"Selected tool: {tool_name}")
+                    with span("router") as router_span:
+                        tool_name, tool_input = self._detect_tool_calls(
+                            user_message)
+                        router_span.set(tool=tool_name)
+                    logger.debug("Selected tool: %s", tool_name)
 
                     # Call appropriate tool
                     if tool_name == "calculator":
                         tool_result = self.calculator_tool(tool_input)
                         context = f"Calculator result: {tool_result}"
-                        logger.info(f"Calculator result: {tool_result}")
+                        logger.debug("Calculator result: %s", tool_result)
                     elif tool_name == "summarizer":
                         tool_result = self.summarizer_tool(tool_input)
                         context = "Summary points:\n" + \
                             "\n".join([f"- {point}" for point in tool_result])
-                        logger.info(
-                            f"Summarizer result: {len(tool_result)} points")
+                        logger.debug("Summarizer result: %d points", len(tool_result))
                     else:  # Default to RAG
-                        docs = self.rag_tool(user_message)
+                        with span("retrieval") as retrieval_span:
+                            docs = self.rag_tool(user_message)
+                            retrieval_span.set(chunks=len(docs))
                         if docs and docs[0] != "No specific information found in the knowledge base for this query.":
-                            logger.info(
-                                f"Retrieved {len(docs)} relevant document chunks")
+                            logger.debug("Retrieved %d relevant document chunks", len(docs))
                             context = "\n\n".join(
                                 [f"Document chunk {i+1}:\n{doc}" for i, doc in enumerate(docs)])
                         else:
@@ -165,45 +223,21 @@ class LangGraphRAGAgent:
                         tool_result = docs
 
                     # Prepare system prompt with context
-                    system_prompt = AIRTEL_NIGER_OPTIMIZED_PROMPT
-                    context_message = SystemMessage(
-                        content=f"{system_prompt}\n\nRelevant Information:\n{context}")
-
-                    # Pass trimmed conversation history to LLM
-                    llm_messages = [context_message] + trimmed_messages
-                    logger.info("Calling LLM for response")
-                    response = self.llm.invoke(llm_messages)
+                    with span("prompt_build", context_chars=len(context)):
+                        llm_messages = self._build_llm_messages(context, trimmed_messages)
+                    logger.debug("Calling LLM for response")
+                    with timed_stage("llm"), span("llm_complete", attempt=attempt + 1) as llm_span:
+                        response = self.llm.invoke(llm_messages)
+                        llm_span.set(response_chars=len(response.content), **_token_usage(response))
 
                     # Create updated state
                     updated_state: AgentState = {
                         "messages": state["messages"] + [AIMessage(content=response.content)],
                         "retrieved_docs": tool_result if tool_name == "rag" and isinstance(tool_result, list) else state["retrieved_docs"],
                         "current_query": user_message,
-                        "tool_calls": state["tool_calls"] + [{"tool": tool_name, "result": tool_result}]
+                        "tool_calls": append_tool_call(state["tool_calls"], {"tool": tool_name, "result": tool_result})
                     }
 
-                    # Get thread_id from config if available
-                    thread_id = None
-                    try:
-                        # This is a bit of a hack to get the thread_id from the context
-                        # It assumes the thread_id is passed in the config
-                        from inspect import currentframe
-                        f = currentframe()
-                        while f:
-                            if 'config' in f.f_locals and isinstance(f.f_locals['config'], dict) and 'configurable' in f.f_locals['config']:
-                                thread_id = f.f_locals['config']['configurable'].get(
-                                    'thread_id')
-                                break
-                            f = f.f_back
-                    except Exception as e:
-                        logger.warning(
-                            f"Could not get thread_id from context: {str(e)}")
-
-                    # Save state to our manual store if thread_id is available
-                    if thread_id:
-                        self.checkpointer.save_state(
-                            dict(updated_state), thread_id)
-
                     # Return updated state
                     return updated_state
 
@@ -211,12 +245,15 @@ class LangGraphRAGAgent:
                     logger.error(
                         f"Error in agent node (attempt {attempt+1}/{max_retries}): {str(e)}")
                     if attempt < max_retries - 1:
-                        wait_time = 2 ** attempt
-                        logger.info(f"Retrying in {wait_time} seconds...")
+                        metrics.inc("retries_total", operation="agent_node")
+                        wait_time = self.retry_backoff_seconds * 2 ** attempt
+                        logger.info("Retrying in %.1f seconds...", wait_time)
                         time.sleep(wait_time)
                         continue
                     else:
-                        fallback_response = "I'm experiencing technical difficulties. Please try again in a moment or contact Airtel customer service for immediate assistance."
+                        fallback_response = FALLBACK_RESPONSE
+                        count_error("llm_fallback")
+                        fail_trace("llm_fallback")
                         logger.error(
                             "Max retries reached, returning fallback response")
                         return {
@@ -230,9 +267,98 @@ class LangGraphRAGAgent:
         workflow.add_node("agent", agent_node)
         workflow.add_edge(START, "agent")
 
-        # Compile workflow with checkpointer
+        # Compile workflow; the conversation store already holds the full history,
+        # so no separate LangGraph saver is attached unless the store provides one
         return workflow.compile(checkpointer=self.checkpointer.get_memory())
 
+    def _load_rag_tool(self) -> RAGTool:
+        """Build the retrieval tool from the knowledge-base sources, from the prebuilt index when there is one."""
+        if self.index_path and os.path.isdir(self.index_path):
+            logger.info(f"Loading prebuilt index from {self.index_path}")
+            rag_tool = RAGTool.load(self.index_path, self.document_path)
+        else:
+            rag_tool = RAGTool(self.document_path, additional_documents=self.additional_documents,
+                               embeddings_model=self.embeddings_model)
+        if self.faults_enabled:
+            vector_store = rag_tool.vector_store
+            vector_store.embeddings_model = FaultyEmbeddings(vector_store.embeddings_model)
+        return rag_tool
+
+    def refresh_knowledge_base(self, reload: bool = True) -> None:
+        """
+        Drop everything derived from the previous knowledge base, after it changed.
+
+        Clears the RAG cache (shared entries included) and the precomputed
+        first-turn answers, which would otherwise keep serving answers built
+        from the old documents; prime them again afterwards.
+
+        Args:
+            reload: Rebuild the retrieval tool from the sources (re-reading the
+                index artifact or re-embedding the documents) before clearing
+        """
+        self.first_turn_answers = {}
+        if reload:
+            rag_tool = self._load_rag_tool()
+            # Swapped in one assignment: requests in flight finish on the old index
+            old_tool, self.rag_tool = self.rag_tool, rag_tool
+            if old_tool.cache:
+                old_tool.cache.clear()
+        if self.rag_tool.cache:
+            self.rag_tool.cache.clear()
+        logger.info("Knowledge base refreshed: %d chunks, caches and precomputed answers cleared",
+                    self.rag_tool.num_chunks)
+
+    def precompute_first_turn(self, query: str) -> Optional[str]:
+        """
+        Compute the answer to a query asked as the first message of a session.
+
+        New sessions opening with the same question (up to normalization) get
+        this answer without a retrieval or LLM call.
+
+        Args:
+            query: The opening question
+
+        Returns:
+            The answer, or None if the LLM failed
+        """
+        state: AgentState = {
+            "messages": [HumanMessage(content=query)],
+            "retrieved_docs": [],
+            "current_query": query,
+            "tool_calls": []
+        }
+        config: RunnableConfig = {"configurable": {"thread_id": f"prime-{normalize_query(query)}"}}
+        answer = self.workflow.invoke(state, config)["messages"][-1].content
+        if answer == FALLBACK_RESPONSE:
+            return None
+        self.first_turn_answers[normalize_query(query)] = answer
+        return answer
+
+    def _first_turn_answer(self, messages) -> Optional[str]:
+        """Record the user query, and get the precomputed answer if it opens a session."""
+        if not messages:
+            return None
+        self.popularity.record(str(messages[-1].content))
+        if len(messages) != 1 or not self.first_turn_answers:
+            return None
+        answer = self.first_turn_answers.get(normalize_query(str(messages[0].content)))
+        if answer is not None:
+            metrics.inc("first_turn_answers_total")
+            logger.debug("Serving precomputed answer to an opening question")
+        return answer
+
+    def _save_first_turn(self, messages, answer: str, thread_id: str) -> List[BaseMessage]:
+        """Save a turn answered from the precomputed answers."""
+        updated_messages = list(messages) + [AIMessage(content=answer)]
+        with span("state_save", messages=len(updated_messages), precomputed=True):
+            self.checkpointer.save_state({
+                "messages": updated_messages,
+                "retrieved_docs": [],
+                "current_query": messages[-1].content,
+                "tool_calls": []
+            }, thread_id)
+        return updated_messages
+
     def invoke(self, query: str, thread_id: str = "default"):
         """
         Invoke the agent with a single query.
@@ -244,8 +370,8 @@ class LangGraphRAGAgent:
         Returns:
             Agent response text
         """
-        logger.info(
-            f"Invoking agent with query: {query} (thread: {thread_id})")
+        logger.debug("Invoking agent with query: %s (thread: %s)", query, thread_id)
+        self.popularity.record(query)
         state: AgentState = {
             "messages": [HumanMessage(content=query)],
             "retrieved_docs": [],
@@ -254,6 +380,8 @@ class LangGraphRAGAgent:
         }
         config: RunnableConfig = {"configurable": {"thread_id": thread_id}}
         result = self.workflow.invoke(state, config)
+        with span("state_save", messages=len(result["messages"])):
+            self.checkpointer.save_state(dict(result), thread_id)
         return result["messages"][-1].content
 
     def invoke_with_memory(self, messages, thread_id: str = "default"):
@@ -267,9 +395,12 @@ class LangGraphRAGAgent:
         Returns:
             Tuple of (response text, updated messages)
         """
+        answer = self._first_turn_answer(messages)
+        if answer is not None:
+            return answer, self._save_first_turn(messages, answer, thread_id)
+
         query = messages[-1].content if messages else ""
-        logger.info(
-            f"Invoking agent with message history (thread: {thread_id})")
+        logger.debug("Invoking agent with message history (thread: %s)", thread_id)
         state: AgentState = {
             "messages": messages,
             "retrieved_docs": [],
@@ -278,9 +409,23 @@ class LangGraphRAGAgent:
         }
         config: RunnableConfig = {"configurable": {"thread_id": thread_id}}
         result = self.workflow.invoke(state, config)
+        with span("state_save", messages=len(result["messages"])):
+            self.checkpointer.save_state(dict(result), thread_id)
         updated_messages = result["messages"]
         return result["messages"][-1].content, updated_messages
 
+    def count_message_tokens(self, messages: List[BaseMessage]) -> int:
+        """
+        Count the tokens of a list of messages with the LLM's tokenizer.
+
+        Args:
+            messages: Messages to count
+
+        Returns:
+            Number of tokens
+        """
+        return self.llm.get_num_tokens_from_messages(messages)
+
     async def _process_query_and_get_context(self, query: str, messages: List[HumanMessage]) -> Tuple[str, Any]:
         """
         Process a query and get the context for LLM.
@@ -292,29 +437,28 @@ class LangGraphRAGAgent:
         Returns:
             Tuple of (context, tool_result)
         """
-        # Trim messages to prevent context window overflow
-        trimmed_messages = self.message_trimmer.invoke(messages)
-        logger.info(
-            f"Trimmed message history from {len(messages)} to {len(trimmed_messages)} messages for streaming")
-
         # Detect which tool to use
-        tool_name, tool_input = self._detect_tool_calls(query)
-        logger.info(f"Selected tool: {tool_name}")
+        with span("router") as router_span:
+            tool_name, tool_input = self._detect_tool_calls(query)
+            router_span.set(tool=tool_name)
+        logger.debug("Selected tool: %s", tool_name)
 
         # Call appropriate tool
         if tool_name == "calculator":
             tool_result = self.calculator_tool(tool_input)
             context = f"Calculator result: {tool_result}"
-            logger.info(f"Calculator result: {tool_result}")
+            logger.debug("Calculator result: %s", tool_result)
         elif tool_name == "summarizer":
             tool_result = self.summarizer_tool(tool_input)
             context = "Summary points:\n" + \
                 "\n".join([f"- {point}" for point in tool_result])
-            logger.info(f"Summarizer result: {len(tool_result)} points")
+            logger.debug("Summarizer result: %d points", len(tool_result))
         else:  # Default to RAG
-            docs = self.rag_tool(query)
+            with span("retrieval") as retrieval_span:
+                docs = self.rag_tool(query)
+                retrieval_span.set(chunks=len(docs))
             if docs and docs[0] != "No specific information found in the knowledge base for this query.":
-                logger.info(f"Retrieved {len(docs)} relevant document chunks")
+                logger.debug("Retrieved %d relevant document chunks", len(docs))
                 context = "\n\n".join(
                     [f"Document chunk {i+1}:\n{doc}" for i, doc in enumerate(docs)])
             else:
@@ -324,6 +468,34 @@ class LangGraphRAGAgent:
 
         return context, tool_result
 
+    async def _stream_llm(self, llm_messages: List[BaseMessage]) -> AsyncGenerator[str, None]:
+        """
+        Stream the LLM's answer, timing the first token and the complete generation.
+
+        Args:
+            llm_messages: Prompt messages
+
+        Yields:
+            Text chunks of the answer
+        """
+        llm_start = time.perf_counter()
+        chunks = 0
+        response_chars = 0
+        usage: Dict[str, int] = {}
+        # Stream the response using the correct approach for Google's Generative AI
+        async for chunk in self.llm.astream(llm_messages):
+            usage = _token_usage(chunk) or usage
+            if hasattr(chunk, 'content'):
+                content = chunk.content
+                if content and isinstance(content, str):
+                    if not chunks:
+                        add_span("llm_first_token", llm_start)
+                    chunks += 1
+                    response_chars += len(content)
+                    yield content
+        observe_stage("llm", time.perf_counter() - llm_start)
+        add_span("llm_complete", llm_start, chunks=chunks, response_chars=response_chars, **usage)
+
     async def invoke_with_streaming(self, query: str, thread_id: str = "default") -> AsyncGenerator[str, None]:
         """
         Invoke the agent with streaming response.
@@ -335,20 +507,11 @@ class LangGraphRAGAgent:
         Yields:
             Chunks of the response as they are generated
         """
-        logger.info(
-            f"Invoking agent with streaming for query: {query} (thread: {thread_id})")
+        logger.debug("Invoking agent with streaming for query: %s (thread: %s)", query, thread_id)
+        self.popularity.record(query)
 
-        # Get conversation state from memory
-        config: RunnableConfig = {"configurable": {"thread_id": thread_id}}
-        try:
-            state = self.checkpointer.get_memory().get(config)
-        except Exception as e:
-            logger.warning(f"Could not load from memory: {str(e)}")
-            state = None
-
-        # If not found in LangGraph memory, try our manual store
-        if state is None:
-            state = self.checkpointer.get_state(thread_id)
+        # Get conversation state from the store
+        state = self.checkpointer.get_state(thread_id)
 
         # Initialize state if it doesn't exist
         if state is None:
@@ -361,65 +524,65 @@ class LangGraphRAGAgent:
             }
         else:
             # Add the new message to existing state
-            messages = state.get("messages", []) + \
+            # Stored states are read-only; build new lists for this turn
+            messages = list(state.get("messages", [])) + \
                 [HumanMessage(content=query)]
             state = {
                 "messages": messages,
-                "retrieved_docs": state.get("retrieved_docs", []),
+                "retrieved_docs": list(state.get("retrieved_docs", [])),
                 "current_query": query,
-                "tool_calls": state.get("tool_calls", [])
+                "tool_calls": list(state.get("tool_calls", []))
             }
 
         try:
             # Process query and get context
             context, tool_result = await self._process_query_and_get_context(query, messages)
 
-            # Prepare system prompt with context
-            system_prompt = AIRTEL_NIGER_OPTIMIZED_PROMPT
-            context_message = SystemMessage(
-                content=f"{system_prompt}\n\nRelevant Information:\n{context}")
-
             # Trim messages to prevent context window overflow
-            trimmed_messages = self.message_trimmer.invoke(messages)
+            with timed_stage("trim"), span("trim", messages_in=len(messages)) as trim_span:
+                trimmed_messages = self.message_trimmer.invoke(messages)
+                trim_span.set(messages_out=len(trimmed_messages))
 
-            # Pass trimmed conversation history to LLM
-            llm_messages = [context_message] + trimmed_messages
-            logger.info("Streaming LLM response")
+            # Prepare system prompt with context
+            with span("prompt_build", context_chars=len(context)):
+                llm_messages = self._build_llm_messages(context, trimmed_messages)
+            logger.debug("Streaming LLM response")
 
-            # Stream the response using the correct approach for Google's Generative AI
             full_response = ""
-            async for chunk in self.llm.astream(llm_messages):
-                if hasattr(chunk, 'content'):
-                    content = chunk.content
-                    if content and isinstance(content, str):
-                        full_response += content
-                        yield content
+            async for content in self._stream_llm(llm_messages):
+                full_response += content
+                yield content
 
             # Update state with the complete response
             state["messages"].append(AIMessage(content=full_response))
             state["retrieved_docs"] = tool_result if isinstance(
                 tool_result, list) else state["retrieved_docs"]
-            state["tool_calls"].append({"tool": "rag", "result": tool_result})
+            state["tool_calls"] = append_tool_call(state["tool_calls"], {"tool": "rag", "result": tool_result})
 
-            # Save updated state using our manual method
-            self.checkpointer.save_state(state, thread_id)
+            # Save updated state, once for the turn
+            with span("state_save", messages=len(state["messages"])):
+                self.checkpointer.save_state(state, thread_id)
 
         except Exception as e:
             logger.error(f"Error in streaming response: {str(e)}")
-            fallback_response = "I'm experiencing technical difficulties. Please try again in a moment or contact Airtel customer service for immediate assistance."
+            count_error("llm_fallback")
+            fail_trace("llm_fallback")
+            fallback_response = FALLBACK_RESPONSE
             yield fallback_response
 
             # Update state with fallback response
             state["messages"].append(AIMessage(content=fallback_response))
             self.checkpointer.save_state(state, thread_id)
 
-    async def invoke_with_memory_streaming(self, messages, thread_id: str = "default") -> AsyncGenerator[str, None]:
+    async def invoke_with_memory_streaming(self, messages, thread_id: str = "default",
+                                           trimmed_messages: Optional[List[BaseMessage]] = None) -> AsyncGenerator[str, None]:
         """
         Invoke the agent with a full message history and streaming response.
 
         Args:
             messages: List of message objects
             thread_id: Thread ID for conversation memory
+            trimmed_messages: Optional pre-trimmed history window; trimmed here when omitted
 
         Yields:
             Chunks of the response as they are generated
@@ -428,34 +591,36 @@ class LangGraphRAGAgent:
             # Instead of returning a value, just don't yield anything
             return
 
+        answer = self._first_turn_answer(messages)
+        if answer is not None:
+            yield answer
+            self._save_first_turn(messages, answer, thread_id)
+            return
+
         query = messages[-1].content
-        logger.info(
-            f"Invoking agent with streaming and message history (thread: {thread_id})")
+        logger.debug("Invoking agent with streaming and message history (thread: %s)", thread_id)
 
         try:
             # Process query and get context
             context, tool_result = await self._process_query_and_get_context(query, messages)
 
-            # Prepare system prompt with context
-            system_prompt = AIRTEL_NIGER_OPTIMIZED_PROMPT
-            context_message = SystemMessage(
-                content=f"{system_prompt}\n\nRelevant Information:\n{context}")
-
             # Trim messages to prevent context window overflow
-            trimmed_messages = self.message_trimmer.invoke(messages)
+            if trimmed_messages is None:
+                with timed_stage("trim"), span("trim", messages_in=len(messages)) as trim_span:
+                    trimmed_messages = self.message_trimmer.invoke(messages)
+                    trim_span.set(messages_out=len(trimmed_messages))
+            logger.debug("Trimmed message history from %d to %d messages for streaming",
+                         len(messages), len(trimmed_messages))
 
-            # Pass trimmed conversation history to LLM
-            llm_messages = [context_message] + trimmed_messages
-            logger.info("Streaming LLM response")
+            # Prepare system prompt with context
+            with span("prompt_build", context_chars=len(context)):
+                llm_messages = self._build_llm_messages(context, trimmed_messages)
+            logger.debug("Streaming LLM response")
 
-            # Stream the response using the correct approach for Google's Generative AI
             full_response = ""
-            async for chunk in self.llm.astream(llm_messages):
-                if hasattr(chunk, 'content'):
-                    content = chunk.content
-                    if content and isinstance(content, str):
-                        full_response += content
-                        yield content
+            async for content in self._stream_llm(llm_messages):
+                full_response += content
+                yield content
 
             # Update messages with the complete response
             updated_messages = messages + [AIMessage(content=full_response)]
@@ -468,10 +633,21 @@ class LangGraphRAGAgent:
                 "tool_calls": [{"tool": "rag", "result": tool_result}]
             }
 
-            # Save updated state using our manual method
-            self.checkpointer.save_state(dict(state), thread_id)
+            # Save updated state, once for the turn
+            with span("state_save", messages=len(updated_messages)):
+                self.checkpointer.save_state(dict(state), thread_id)
 
         except Exception as e:
             logger.error(f"Error in streaming response with memory: {str(e)}")
-            fallback_response = "I'm experiencing technical difficulties. Please try again in a moment or contact Airtel customer service for immediate assistance."
+            count_error("llm_fallback")
+            fail_trace("llm_fallback")
+            fallback_response = FALLBACK_RESPONSE
             yield fallback_response
+
+            # Save the turn with the fallback response
+            self.checkpointer.save_state({
+                "messages": messages + [AIMessage(content=fallback_response)],
+                "retrieved_docs": [],
+                "current_query": query,
+                "tool_calls": []
+            }, thread_id)
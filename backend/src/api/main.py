@@ -2,18 +2,34 @@
 FastAPI endpoint for LangGraph RAG agent.
 """
 
+import asyncio
+import hmac
 import logging
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import HTTPException, Header, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
 import os
+import threading
 from datetime import datetime
-from langchain_core.messages import HumanMessage, AIMessage
-from src.agent.rag_agent import LangGraphRAGAgent
+from typing import Optional
+from langchain_core.messages import HumanMessage
 from src.memory.session_manager import SessionManager
-from src.memory.checkpointer import Checkpointer
+from src.memory.checkpointer import create_checkpointer
+from src.memory.shared_state import get_shared_state
 from src.config.settings import Settings
+from src.api.stream_buffer import StreamRegistry, StreamGapError, GenerationBuffer, parse_last_event_id
+from src.api.ws_chat import ChatConnection
+from src.api.warmup import Warmup
+from src.api.request_id import RequestIdMiddleware
+from src.rag.query_popularity import get_query_popularity, normalize_query
+from src.monitoring.metrics import count_error, current_route, metrics, observe_stage
+from src.monitoring.loop_monitor import loop_monitor
+from src.monitoring.profiling import profiler
+from src.monitoring.structured_logging import configure_logging, dropped_records
+from src.monitoring.tracing import current_request_id, span, tracer
 from pydantic import BaseModel
 from fastapi import FastAPI
 from dotenv import load_dotenv
@@ -21,12 +37,37 @@ import time
 load_dotenv()
 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Configure logging (JSON records written by a background thread; no-op if the launcher did it)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Airtel RAG Agent API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start serving at once and warm up in the background; flush the store on shutdown."""
+    logger.info("Starting Airtel RAG Agent API")
+    configure_warmup()
+    # Lag of this worker's event loop, in /metrics and /performance
+    loop_monitor.start()
+    # /livez answers during warm-up; /readyz turns 200 once the required stages are done
+    warmup_task = asyncio.create_task(run_in_threadpool(warmup.run))
+
+    yield
+
+    logger.info("Shutting down Airtel RAG Agent API")
+    if not warmup_task.done():
+        logger.warning("Shutting down before warm-up finished")
+
+    # Flush buffered conversation writes to disk, and keep the query
+    # frequencies for the next start's cache priming
+    if hasattr(checkpointer, "close"):
+        checkpointer.close()
+    get_query_popularity().save()
+    tracer.close()
+    await loop_monitor.stop()
+
+
+app = FastAPI(title="Airtel RAG Agent API", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -35,7 +76,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    # Lets browsers read the request ID to report it, and the ID of a requested profile
+    expose_headers=["X-Request-ID", "X-Profile-Id"],
 )
+# Request ID in every response (X-Request-ID), also the trace ID of the request's spans
+app.add_middleware(RequestIdMiddleware)
 
 # Load settings
 settings = Settings()
@@ -44,18 +89,41 @@ settings = Settings()
 session_timeout = settings.session_timeout_minutes
 logger.info(f"Using session timeout of {session_timeout} minutes")
 
-# Initialize session manager with configured timeout
-session_manager = SessionManager(timeout_minutes=session_timeout)
-
-# Initialize checkpointer for in-memory short-term memory
-checkpointer = Checkpointer(db_path=settings.checkpoint_db_path)
-logger.info("Using in-memory checkpointer for short-term memory")
-
-# Global variable to store the agent
-# agent = None
-
-# Performance tracking
-request_times = []
+# Initialize checkpointer: the single conversation-state store shared by the API and the agent
+checkpointer = create_checkpointer(
+    settings.checkpoint_db_path,
+    cache_size=settings.checkpoint_cache_size,
+    memory_budget_bytes=settings.memory_budget_mb * 1024 * 1024,
+    max_session_messages=settings.session_max_messages,
+    max_session_bytes=settings.session_max_kb * 1024,
+    spill_dir=settings.session_spill_dir,
+    shared_state=get_shared_state(),
+    session_ttl_seconds=session_timeout * 60)
+if settings.shared_state_url:
+    logger.info(f"Using shared checkpointer at {settings.shared_state_url}")
+elif settings.checkpoint_db_path:
+    logger.info(f"Using SQLite checkpointer at {settings.checkpoint_db_path}")
+else:
+    logger.info("Using in-memory checkpointer for short-term memory")
+
+# Initialize session manager with configured timeout on top of the same store
+session_manager = SessionManager(timeout_minutes=session_timeout, store=checkpointer)
+
+# Registry of resumable SSE generations; per process, so with several workers
+# a Last-Event-ID resume must reach the worker that started the stream
+stream_registry = StreamRegistry(
+    max_events=settings.stream_buffer_max_events,
+    max_completed=settings.stream_buffer_max_completed,
+    completed_ttl_seconds=settings.stream_buffer_ttl_seconds)
+
+# Global variable to store the agent (set by the warm-up, or before it by a
+# launcher that preloads once and forks workers)
+agent = None
+agent_lock = threading.Lock()
+
+# Background warm-up reported by /readyz (stages added by configure_warmup)
+warmup = Warmup()
+started_at = time.time()
 
 # HTTP timeout settings
 HTTP_TIMEOUT = int(os.environ.get("HTTP_TIMEOUT", 30)
@@ -67,6 +135,10 @@ def preload_documents():
     Preload static documents to warm up the RAG system and improve response times.
     This function loads all static documents and performs initial embeddings.
     """
+    # Imported here: the agent pulls in langgraph, the Google clients and faiss,
+    # which a cold start should not pay for before serving its first request
+    from src.agent.rag_agent import LangGraphRAGAgent
+
     logger.info("Starting document preloading for performance optimization...")
     start_time = time.time()
 
@@ -87,12 +159,7 @@ def preload_documents():
         # Initialize RAG agent with single document
         global agent
         agent = LangGraphRAGAgent(
-            document_path, model_name, checkpointer=checkpointer)
-
-        # Perform a test query to warm up the system
-        logger.info("Performing test query to warm up embeddings and cache...")
-        test_query = "Airtel Niger services"
-        agent.rag_tool(test_query)
+            document_path, model_name, checkpointer=checkpointer, index_path=settings.index_path)
 
         preload_time = time.time() - start_time
         logger.info(
@@ -104,14 +171,110 @@ def preload_documents():
         return agent
 
     except Exception as e:
+        # No second, identical construction attempt here: the warm-up retries
+        # with backoff and /readyz reports the failure
         logger.error(f"Error during document preloading: {str(e)}")
-        # Fallback: initialize agent without preloading
-        document_path = os.environ.get(
-            "DOCUMENT_PATH", "src/rag/static_document.txt")
-        model_name = os.environ.get("MODEL_NAME", "gemini-1.5-flash")
-        agent = LangGraphRAGAgent(
-            document_path, model_name, checkpointer=checkpointer)
-        return agent
+        return None
+
+
+def load_agent():
+    """
+    Build the agent if it does not exist yet (cold start mode).
+
+    Returns:
+        The agent, or None if it could not be built
+    """
+    global agent
+    with agent_lock:
+        if agent is None:
+            agent = preload_documents()
+    return agent
+
+
+def warm_index():
+    """Warm-up stage: build the agent, loading or embedding the index."""
+    if agent is not None:
+        return "inherited from the launcher"
+    if load_agent() is None:
+        raise RuntimeError("RAG Agent could not be initialized")
+    return {"chunks": getattr(getattr(agent, "rag_tool", None), "num_chunks", None)}
+
+
+def warm_llm():
+    """Warm-up stage: open the LLM client's connection with a minimal call."""
+    llm = getattr(agent, "llm", None)
+    if llm is None:
+        return "no LLM client"
+    llm.invoke("OK")
+    return "connected"
+
+
+def warm_cache():
+    """
+    Warm-up stage: prime the caches with the configured and the most frequent queries.
+
+    Called again by refresh_knowledge_base, once the RAG cache and the
+    precomputed answers are cleared, so the first users after the change
+    also hit warm caches.
+    """
+    rag_tool = getattr(agent, "rag_tool", None)
+    if rag_tool is None:
+        return "no retrieval tool"
+    popular = [query for query, _ in get_query_popularity().top(settings.prime_top_n)]
+    queries = list(dict.fromkeys(normalize_query(query) for query in settings.warmup_queries + popular))
+    for query in queries:
+        rag_tool(query)
+
+    answers = 0
+    if settings.prime_answers and hasattr(agent, "precompute_first_turn"):
+        for query in popular:
+            if agent.precompute_first_turn(query) is not None:
+                answers += 1
+    return {"queries": len(queries), "popular": len(popular), "answers": answers}
+
+
+def refresh_knowledge_base(reload: bool = True):
+    """
+    Apply a knowledge-base change: reload the index, drop what was derived from the old one, prime again.
+
+    Args:
+        reload: Rebuild the retrieval tool from DOCUMENT_PATH / INDEX_PATH first
+
+    Returns:
+        The cache priming summary of warm_cache
+    """
+    if agent is None:
+        raise RuntimeError("RAG Agent is not initialized")
+    agent.refresh_knowledge_base(reload=reload)
+    return warm_cache()
+
+
+def configure_warmup():
+    """Add the warm-up stages for this process."""
+    if warmup.stages:
+        return
+    warmup.add_stage("index", warm_index, retries=settings.warmup_retries)
+    warmup.add_stage("llm", warm_llm, required=False)
+    warmup.add_stage("cache", warm_cache, required=False)
+
+    if settings.cold_start and agent is None:
+        # Serverless: the first chat request builds the agent (see ensure_agent)
+        for name in ("index", "llm", "cache"):
+            warmup.skip(name, "cold start: built on the first chat request")
+    elif not settings.warmup_llm:
+        warmup.skip("llm", "disabled by WARMUP_LLM")
+
+
+async def ensure_agent():
+    """
+    Get the agent, building it off the event loop on first use in cold start mode.
+
+    Returns:
+        The agent, or None if it is not initialized
+    """
+    if agent is None and settings.cold_start:
+        await run_in_threadpool(load_agent)
+    return agent
 
 
 class ChatRequest(BaseModel):
@@ -133,125 +296,292 @@ class SessionInfo(BaseModel):
 @app.get("/")
 async def root():
     """Health check endpoint for Vercel"""
-    return {"status": "ok", "message": "Airtel RAG Agent API is running"}
+    return {"status": "ok", "message": "Airtel RAG Agent API is running", "ready": warmup.ready}
+
+
+@app.get("/livez")
+async def livez():
+    """
+    Liveness probe: the process serves requests, whether or not it is warmed up.
+
+    Returns:
+        Liveness status and uptime
+    """
+    return {"status": "alive", "uptime_seconds": round(time.time() - started_at, 3)}
+
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: 200 once the required warm-up stages are done, 503 before.
+
+    Returns:
+        Warm-up progress with per-stage status and timings
+    """
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, response: Response, x_profile_token: Optional[str] = Header(None)):
     """
     Chat endpoint for the RAG agent (non-streaming).
 
     Args:
         request: ChatRequest with session_id and message
+        response: Response whose headers carry the profile ID when the request is profiled
+        x_profile_token: Optional admin `X-Profile-Token` header requesting a profile
 
     Returns:
         ChatResponse with the agent's response
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
+    route = current_route.set("/chat")
+    trace = tracer.start_trace("/chat", message=request.message, session_id=request.session_id)
+    profile = profiler.start("/chat", current_request_id.get() or "", x_profile_token)
+    if profile is not None:
+        response.headers["X-Profile-Id"] = profile.name
+    http_status = 500
     try:
         # Check if agent is initialized
+        await ensure_agent()
         if agent is None:
+            count_error("unavailable")
             raise HTTPException(
                 status_code=503, detail="RAG Agent is not initialized")
 
         session_id = request.session_id
         user_message = request.message
-        logger.info(f"Received chat request for session {session_id}")
+        logger.debug("Received chat request for session %s", session_id)
 
         # Get message history for this session
-        messages = session_manager.get_session(session_id)
+        with span("session_load") as load_span:
+            messages = session_manager.get_session(session_id)
+            load_span.set(messages=len(messages))
         messages.append(HumanMessage(content=user_message))
 
-        # Invoke agent with memory
-        response, updated_messages = agent.invoke_with_memory(
+        # Invoke agent with memory; the agent saves the turn to the shared store
+        answer, _ = agent.invoke_with_memory(
             messages, thread_id=session_id)
 
-        # Update session history
-        session_manager.update_session(session_id, updated_messages)
-
-        # Also save to the agent's checkpointer for consistency
-        state = {
-            "messages": updated_messages,
-            "retrieved_docs": [],
-            "current_query": user_message,
-            "tool_calls": []
-        }
-        agent.checkpointer.save_state(state, thread_id=session_id)
-
         # Track performance
-        response_time = time.time() - start_time
-        request_times.append(response_time)
-        if len(request_times) > 100:  # Keep only last 100 requests
-            request_times.pop(0)
-
-        logger.info(
-            f"Successfully processed chat request for session {session_id} in {response_time:.2f}s")
-        return {"response": response, "session_id": session_id}
-
+        response_time = time.perf_counter() - start_time
+        observe_stage("total", response_time)
+        http_status = 200
+        metrics.inc("chat_requests_total", route="/chat", status="200")
+
+        logger.info("Processed chat request in %.2fs", response_time,
+                    extra={"session_id": session_id, "duration_ms": round(response_time * 1000, 1)})
+        return {"response": answer, "session_id": session_id}
+
+    except HTTPException as e:
+        http_status = e.status_code
+        metrics.inc("chat_requests_total", route="/chat", status=str(e.status_code))
+        raise
     except Exception as e:
-        response_time = time.time() - start_time
+        response_time = time.perf_counter() - start_time
+        count_error("exception")
+        metrics.inc("chat_requests_total", route="/chat", status="500")
         logger.error(
             f"Error processing chat request in {response_time:.2f}s: {str(e)}")
         raise HTTPException(
             status_code=500, detail=f"Error processing request: {str(e)}")
+    finally:
+        tracer.finish_trace(trace, "ok" if http_status == 200 else "error", http_status=http_status)
+        profiler.finish(profile)
+        current_route.reset(route)
+
+
+def _sse_events(buffer: GenerationBuffer, after_seq: int = -1):
+    """
+    Render a generation buffer as SSE events, starting after `after_seq`.
+
+    Args:
+        buffer: The generation buffer to read from
+        after_seq: Last sequence number already delivered to the client
+
+    Returns:
+        Async generator of SSE-formatted events
+    """
+    async def event_generator():
+        try:
+            async for seq, chunk in buffer.iter_from(after_seq):
+                yield f"id: {buffer.event_id(seq)}\ndata: {chunk}\n\n"
+        except StreamGapError as e:
+            logger.warning(
+                f"Cannot resume stream for session {buffer.session_id}: {str(e)}")
+            yield "event: error\ndata: [RESUME_GAP]\n\n"
+            return
+
+        if buffer.error is not None:
+            # The generation failed or was cut off: what was sent is not a complete answer
+            yield f"id: {buffer.event_id(buffer.next_seq)}\nevent: error\ndata: [GENERATION_ERROR]\n\n"
+            return
+
+        # Send a completion event
+        yield f"id: {buffer.event_id(buffer.next_seq)}\ndata: [DONE]\n\n"
+
+    return event_generator()
+
+
+async def _timed_generation(producer, start_time: float, trace=None, profile=None):
+    """Pass a generation through, recording its time to first token and total time, then closing its trace and profile."""
+    first_chunk = True
+    status = "error"
+    # Runs in the generation task, which the request's profile must follow
+    profiler.attach(profile)
+    try:
+        async for chunk in producer:
+            if first_chunk:
+                observe_stage("ttft", time.perf_counter() - start_time)
+                first_chunk = False
+            yield chunk
+        observe_stage("total", time.perf_counter() - start_time)
+        status = "ok"
+    finally:
+        tracer.finish_trace(trace, status)
+        profiler.finish(profile)
 
 
 @app.post("/chat/stream")
-async def chat_stream_endpoint(request: ChatRequest):
+async def chat_stream_endpoint(request: ChatRequest, last_event_id: Optional[str] = Header(None),
+                               x_profile_token: Optional[str] = Header(None)):
     """
     Streaming chat endpoint for the RAG agent.
 
+    The generation runs in the background and is buffered per session and
+    turn. A reconnect carrying a `Last-Event-ID` header resumes from that
+    event, attaching to the still-running generation if there is one,
+    instead of starting a new LLM call.
+
     Args:
         request: ChatRequest with session_id and message
+        last_event_id: Optional `Last-Event-ID` header from a reconnecting client
+        x_profile_token: Optional admin `X-Profile-Token` header requesting a profile
 
     Returns:
         StreamingResponse with the agent's response chunks
     """
+    start_time = time.perf_counter()
+    # Set for the rest of this request's task; the generation task inherits them
+    current_route.set("/chat/stream")
+    trace = tracer.start_trace("/chat/stream", message=request.message, session_id=request.session_id,
+                               resumed=bool(last_event_id))
+    profile = profiler.start("/chat/stream", current_request_id.get() or "", x_profile_token)
     try:
         # Check if agent is initialized
+        await ensure_agent()
         if agent is None:
+            count_error("unavailable")
             raise HTTPException(
                 status_code=503, detail="RAG Agent is not initialized")
 
         session_id = request.session_id
-        user_message = request.message
-        logger.info(
-            f"Received streaming chat request for session {session_id}")
-
-        # Get message history for this session
-        messages = session_manager.get_session(session_id)
-        messages.append(HumanMessage(content=user_message))
-
-        # Define the streaming response generator
-        async def response_generator():
-            full_response = ""
-
-            # Use the streaming method
-            async for chunk in agent.invoke_with_memory_streaming(messages, thread_id=session_id):
-                # Accumulate the full response
-                full_response += chunk
-                # Send each chunk as an SSE event
-                yield f"data: {chunk}\n\n"
-
-            # After streaming completes, update the session with the complete response
-            updated_messages = messages + [AIMessage(content=full_response)]
-            session_manager.update_session(session_id, updated_messages)
-
-            # Send a completion event
-            yield "data: [DONE]\n\n"
 
+        if last_event_id:
+            try:
+                turn_id, after_seq = parse_last_event_id(last_event_id)
+            except ValueError:
+                raise HTTPException(
+                    status_code=400, detail=f"Invalid Last-Event-ID: {last_event_id}")
+
+            buffer = stream_registry.get(session_id, turn_id)
+            if buffer is None:
+                detail = f"Stream {turn_id} is no longer available"
+                if settings.shared_state_url:
+                    # Stream buffers are per worker, unlike sessions
+                    detail += (" on this worker; resuming a stream needs sticky routing"
+                               " of the session to the worker that started it")
+                raise HTTPException(status_code=410, detail=detail)
+
+            logger.info("Resuming stream %s for session %s after event %d", turn_id, session_id, after_seq)
+            # Replaying buffered events: no new generation to trace
+            tracer.finish_trace(trace, turn_id=turn_id)
+            profiler.finish(profile)
+        else:
+            user_message = request.message
+            logger.debug("Received streaming chat request for session %s", session_id)
+
+            # Get message history for this session
+            with span("session_load") as load_span:
+                messages = session_manager.get_session(session_id)
+                load_span.set(messages=len(messages))
+            messages.append(HumanMessage(content=user_message))
+
+            # Run the generation in the background so a dropped client does not cancel it;
+            # the agent saves the completed turn to the shared store
+            buffer = stream_registry.start(
+                session_id,
+                _timed_generation(
+                    agent.invoke_with_memory_streaming(messages, thread_id=session_id), start_time, trace, profile))
+            after_seq = -1
+
+        metrics.inc("chat_requests_total", route="/chat/stream", status="200")
+        headers = {"X-Turn-Id": buffer.turn_id}
+        if profile is not None:
+            headers["X-Profile-Id"] = profile.name
         # Return a streaming response
         return StreamingResponse(
-            response_generator(),
-            media_type="text/event-stream"
+            _sse_events(buffer, after_seq),
+            media_type="text/event-stream",
+            headers=headers
         )
 
+    except HTTPException as e:
+        metrics.inc("chat_requests_total", route="/chat/stream", status=str(e.status_code))
+        tracer.finish_trace(trace, "error", http_status=e.status_code)
+        profiler.finish(profile)
+        raise
     except Exception as e:
+        count_error("exception")
+        metrics.inc("chat_requests_total", route="/chat/stream", status="500")
+        tracer.finish_trace(trace, "error", http_status=500)
+        profiler.finish(profile)
         logger.error(f"Error processing streaming chat request: {str(e)}")
         raise HTTPException(
             status_code=500, detail=f"Error processing streaming request: {str(e)}")
 
 
+@app.websocket("/ws/chat")
+async def chat_websocket_endpoint(websocket: WebSocket, session_id: str):
+    """
+    WebSocket chat endpoint for the RAG agent.
+
+    The session history, token counts and trimmed window stay attached to
+    the connection, so each turn skips the session lookup and request
+    parsing of the HTTP endpoints. Tokens are sent as binary frames (see
+    `src.api.ws_chat` for the protocol).
+
+    Args:
+        websocket: The WebSocket connection
+        session_id: The session ID, passed as a query parameter
+    """
+    await websocket.accept()
+    current_route.set("/ws/chat")
+
+    await ensure_agent()
+    if agent is None:
+        await websocket.close(code=1013, reason="RAG Agent is not initialized")
+        return
+
+    logger.info(f"WebSocket connection opened for session {session_id}")
+    try:
+        connection = ChatConnection(
+            websocket,
+            session_id,
+            agent,
+            session_manager,
+            max_history_tokens=settings.max_history_tokens,
+            ping_interval=settings.ws_ping_interval_seconds,
+            ping_timeout=settings.ws_ping_timeout_seconds,
+            send_queue_size=settings.ws_send_queue_size,
+            max_session_messages=settings.session_max_messages,
+            max_session_bytes=settings.session_max_kb * 1024)
+        await connection.serve()
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket client for session {session_id} disconnected")
+
+
 @app.get("/performance")
 async def get_performance_stats():
     """
@@ -261,13 +591,9 @@ async def get_performance_stats():
         Performance statistics including response times and cache stats
     """
     try:
-        # Calculate response time statistics
-        if request_times:
-            avg_response_time = sum(request_times) / len(request_times)
-            min_response_time = min(request_times)
-            max_response_time = max(request_times)
-        else:
-            avg_response_time = min_response_time = max_response_time = 0
+        # /chat response times, from the same histogram as /metrics
+        chat_times = metrics.histogram("chat_stage_duration_seconds", route="/chat", stage="total").summary()
+        snapshot = metrics.snapshot()
 
         # Get cache statistics if available
         cache_stats = None
@@ -276,12 +602,36 @@ async def get_performance_stats():
 
         return {
             "response_times": {
-                "average_seconds": round(avg_response_time, 2),
-                "min_seconds": round(min_response_time, 2),
-                "max_seconds": round(max_response_time, 2),
-                "total_requests": len(request_times)
+                "average_seconds": round(chat_times["mean"] or 0, 2),
+                "min_seconds": round(chat_times["min"] or 0, 2),
+                "max_seconds": round(chat_times["max"] or 0, 2),
+                "p50_seconds": round(chat_times["p50"] or 0, 2),
+                "p90_seconds": round(chat_times["p90"] or 0, 2),
+                "p99_seconds": round(chat_times["p99"] or 0, 2),
+                "total_requests": chat_times["count"]
             },
+            # p50/p90/p99 by route and stage, and counters (cache tiers, retries, errors)
+            "latency": snapshot["latency"].get("chat_stage_duration_seconds", {}),
+            "counters": snapshot["counters"],
             "cache_stats": cache_stats,
+            "memory": checkpointer.memory_stats(),
+            "query_popularity": get_query_popularity().stats(),
+            "tracing": {
+                "enabled": tracer.exporter is not None,
+                "exported": tracer.exporter.exported if tracer.exporter else 0,
+                "dropped": tracer.exporter.dropped if tracer.exporter else 0,
+            },
+            "capture": {
+                "enabled": tracer.capture is not None,
+                "recorded": tracer.capture.exported if tracer.capture else 0,
+                "dropped": tracer.capture.dropped if tracer.capture else 0,
+            },
+            "event_loop": loop_monitor.stats(),
+            "logging": {"dropped_records": dropped_records()},
+            "profiling": {
+                "enabled": profiler.enabled,
+                "sample_rate": profiler.sample_rate,
+            },
             "settings": {
                 "llm_timeout": settings.llm_timeout,
                 "max_history_tokens": settings.max_history_tokens,
@@ -294,6 +644,92 @@ async def get_performance_stats():
             status_code=500, detail=f"Error getting performance stats: {str(e)}")
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Get the metrics in the Prometheus text format.
+
+    Returns:
+        Latency histograms by route and stage, and counters, for a Prometheus scrape
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _check_profile_token(token: Optional[str]) -> None:
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+
+
+@app.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """
+    List the recent request profiles.
+
+    Args:
+        x_profile_token: Admin `X-Profile-Token` header
+
+    Returns:
+        Profile metadata (name, route, request ID, duration, samples), most recent first
+    """
+    _check_profile_token(x_profile_token)
+    return {"profiles": profiler.list()}
+
+
+@app.get("/profiles/{name}")
+async def get_profile(name: str, x_profile_token: Optional[str] = Header(None)):
+    """
+    Get a request profile as collapsed stacks, for flamegraph.pl or speedscope.
+
+    Args:
+        name: Profile name, as listed by /profiles or returned in X-Profile-Id
+        x_profile_token: Admin `X-Profile-Token` header
+
+    Returns:
+        One `frame;frame;frame count` line per distinct stack
+    """
+    _check_profile_token(x_profile_token)
+    collapsed = profiler.read(name)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return PlainTextResponse(collapsed)
+
+
+def _check_admin_token(token: Optional[str]) -> None:
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not (token and hmac.compare_digest(token, settings.admin_token)):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+
+
+@app.post("/knowledge-base/refresh")
+async def refresh_knowledge_base_endpoint(reload: bool = True, x_admin_token: Optional[str] = Header(None)):
+    """
+    Reload the knowledge base after a change, clearing the RAG cache and the precomputed answers.
+
+    Only this worker reloads its index and drops its precomputed answers;
+    the RAG cache shared with the other workers is cleared for all of them.
+
+    Args:
+        reload: Rebuild the index from DOCUMENT_PATH / INDEX_PATH (false: only clear and prime)
+        x_admin_token: Admin `X-Admin-Token` header
+
+    Returns:
+        The number of chunks and the cache priming summary
+    """
+    _check_admin_token(x_admin_token)
+    await ensure_agent()
+    if agent is None:
+        raise HTTPException(status_code=503, detail="RAG Agent is not initialized")
+    try:
+        primed = await run_in_threadpool(refresh_knowledge_base, reload)
+    except Exception as e:
+        logger.error(f"Error refreshing the knowledge base: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error refreshing the knowledge base: {str(e)}")
+    return {"chunks": agent.rag_tool.num_chunks, "primed": primed}
+
+
 @app.delete("/chat/{session_id}")
 async def clear_session(session_id: str):
     """
@@ -305,11 +741,7 @@ async def clear_session(session_id: str):
     Returns:
         Success message
     """
-    session_cleared = session_manager.clear_session(session_id)
-    state_cleared = agent.checkpointer.clear_state(
-        session_id) if agent else False
-
-    if session_cleared or state_cleared:
+    if session_manager.clear_session(session_id):
         logger.info(f"Cleared session history for {session_id}")
         return {"status": "ok", "message": f"Session {session_id} cleared"}
     else:
@@ -325,42 +757,20 @@ async def list_sessions():
     Returns:
         List of session information
     """
-    sessions = session_manager.get_all_sessions()
     session_info = []
 
-    for session_id, data in sessions.items():
+    # Iterates the store shard by shard instead of copying it under a global lock,
+    # without rehydrating spilled sessions
+    for session_id, message_count, last_activity in session_manager.iter_session_summaries():
         session_info.append({
             "session_id": session_id,
-            "message_count": len(data["messages"]),
-            "last_activity": datetime.fromtimestamp(data["last_activity"])
+            "message_count": message_count,
+            "last_activity": datetime.fromtimestamp(last_activity)
         })
 
     return {"sessions": session_info, "count": len(session_info), "timeout_minutes": session_timeout}
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Run on application startup."""
-    logger.info("Starting Airtel RAG Agent API")
-
-    # Preload documents for performance optimization
-    global agent
-    agent = preload_documents()
-
-    if agent:
-        logger.info(
-            "RAG Agent initialized successfully with preloaded documents")
-    else:
-        logger.error("Failed to initialize RAG Agent")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Run on application shutdown."""
-    logger.info("Shutting down Airtel RAG Agent API")
-    # Any cleanup tasks can go here
-
-
 if __name__ == "__main__":
     # Get port from environment variable (for Vercel) or default to 8000
     port = int(os.environ.get("PORT", 8000))
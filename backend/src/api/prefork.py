@@ -0,0 +1,213 @@
+"""
+Fork-after-load server: preload once in the master, fork the workers.
+
+The master imports the app, builds or loads the FAISS index and the
+chunk table, then forks the workers. They inherit the index copy-on-write
+instead of each rebuilding it, so startup pays the preload once and the
+index pages stay shared between workers.
+
+The master then only supervises: it respawns workers that exit (after
+`max_requests`, or on a crash), recycles them one at a time on SIGHUP or
+when they reach `max_worker_age`, and stops them gracefully on SIGTERM.
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, Optional
+
+from src.monitoring.structured_logging import shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+
+class PreforkServer:
+    """Master process of the fork-after-load launcher."""
+
+    def __init__(self, app_module, host: str = "0.0.0.0", port: int = 8000, workers: int = 2,
+                 max_requests: Optional[int] = None, max_worker_age: Optional[float] = None,
+                 graceful_timeout: float = 30.0, log_level: str = "info"):
+        """
+        Initialize the server.
+
+        Args:
+            app_module: Imported API module exposing `app`, `preload_documents` and `session_manager`
+            host: Address to listen on
+            port: Port to listen on
+            workers: Number of worker processes
+            max_requests: Requests after which a worker exits and is replaced (None for no limit)
+            max_worker_age: Seconds after which a worker is recycled (None for no limit)
+            graceful_timeout: Seconds a stopping worker gets to finish its requests
+            log_level: uvicorn log level of the workers
+        """
+        self.app_module = app_module
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_worker_age = max_worker_age
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+
+        self.sock: Optional[socket.socket] = None
+        # pid -> start time
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        self.recycle_requested = False
+
+    def preload(self) -> float:
+        """
+        Build or load the index and the agent in the master.
+
+        Returns:
+            Preload time in seconds
+        """
+        start = time.time()
+        self.app_module.agent = self.app_module.preload_documents()
+
+        # Buffered conversation writes must not be duplicated into every child
+        checkpointer = getattr(self.app_module, "checkpointer", None)
+        if hasattr(checkpointer, "flush"):
+            checkpointer.flush()
+
+        # Move everything allocated so far out of the collector's reach, so
+        # collections in the workers do not write to (and un-share) its pages
+        gc.collect()
+        gc.freeze()
+        return time.time() - start
+
+    def serve(self) -> None:
+        """Preload, bind, fork the workers and supervise them until stopped."""
+        preload_time = self.preload()
+        logger.info(f"Preloaded in {preload_time:.2f}s, forking {self.workers} workers")
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_recycle)
+
+        for _ in range(self.workers):
+            self._spawn()
+
+        try:
+            while not self.stopping:
+                self._reap()
+                if self.recycle_requested:
+                    self.recycle_requested = False
+                    self.recycle_all()
+                elif self.max_worker_age:
+                    self._recycle_aged()
+                time.sleep(0.2)
+        finally:
+            self._stop_all()
+            self.sock.close()
+
+    def recycle_all(self) -> None:
+        """Replace every worker, one at a time, without dropping connections."""
+        logger.info("Recycling all workers")
+        for pid in list(self.children):
+            self._replace(pid)
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.children[pid] = time.time()
+        logger.info(f"Started worker {pid}")
+        return pid
+
+    def _run_worker(self) -> None:
+        # Child process: never returns into the master's loop
+        exit_code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            self.app_module.session_manager.after_fork()
+
+            import uvicorn
+            # log_config=None: uvicorn's loggers go through the application's log queue
+            config = uvicorn.Config(self.app_module.app, log_level=self.log_level, log_config=None,
+                                    limit_max_requests=self.max_requests,
+                                    timeout_graceful_shutdown=self.graceful_timeout)
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} failed: {str(e)}")
+            exit_code = 1
+        finally:
+            # os._exit skips atexit: write the queued log records first
+            shutdown_logging()
+            os._exit(exit_code)
+
+    def _replace(self, pid: int) -> None:
+        # Start the replacement first so the socket always has a listener
+        self._spawn()
+        self._stop_worker(pid)
+
+    def _recycle_aged(self) -> None:
+        now = time.time()
+        for pid, started in list(self.children.items()):
+            if now - started >= self.max_worker_age:
+                logger.info(f"Recycling worker {pid} after {now - started:.0f}s")
+                self._replace(pid)
+                # One worker at a time keeps capacity during recycling
+                return
+
+    def _reap(self) -> None:
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            if self.children.pop(pid, None) is None:
+                continue
+            logger.info(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+            if not self.stopping:
+                self._spawn()
+
+    def _stop_worker(self, pid: int) -> None:
+        self._signal(pid)
+        self._wait(pid, time.time() + self.graceful_timeout)
+
+    def _stop_all(self) -> None:
+        self.stopping = True
+        pids = list(self.children)
+        for pid in pids:
+            self._signal(pid)
+        deadline = time.time() + self.graceful_timeout
+        for pid in pids:
+            self._wait(pid, deadline)
+
+    def _signal(self, pid: int) -> None:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _wait(self, pid: int, deadline: float) -> None:
+        try:
+            while time.time() < deadline:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+                if done:
+                    break
+                time.sleep(0.05)
+            else:
+                logger.warning(f"Worker {pid} did not stop in {self.graceful_timeout}s, killing it")
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+        except ChildProcessError:
+            # Already reaped
+            pass
+        self.children.pop(pid, None)
+
+    def _handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _handle_recycle(self, signum, frame) -> None:
+        self.recycle_requested = True
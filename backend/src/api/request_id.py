@@ -0,0 +1,51 @@
+"""
+ASGI middleware giving every request an ID, returned in the X-Request-ID header.
+"""
+
+import re
+
+from src.monitoring.tracing import current_request_id, new_request_id
+
+HEADER = b"x-request-id"
+
+# IDs accepted from clients or proxies; anything else is replaced
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """
+    Set the request ID for the duration of a request and echo it in the response.
+
+    A valid X-Request-ID sent by the client (or a proxy) is kept, so one ID
+    follows the request across services; otherwise one is generated. The ID
+    is the trace ID of the request's spans.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == HEADER:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or new_request_id()
+
+        async def send_with_request_id(message):
+            if message["type"] in ("http.response.start", "websocket.accept"):
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        token = current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            current_request_id.reset(token)
@@ -0,0 +1,186 @@
+"""
+Resumable stream buffers for the SSE chat endpoint.
+
+Each generation started by `/chat/stream` runs as a background task that
+writes its chunks into a bounded ring buffer keyed by session and turn.
+Clients read from the buffer rather than from the LLM directly, so a
+dropped connection can reattach with `Last-Event-ID` and resume from the
+last event it received without triggering a new LLM call.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamGapError(Exception):
+    """Raised when a resume offset has already been evicted from the ring buffer."""
+
+
+class GenerationBuffer:
+    """Bounded ring buffer holding the events of a single generation."""
+
+    def __init__(self, session_id: str, turn_id: str, max_events: int = 512):
+        """
+        Initialize the buffer.
+
+        Args:
+            session_id: The session the generation belongs to
+            turn_id: Identifier of the turn within the session
+            max_events: Maximum number of events retained for replay
+        """
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.events: deque = deque(maxlen=max_events)
+        self.next_seq = 0
+        self.done = False
+        self.error: Optional[str] = None
+        self.completed_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._condition = asyncio.Condition()
+
+    def event_id(self, seq: int) -> str:
+        """Build the SSE event ID for a sequence number."""
+        return f"{self.turn_id}:{seq}"
+
+    async def append(self, data: str) -> None:
+        """Append an event and wake up attached readers."""
+        async with self._condition:
+            self.events.append((self.next_seq, data))
+            self.next_seq += 1
+            self._condition.notify_all()
+
+    async def finish(self, error: Optional[str] = None) -> None:
+        """Mark the generation as complete."""
+        async with self._condition:
+            self.done = True
+            self.error = error
+            self.completed_at = time.time()
+            self._condition.notify_all()
+
+    async def iter_from(self, after_seq: int = -1) -> AsyncGenerator[Tuple[int, str], None]:
+        """
+        Yield buffered and live events with a sequence number above `after_seq`.
+
+        Args:
+            after_seq: Last sequence number already delivered to the client
+
+        Yields:
+            Tuples of (sequence number, event data)
+
+        Raises:
+            StreamGapError: If events after `after_seq` were evicted from the buffer
+        """
+        cursor = after_seq + 1
+        while True:
+            async with self._condition:
+                if self.events and cursor < self.events[0][0]:
+                    raise StreamGapError(
+                        f"Events before {self.event_id(self.events[0][0])} are no longer buffered")
+                pending = [event for event in self.events if event[0] >= cursor]
+                if not pending:
+                    if self.done:
+                        return
+                    await self._condition.wait()
+                    continue
+            for seq, data in pending:
+                yield seq, data
+                cursor = seq + 1
+
+
+class StreamRegistry:
+    """
+    Registry of in-progress and recently completed generations.
+
+    Completed generations are retained for `completed_ttl_seconds` and at
+    most `max_completed` of them are kept, oldest evicted first.
+    """
+
+    def __init__(self, max_events: int = 512, max_completed: int = 256, completed_ttl_seconds: int = 120):
+        """
+        Initialize the registry.
+
+        Args:
+            max_events: Ring buffer size for each generation
+            max_completed: Maximum number of completed generations kept for replay
+            completed_ttl_seconds: How long a completed generation stays resumable
+        """
+        self.max_events = max_events
+        self.max_completed = max_completed
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self.buffers: "OrderedDict[Tuple[str, str], GenerationBuffer]" = OrderedDict()
+
+    def start(self, session_id: str, producer: AsyncIterator[str],
+              on_complete: Optional[Callable[[str], Awaitable[None]]] = None) -> GenerationBuffer:
+        """
+        Start a generation in the background and return its buffer.
+
+        Args:
+            session_id: The session the generation belongs to
+            producer: Async iterator yielding response chunks
+            on_complete: Optional coroutine called with the full response once the producer is exhausted
+
+        Returns:
+            The GenerationBuffer the generation writes to
+        """
+        self._prune()
+        turn_id = uuid.uuid4().hex[:12]
+        buffer = GenerationBuffer(session_id, turn_id, max_events=self.max_events)
+        self.buffers[(session_id, turn_id)] = buffer
+        buffer.task = asyncio.create_task(self._run(buffer, producer, on_complete))
+        return buffer
+
+    def get(self, session_id: str, turn_id: str) -> Optional[GenerationBuffer]:
+        """Get the buffer for a session turn, if it is still retained."""
+        self._prune()
+        return self.buffers.get((session_id, turn_id))
+
+    def active_count(self) -> int:
+        """Number of generations still running."""
+        return sum(1 for buffer in self.buffers.values() if not buffer.done)
+
+    async def _run(self, buffer: GenerationBuffer, producer: AsyncIterator[str],
+                   on_complete: Optional[Callable[[str], Awaitable[None]]]) -> None:
+        full_response = ""
+        try:
+            async for chunk in producer:
+                full_response += chunk
+                await buffer.append(chunk)
+            if on_complete:
+                await on_complete(full_response)
+            await buffer.finish()
+        except Exception as e:
+            logger.error(
+                f"Error in background generation {buffer.turn_id} for session {buffer.session_id}: {str(e)}")
+            await buffer.finish(error=str(e))
+
+    def _prune(self) -> None:
+        """Drop expired completed buffers and enforce the completed-buffer cap."""
+        now = time.time()
+        completed = [key for key, buffer in self.buffers.items() if buffer.done]
+        overflow = len(completed) - self.max_completed
+        for key in completed:
+            buffer = self.buffers[key]
+            if overflow > 0 or now - buffer.completed_at > self.completed_ttl_seconds:
+                del self.buffers[key]
+                overflow -= 1
+
+
+def parse_last_event_id(last_event_id: str) -> Tuple[str, int]:
+    """
+    Parse a `Last-Event-ID` header value.
+
+    Accepts either `<turn_id>:<seq>` or a bare `<turn_id>` (resume from the start).
+
+    Returns:
+        Tuple of (turn_id, last delivered sequence number)
+    """
+    turn_id, _, seq = last_event_id.strip().partition(":")
+    if not turn_id:
+        raise ValueError("Empty Last-Event-ID")
+    return turn_id, int(seq) if seq else -1
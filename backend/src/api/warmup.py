@@ -0,0 +1,164 @@
+"""
+Background warm-up of the API with per-stage progress for readiness probes.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class WarmupStage:
+    """One warm-up step and its progress."""
+
+    __slots__ = ("name", "func", "required", "retries", "backoff_seconds", "status",
+                 "attempts", "started_at", "duration", "detail", "error")
+
+    def __init__(self, name: str, func: Callable[[], Any], required: bool, retries: int,
+                 backoff_seconds: float):
+        self.name = name
+        self.func = func
+        self.required = required
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.status = PENDING
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.detail: Any = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "attempts": self.attempts,
+            "duration_seconds": round(self.duration, 3) if self.duration is not None else None,
+            "detail": self.detail,
+            "error": self.error,
+        }
+
+
+class Warmup:
+    """
+    Ordered warm-up stages run once, off the event loop.
+
+    The service is ready when every required stage is done (or skipped);
+    optional stages that fail are reported but do not hold back readiness.
+    A required stage that still fails after its retries stops the run.
+    """
+
+    def __init__(self):
+        self.stages: List[WarmupStage] = []
+        self.lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def add_stage(self, name: str, func: Callable[[], Any], required: bool = True, retries: int = 0,
+                  backoff_seconds: float = 2.0) -> None:
+        """
+        Add a stage, run after the stages already added.
+
+        Args:
+            name: Stage name reported by /readyz
+            func: Callable doing the work; its return value is reported as the stage detail
+            required: Whether the service is not ready until the stage succeeds
+            retries: Extra attempts after a failure
+            backoff_seconds: Wait before the first retry, doubled after each retry
+        """
+        self.stages.append(WarmupStage(name, func, required, retries, backoff_seconds))
+
+    def skip(self, name: str, reason: str) -> None:
+        """
+        Mark a stage as not needed.
+
+        Args:
+            name: Stage name
+            reason: Reported as the stage detail
+        """
+        for stage in self.stages:
+            if stage.name == name:
+                with self.lock:
+                    stage.status = SKIPPED
+                    stage.detail = reason
+
+    def run(self) -> bool:
+        """
+        Run the pending stages in order.
+
+        Returns:
+            True if the service is ready afterwards
+        """
+        self.started_at = time.time()
+        for stage in self.stages:
+            if stage.status != PENDING:
+                continue
+            if not self._run_stage(stage) and stage.required:
+                logger.error(f"Warm-up stopped: required stage '{stage.name}' failed")
+                break
+        self.finished_at = time.time()
+        logger.info(f"Warm-up finished in {self.finished_at - self.started_at:.2f}s, ready: {self.ready}")
+        return self.ready
+
+    def _run_stage(self, stage: WarmupStage) -> bool:
+        backoff = stage.backoff_seconds
+        with self.lock:
+            stage.status = RUNNING
+            stage.started_at = time.time()
+        while True:
+            stage.attempts += 1
+            try:
+                detail = stage.func()
+            except Exception as e:
+                logger.warning(f"Warm-up stage '{stage.name}' attempt {stage.attempts} failed: {str(e)}")
+                if stage.attempts <= stage.retries:
+                    metrics.inc("retries_total", operation="warmup")
+                    time.sleep(backoff)
+                    backoff *= 2
+                    continue
+                with self.lock:
+                    stage.status = FAILED
+                    stage.error = str(e)
+                    stage.duration = time.time() - stage.started_at
+                return False
+            with self.lock:
+                stage.status = DONE
+                stage.detail = detail
+                stage.duration = time.time() - stage.started_at
+            logger.info(f"Warm-up stage '{stage.name}' done in {stage.duration:.2f}s")
+            return True
+
+    @property
+    def ready(self) -> bool:
+        """Whether every required stage is done or skipped."""
+        return all(stage.status in (DONE, SKIPPED) for stage in self.stages if stage.required)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the warm-up progress.
+
+        Returns:
+            Dictionary with readiness, per-stage status and timings
+        """
+        with self.lock:
+            stages = {stage.name: stage.to_dict() for stage in self.stages}
+        finished = sum(stage["status"] in (DONE, SKIPPED, FAILED) for stage in stages.values())
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "ready": self.ready,
+            "progress": f"{finished}/{len(stages)}",
+            "elapsed_seconds": elapsed,
+            "stages": stages,
+        }
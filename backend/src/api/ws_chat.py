@@ -0,0 +1,280 @@
+"""
+WebSocket chat connection with persistent per-connection state.
+
+A connection loads the session history once and keeps it, together with
+per-message token counts and the trimmed history window, attached for its
+whole lifetime. Each turn then only pays for the new messages instead of
+re-reading the session and re-counting the full history.
+
+Wire protocol:
+    client -> server: JSON text frames, `{"message": "..."}` or `{"type": "pong"}`
+    server -> client: binary frames, one opcode byte followed by a UTF-8 payload
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import List, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from src.memory.spill import apply_session_budget
+
+logger = logging.getLogger(__name__)
+
+# Server -> client frame opcodes
+OP_TOKEN = 0x01
+OP_DONE = 0x02
+OP_ERROR = 0x03
+OP_PING = 0x04
+OP_READY = 0x05
+
+# Sentinel marking the end of a turn in the send queue
+_END_OF_TURN = object()
+
+
+def encode_frame(opcode: int, payload: str = "") -> bytes:
+    """Encode a server frame as an opcode byte followed by the UTF-8 payload."""
+    return bytes((opcode,)) + payload.encode("utf-8")
+
+
+class ConversationWindow:
+    """
+    Conversation history with cached token counts and an incrementally trimmed window.
+
+    Mirrors the agent's `trim_messages` policy (keep the most recent messages
+    within `max_tokens`, starting on a human message) but counts each message
+    only once, when it is appended. The full history is held to the same
+    per-session budget as the conversation store, so it matches what the
+    store keeps however long the connection lives.
+    """
+
+    def __init__(self, agent, messages: List[BaseMessage], max_tokens: int,
+                 max_session_messages: int = 0, max_session_bytes: int = 0):
+        """
+        Initialize the window from an existing history.
+
+        Args:
+            agent: Agent providing `count_message_tokens`
+            messages: Existing session history
+            max_tokens: Token budget of the trimmed window
+            max_session_messages: Maximum number of messages kept (0 for no limit)
+            max_session_bytes: Maximum estimated size of the kept messages (0 for no limit)
+        """
+        self.agent = agent
+        self.max_tokens = max_tokens
+        self.max_session_messages = max_session_messages
+        self.max_session_bytes = max_session_bytes
+        self.messages: List[BaseMessage] = []
+        self.token_counts: List[int] = []
+        self.window_start = 0
+        self.window_tokens = 0
+        for message in messages:
+            self.append(message)
+
+    def append(self, message: BaseMessage) -> None:
+        """Append a message, counting its tokens and sliding the window."""
+        tokens = self.agent.count_message_tokens([message])
+        self.messages.append(message)
+        self.token_counts.append(tokens)
+        self.window_tokens += tokens
+        while self.window_tokens > self.max_tokens and self.window_start < len(self.messages) - 1:
+            self.window_tokens -= self.token_counts[self.window_start]
+            self.window_start += 1
+        if self.max_session_messages or self.max_session_bytes:
+            self._apply_session_budget()
+
+    def _apply_session_budget(self) -> None:
+        """Drop the oldest messages beyond the per-session budget, as the store does on save."""
+        kept = apply_session_budget(self.messages, self.max_session_messages, self.max_session_bytes)
+        dropped = len(self.messages) - len(kept)
+        if not dropped:
+            return
+        del self.messages[:dropped]
+        del self.token_counts[:dropped]
+        if self.window_start >= dropped:
+            self.window_start -= dropped
+        else:
+            self.window_start = 0
+            self.window_tokens = sum(self.token_counts)
+
+    @property
+    def total_tokens(self) -> int:
+        """Total tokens of the full history."""
+        return sum(self.token_counts)
+
+    def trimmed(self) -> List[BaseMessage]:
+        """Return the trimmed window, starting on a human message."""
+        start = self.window_start
+        while start < len(self.messages) - 1 and not isinstance(self.messages[start], HumanMessage):
+            start += 1
+        return self.messages[start:]
+
+
+class ChatConnection:
+    """State and send/receive loops of a single `/ws/chat` connection."""
+
+    def __init__(self, websocket: WebSocket, session_id: str, agent, session_manager,
+                 max_history_tokens: int, ping_interval: float = 20.0,
+                 ping_timeout: float = 20.0, send_queue_size: int = 64,
+                 max_pending_messages: int = 4, max_session_messages: int = 0,
+                 max_session_bytes: int = 0):
+        """
+        Initialize the connection.
+
+        Args:
+            websocket: The accepted WebSocket
+            session_id: The session identifier
+            agent: The RAG agent
+            session_manager: Session manager used to load the history
+            max_history_tokens: Token budget of the trimmed window
+            ping_interval: Seconds between server pings
+            ping_timeout: Seconds to wait for a pong before closing the connection
+            send_queue_size: Maximum number of frames buffered before the producer is paused
+            max_pending_messages: Maximum number of client messages queued behind the running turn
+            max_session_messages: Per-session message budget of the conversation store (0 for no limit)
+            max_session_bytes: Per-session size budget of the conversation store (0 for no limit)
+        """
+        self.websocket = websocket
+        self.session_id = session_id
+        self.agent = agent
+        self.session_manager = session_manager
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.send_queue: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self.inbox: asyncio.Queue = asyncio.Queue(maxsize=max_pending_messages)
+        self.send_lock = asyncio.Lock()
+        self.last_pong = time.monotonic()
+        self.closed = False
+        self.max_history_tokens = max_history_tokens
+        self.max_session_messages = max_session_messages
+        self.max_session_bytes = max_session_bytes
+        self.window = self._load_window()
+
+    def _load_window(self) -> ConversationWindow:
+        """Build the window from the session history in the store."""
+        return ConversationWindow(
+            self.agent, list(self.session_manager.get_session(self.session_id)), self.max_history_tokens,
+            self.max_session_messages, self.max_session_bytes)
+
+    async def serve(self) -> None:
+        """Run the connection until the client disconnects or stops answering pings."""
+        await self._send(OP_READY, json.dumps({
+            "session_id": self.session_id,
+            "message_count": len(self.window.messages),
+            "history_tokens": self.window.total_tokens,
+        }))
+
+        reader = asyncio.create_task(self._read_loop())
+        pinger = asyncio.create_task(self._ping_loop())
+        try:
+            while True:
+                get_message = asyncio.create_task(self.inbox.get())
+                done, _ = await asyncio.wait({get_message, reader, pinger}, return_when=asyncio.FIRST_COMPLETED)
+                if get_message not in done:
+                    get_message.cancel()
+                    break
+                await self._run_turn(get_message.result())
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.warning(f"WebSocket connection for session {self.session_id} failed: {str(e)}")
+        finally:
+            self.closed = True
+            reader.cancel()
+            pinger.cancel()
+            logger.info(f"WebSocket connection closed for session {self.session_id}")
+
+    async def _read_loop(self) -> None:
+        """Read client frames, answering pongs immediately and queueing messages."""
+        while True:
+            frame = await self.websocket.receive_text()
+            try:
+                data = json.loads(frame)
+            except json.JSONDecodeError:
+                await self._send(OP_ERROR, "Invalid JSON frame")
+                continue
+
+            if data.get("type") == "pong":
+                self.last_pong = time.monotonic()
+                continue
+
+            message = data.get("message")
+            if not isinstance(message, str) or not message.strip():
+                await self._send(OP_ERROR, "Missing message")
+                continue
+
+            try:
+                self.inbox.put_nowait(message)
+            except asyncio.QueueFull:
+                await self._send(OP_ERROR, "Too many pending messages")
+
+    async def _ping_loop(self) -> None:
+        """Ping the client periodically and close the connection if it stops answering."""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if time.monotonic() - self.last_pong > self.ping_interval + self.ping_timeout:
+                logger.warning(
+                    f"WebSocket client for session {self.session_id} missed pings, closing")
+                await self.websocket.close(code=1011)
+                return
+            await self._send(OP_PING, str(time.time()))
+
+    async def _run_turn(self, user_message: str) -> None:
+        """Stream one turn to the client through the bounded send queue."""
+        self.window.append(HumanMessage(content=user_message))
+        producer = asyncio.create_task(self._produce())
+
+        try:
+            while True:
+                item = await self.send_queue.get()
+                if item is _END_OF_TURN:
+                    break
+                await self._send_bytes(item)
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+        full_response, failed = producer.result() if not producer.cancelled() else ("", True)
+        if failed:
+            # The agent saved its fallback answer (or nothing), not what was streamed: reload
+            self.window = self._load_window()
+        else:
+            # The agent has already saved the completed turn to the shared store
+            self.window.append(AIMessage(content=full_response))
+        await self._send(OP_DONE, json.dumps({"history_tokens": self.window.total_tokens}))
+
+    async def _produce(self) -> Tuple[str, bool]:
+        """
+        Pull chunks from the agent into the send queue; pauses when the queue is full.
+
+        Returns:
+            The streamed response, and whether the turn failed (errored or fell back)
+        """
+        from src.agent.rag_agent import FALLBACK_RESPONSE
+
+        full_response = ""
+        failed = False
+        try:
+            async for chunk in self.agent.invoke_with_memory_streaming(
+                    self.window.messages, thread_id=self.session_id,
+                    trimmed_messages=self.window.trimmed()):
+                full_response += chunk
+                await self.send_queue.put(encode_frame(OP_TOKEN, chunk))
+        except Exception as e:
+            logger.error(f"Error in WebSocket turn for session {self.session_id}: {str(e)}")
+            await self.send_queue.put(encode_frame(OP_ERROR, str(e)))
+            failed = True
+        finally:
+            await self.send_queue.put(_END_OF_TURN)
+        return full_response, failed or full_response.endswith(FALLBACK_RESPONSE)
+
+    async def _send(self, opcode: int, payload: str = "") -> None:
+        await self._send_bytes(encode_frame(opcode, payload))
+
+    async def _send_bytes(self, frame: bytes) -> None:
+        async with self.send_lock:
+            if not self.closed:
+                await self.websocket.send_bytes(frame)
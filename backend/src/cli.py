@@ -1,45 +1,69 @@
-
-from langchain_core.messages import HumanMessage
-from src.agent.rag_agent import LangGraphRAGAgent
-from dotenv import load_dotenv
-load_dotenv()
-
-
-def main():
-    agent = LangGraphRAGAgent('src/rag/static_document.txt')
-    thread_id = input(
-        "Enter a session/thread id (or press Enter for default): ") or "default"
-    print("Type your message (type 'quit' or 'exit' to stop):")
-    messages = []
-    while True:
-        user_input = input("You: ")
-        if user_input.strip().lower() in {"quit", "exit"}:
-            print("Exiting chat.")
-            break
-        messages.append(HumanMessage(content=user_input))
-        response, messages = agent.invoke_with_memory(
-            messages, thread_id=thread_id)
-        print(f"Agent: {response}")
-
 """
-CLI for testing the RAG agent locally.
+CLI for testing the RAG agent locally and building the index offline.
+
+Usage:
+    python -m src.cli "What are Airtel's data plans?"
+    python -m src.cli --interactive
+    python -m src.cli build-index src/rag/static_document.txt --output index
 """
 
 import os
 import sys
 import argparse
 from dotenv import load_dotenv
-from src.agent.rag_agent import LangGraphRAGAgent
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def build_index_command(argv):
+    """Build the knowledge-base index artifact that the server loads from INDEX_PATH."""
+    from src.config.settings import Settings
+    from src.rag.index_builder import build_index
+
+    parser = argparse.ArgumentParser(prog="python -m src.cli build-index",
+                                     description="Build a deployable knowledge-base index artifact.")
+    parser.add_argument("documents", nargs="+", help="Text files of the knowledge base")
+    parser.add_argument("--output", "-o", default="index", help="Artifact directory (default: index)")
+    parser.add_argument("--chunk-size", type=int, default=400, help="Chunk size in characters (default: 400)")
+    parser.add_argument("--chunk-overlap", type=int, default=50, help="Chunk overlap in characters (default: 50)")
+    parser.add_argument("--embeddings", choices=["google", "hashing"], default=Settings().embeddings_backend,
+                        help="Embedding backend (default: EMBEDDINGS_BACKEND or google)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding call (default: 64)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Chunking processes and concurrent embedding calls (default: 4)")
+    parser.add_argument("--lexical", action="store_true", help="Also write a BM25 lexical index")
+    parser.add_argument("--force", action="store_true",
+                        help="Replace --output even if it is not an index artifact (its content is deleted)")
+    args = parser.parse_args(argv)
+
+    if args.embeddings == "google" and not os.environ.get("GOOGLE_API_KEY"):
+        print("Error: GOOGLE_API_KEY environment variable not set (or use --embeddings hashing).")
+        sys.exit(1)
+
+    try:
+        manifest = build_index(args.documents, args.output, chunk_size=args.chunk_size,
+                               chunk_overlap=args.chunk_overlap, embeddings_backend=args.embeddings,
+                               batch_size=args.batch_size, workers=args.workers, lexical=args.lexical,
+                               force=args.force)
+    except Exception as e:
+        logger.error(f"Error building index: {str(e)}")
+        sys.exit(1)
+
+    print(f"Index {manifest['version']}: {manifest['num_chunks']} chunks "
+          f"({manifest['duplicates_removed']} duplicates removed) written to {args.output}")
+    print(f"Serve it with INDEX_PATH={args.output}")
+
+
 def main():
     """Run the RAG agent from the command line."""
     # Load environment variables
     load_dotenv()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "build-index":
+        build_index_command(sys.argv[2:])
+        return
     
     # Check for Google API key
     if not os.environ.get("GOOGLE_API_KEY"):
@@ -59,6 +83,8 @@ def main():
                         help="Query to send to the agent (not needed in interactive mode)")
     
     args = parser.parse_args()
+
+    from src.agent.rag_agent import LangGraphRAGAgent
     
     try:
         # Initialize the agent
@@ -12,6 +12,24 @@ load_dotenv()
 class Settings:
     # Embedding settings
     embedding_model: str = "text-embedding-004"
+    # "google" (text-embedding-004) or "hashing" (deterministic, local: CI and offline builds)
+    embeddings_backend: str = os.environ.get("EMBEDDINGS_BACKEND", "google")
+    # "google" (Gemini) or "fake" (canned answers with simulated latency and failures,
+    # to run the pipeline without an API key; see src/agent/fake_llm.py)
+    llm_backend: str = os.environ.get("LLM_BACKEND", "google")
+    fake_llm_first_token_ms: float = float(os.environ.get("FAKE_LLM_FIRST_TOKEN_MS", 300))
+    fake_llm_tokens_per_second: float = float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", 50))
+    fake_llm_failure_rate: float = float(os.environ.get("FAKE_LLM_FAILURE_RATE", 0))
+    # "error", "timeout" or "mid_stream"
+    fake_llm_failure_kind: str = os.environ.get("FAKE_LLM_FAILURE_KIND", "error")
+    fake_llm_seed: int = int(os.environ.get("FAKE_LLM_SEED", 0))
+    # Fault injection on the LLM and query embeddings, for chaos tests (off when empty;
+    # see src/agent/faults.py), e.g. "llm:rate_limit=0.1,timeout=0.05@30;embedding:spike=0.1@2"
+    faults: str = os.environ.get("FAULTS", "")
+    faults_seed: int = int(os.environ.get("FAULTS_SEED", 0))
+    # Attempts of a non-streaming LLM call; attempt n waits LLM_RETRY_BACKOFF_SECONDS * 2**(n-1) before retrying
+    llm_max_retries: int = int(os.environ.get("LLM_MAX_RETRIES", 3))
+    llm_retry_backoff_seconds: float = float(os.environ.get("LLM_RETRY_BACKOFF_SECONDS", 1.0))
 
     # Document processing settings - OPTIMIZED FOR SPEED
     chunk_size: int = 800  # Reduced from 1000 for faster processing
@@ -20,12 +38,97 @@ class Settings:
     similarity_threshold: float = 0.6  # Reduced from 0.7 for more results
 
     # Memory settings
-    # Path to database for future long-term memory (not used with MemorySaver)
-    checkpoint_db_path: str = ""
+    # Path to the SQLite database for durable conversation memory (in-memory when empty)
+    checkpoint_db_path: str = os.environ.get("CHECKPOINT_DB_PATH", "")
+    checkpoint_cache_size: int = int(
+        os.environ.get("CHECKPOINT_CACHE_SIZE", 1024))
+    # Estimated resident size of all sessions above which idle ones are spilled (0 = no limit)
+    memory_budget_mb: int = int(os.environ.get("MEMORY_BUDGET_MB", 256))
+    # Per-session history budget; the oldest messages are dropped beyond it (0 = no limit)
+    session_max_messages: int = int(
+        os.environ.get("SESSION_MAX_MESSAGES", 200))
+    session_max_kb: int = int(os.environ.get("SESSION_MAX_KB", 256))
+    # Directory for spilled sessions (kept compressed in memory when empty)
+    session_spill_dir: str = os.environ.get("SESSION_SPILL_DIR", "")
+    # Shared state backend for multi-worker deployments, e.g.
+    # sqlite:////dev/shm/airtel-state.db or redis://localhost:6379/0 (single process when empty)
+    shared_state_url: str = os.environ.get("SHARED_STATE_URL", "")
     session_timeout_minutes: int = int(
         os.environ.get("SESSION_TIMEOUT_MINUTES", 30))
     max_history_tokens: int = 3000  # Reduced from 4000 for faster processing
 
+    # Cold start (serverless): skip the startup preload and build the agent on the
+    # first request that needs it; on by default on Vercel
+    cold_start: bool = os.environ.get(
+        "COLD_START", "true" if os.environ.get("VERCEL") else "false").lower() == "true"
+    # Prebuilt index directory (index.faiss + documents.pkl) loaded instead of
+    # embedding the documents at startup (documents are embedded when empty or missing)
+    index_path: str = os.environ.get("INDEX_PATH", "")
+    # Fuse the artifact's BM25 index (build-index --lexical) with the vector search results
+    lexical_search: bool = os.environ.get("LEXICAL_SEARCH", "true").lower() == "true"
+
+    # Background warm-up: attempts of the index stage after a failure, LLM connection
+    # warm-up, and queries run through retrieval to prime the RAG cache ("|"-separated)
+    warmup_retries: int = int(os.environ.get("WARMUP_RETRIES", 3))
+    warmup_llm: bool = os.environ.get("WARMUP_LLM", "true").lower() == "true"
+    warmup_queries: list = [query for query in os.environ.get(
+        "WARMUP_QUERIES", "Airtel Niger services").split("|") if query.strip()]
+
+    # Query popularity log (count-min sketch + top-K) used to prime caches on startup;
+    # saved to QUERY_LOG_PATH (in memory only when empty), counts halved every QUERY_LOG_DECAY_HOURS
+    query_log_path: str = os.environ.get("QUERY_LOG_PATH", "")
+    query_log_top_k: int = int(os.environ.get("QUERY_LOG_TOP_K", 200))
+    query_log_decay_hours: float = float(os.environ.get("QUERY_LOG_DECAY_HOURS", 24))
+    # Most frequent queries primed by the warm-up, and whether their first-turn answers are precomputed
+    prime_top_n: int = int(os.environ.get("PRIME_TOP_N", 50))
+    prime_answers: bool = os.environ.get("PRIME_ANSWERS", "false").lower() == "true"
+    # Admin operations (knowledge-base refresh) for requests carrying X-Admin-Token: ADMIN_TOKEN (off when empty)
+    admin_token: str = os.environ.get("ADMIN_TOKEN", "")
+
+    # Request tracing: spans of sampled, slow (>= TRACE_SLOW_SECONDS) and failed
+    # requests written as JSONL to TRACE_PATH, rotated at TRACE_MAX_MB (off when empty)
+    trace_path: str = os.environ.get("TRACE_PATH", "")
+    trace_sample_rate: float = float(os.environ.get("TRACE_SAMPLE_RATE", 0.05))
+    trace_slow_seconds: float = float(os.environ.get("TRACE_SLOW_SECONDS", 5))
+    trace_max_mb: float = float(os.environ.get("TRACE_MAX_MB", 10))
+    trace_backups: int = int(os.environ.get("TRACE_BACKUPS", 3))
+
+    # Traffic capture for replay: one line per request (arrival time, hashed session,
+    # anonymized message, stage latencies) written to CAPTURE_PATH (off when empty)
+    capture_path: str = os.environ.get("CAPTURE_PATH", "")
+    capture_sample_rate: float = float(os.environ.get("CAPTURE_SAMPLE_RATE", 1.0))
+    capture_messages: bool = os.environ.get("CAPTURE_MESSAGES", "true").lower() == "true"
+    # Key of the session ID hash; random per process when empty (sessions then not linkable across restarts)
+    capture_salt: str = os.environ.get("CAPTURE_SALT", "")
+    capture_max_mb: float = float(os.environ.get("CAPTURE_MAX_MB", 20))
+    capture_backups: int = int(os.environ.get("CAPTURE_BACKUPS", 5))
+
+    # Request profiling: collapsed stacks written to PROFILE_DIR (off when empty) for
+    # requests carrying X-Profile-Token: PROFILE_TOKEN, or a PROFILE_SAMPLE_RATE fraction
+    profile_dir: str = os.environ.get("PROFILE_DIR", "")
+    profile_token: str = os.environ.get("PROFILE_TOKEN", "")
+    profile_sample_rate: float = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+    profile_interval_ms: float = float(os.environ.get("PROFILE_INTERVAL_MS", 5))
+    profile_keep: int = int(os.environ.get("PROFILE_KEEP", 50))
+
+    # Event-loop lag, measured every LOOP_LAG_INTERVAL_MS (0 = off); lags beyond
+    # LOOP_BLOCK_THRESHOLD_MS count as blocks, whose stack is logged in debug mode
+    loop_lag_interval_ms: float = float(os.environ.get("LOOP_LAG_INTERVAL_MS", 100))
+    loop_block_threshold_ms: float = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", 100))
+    loop_block_stacks: bool = os.environ.get("LOOP_BLOCK_STACKS", os.environ.get("DEBUG", "false")).lower() == "true"
+
+    # Logging: JSON (or "text") records written to stdout and LOG_FILE, rotated at
+    # LOG_MAX_MB, by a background thread; DEBUG lines kept for a LOG_DEBUG_SAMPLE_RATE
+    # fraction of requests, at most LOG_DEBUG_MAX_PER_SECOND
+    log_level: str = os.environ.get("LOG_LEVEL", "INFO").strip()
+    log_format: str = os.environ.get("LOG_FORMAT", "json")
+    log_file: str = os.environ.get("LOG_FILE", "")
+    log_max_mb: float = float(os.environ.get("LOG_MAX_MB", 10))
+    log_backups: int = int(os.environ.get("LOG_BACKUPS", 5))
+    log_queue_size: int = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+    log_debug_sample_rate: float = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", 0))
+    log_debug_max_per_second: float = float(os.environ.get("LOG_DEBUG_MAX_PER_SECOND", 50))
+
     # Performance optimization settings
     # Reduced from 30 seconds
     llm_timeout: int = int(os.environ.get("LLM_TIMEOUT", 60))
@@ -33,3 +136,18 @@ class Settings:
         "RAG_CACHE_ENABLED", "true").lower() == "true"
     max_concurrent_requests: int = int(
         os.environ.get("MAX_CONCURRENT_REQUESTS", 10))
+
+    # Resumable streaming settings
+    stream_buffer_max_events: int = int(
+        os.environ.get("STREAM_BUFFER_MAX_EVENTS", 512))
+    stream_buffer_max_completed: int = int(
+        os.environ.get("STREAM_BUFFER_MAX_COMPLETED", 256))
+    stream_buffer_ttl_seconds: int = int(
+        os.environ.get("STREAM_BUFFER_TTL_SECONDS", 120))
+
+    # WebSocket chat settings
+    ws_ping_interval_seconds: float = float(
+        os.environ.get("WS_PING_INTERVAL_SECONDS", 20))
+    ws_ping_timeout_seconds: float = float(
+        os.environ.get("WS_PING_TIMEOUT_SECONDS", 20))
+    ws_send_queue_size: int = int(os.environ.get("WS_SEND_QUEUE_SIZE", 64))
@@ -2,128 +2,369 @@
 Memory persistence and checkpointing for conversation memory.
 """
 
-from langgraph.checkpoint.memory import MemorySaver
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from .conversation_store import ConversationStore, freeze_state
+from .spill import SpilledState, SpillStorage, apply_session_budget, estimate_state_size
 
 logger = logging.getLogger(__name__)
 
-class Checkpointer:
+
+class _Shard:
+    """One stripe of the store: its own dict, lock and memory counters."""
+
+    __slots__ = ("states", "lock", "resident_bytes", "spilled_bytes", "spilled_count")
+
+    def __init__(self):
+        # thread_id -> (frozen state or SpilledState, last_activity, resident size);
+        # entries are replaced, never mutated
+        self.states: Dict[str, Tuple[Any, float, int]] = {}
+        self.lock = threading.Lock()
+        self.resident_bytes = 0
+        self.spilled_bytes = 0
+        self.spilled_count = 0
+
+
+class Checkpointer(ConversationStore):
     """
-    Wrapper for LangGraph memory systems with support for both short-term and long-term memory.
-    
-    Currently uses MemorySaver for short-term memory with a backup dictionary.
-    Designed to be extended for database-backed long-term memory in the future.
+    In-memory conversation-state store.
+
+    Holds exactly one copy of each thread's latest state. The LangGraph
+    workflow is compiled without a separate saver since every invocation
+    already receives the full history from this store.
+
+    Threads are spread over `num_shards` shards by hash of the thread ID,
+    each guarded by its own lock, so writers on different sessions do not
+    contend. Stored entries are immutable (messages are kept as tuples and
+    an entry is replaced rather than updated), which lets reads skip the
+    locks entirely.
+
+    Memory is bounded twice: each saved history is cut to the per-session
+    budget, and once the estimated resident size of all states exceeds
+    `memory_budget_bytes`, the least recently active sessions are spilled
+    to compressed bytes (in memory or under `spill_dir`) until the store
+    is back under `spill_target_ratio` of the budget. A spilled session is
+    rehydrated transparently the next time its state is read.
     """
-    def __init__(self, db_path: str = None):
+
+    def __init__(self, db_path: str = None, num_shards: int = 64, memory_budget_bytes: int = 0,
+                 max_session_messages: int = 0, max_session_bytes: int = 0,
+                 spill_dir: Optional[str] = None, spill_target_ratio: float = 0.8):
         """
         Initialize the checkpointer.
-        
+
         Args:
-            db_path: Path to database for future long-term storage (not used currently)
-        """
-        # Initialize MemorySaver for short-term memory
-        self.memory = MemorySaver()
-        
-        # Backup in-memory storage for states
-        self.states: Dict[str, Any] = {}
-        
-        # Store db_path for future database integration
+            db_path: Ignored by the in-memory store; see create_checkpointer
+            num_shards: Number of lock stripes
+            memory_budget_bytes: Estimated resident size above which idle sessions are spilled (0 for no limit)
+            max_session_messages: Maximum number of messages kept per session (0 for no limit)
+            max_session_bytes: Maximum estimated size of a session's messages (0 for no limit)
+            spill_dir: Directory for spilled sessions; kept compressed in memory when empty
+            spill_target_ratio: Fraction of the budget a spill pass brings the store back to
+        """
+        self.shards: List[_Shard] = [_Shard() for _ in range(num_shards)]
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_session_messages = max_session_messages
+        self.max_session_bytes = max_session_bytes
+        self.spill_target_ratio = spill_target_ratio
+        self.spill_storage = SpillStorage(spill_dir)
+        # Only one spill pass runs at a time; other writers skip it
+        self.spill_lock = threading.Lock()
+
+        # Store db_path for database-backed stores
         self.db_path = db_path
-        
+
         logger.info("Initialized in-memory checkpointer for short-term memory")
-        if db_path:
-            logger.info(f"Database path {db_path} stored for future long-term memory integration")
-    
-    def get_memory(self):
-        """Get the MemorySaver memory object for LangGraph integration."""
-        return self.memory
-    
+
+    def _shard(self, thread_id: str) -> _Shard:
+        return self.shards[hash(thread_id) % len(self.shards)]
+
     def save_state(self, state: Dict[str, Any], thread_id: str = "default") -> None:
         """
-        Save state manually for a specific thread.
-        
+        Save the state for a thread and mark it as active.
+
         Args:
             state: The state to save
             thread_id: The thread ID to save the state for
         """
-        logger.info(f"Manually saving state for thread: {thread_id}")
-        
-        # Save to our backup dictionary
-        self.states[thread_id] = state
-        
-        # Try to save to LangGraph memory if possible
-        try:
-            config = {"configurable": {"thread_id": thread_id}}
-            # MemorySaver doesn't have a direct save method, but we can
-            # save the state by simulating a workflow run
-            self.memory.put(config, state, {}, {})
-            logger.debug(f"State saved to LangGraph memory for thread: {thread_id}")
-        except Exception as e:
-            logger.debug(f"Could not save to LangGraph memory (expected behavior): {str(e)}")
-    
+        logger.debug("Saving state for thread: %s", thread_id)
+        messages = apply_session_budget(
+            tuple(state.get("messages", ())), self.max_session_messages, self.max_session_bytes)
+        frozen = freeze_state(state, messages)
+        size = estimate_state_size(frozen)
+        shard = self._shard(thread_id)
+        with shard.lock:
+            previous = shard.states.get(thread_id)
+            shard.states[thread_id] = (frozen, time.time(), size)
+            shard.resident_bytes += size
+            if previous:
+                self._release(shard, previous)
+        self._enforce_budget()
+
     def get_state(self, thread_id: str = "default") -> Optional[Dict[str, Any]]:
         """
-        Get state manually for a specific thread.
-        
+        Get the state for a thread, rehydrating it if it was spilled.
+
+        The returned state is shared and must be treated as read-only; its
+        message, document and tool-call sequences are tuples.
+
         Args:
             thread_id: The thread ID to get the state for
-            
+
         Returns:
             The state for the thread, or None if not found
         """
-        # Try to get from LangGraph memory first
-        try:
-            config = {"configurable": {"thread_id": thread_id}}
-            state = self.memory.get(config)
-            if state:
-                logger.debug(f"Retrieved state from LangGraph memory for thread: {thread_id}")
-                # Update our backup store for consistency
-                self.states[thread_id] = state
-                return state
-        except Exception as e:
-            logger.debug(f"Could not get state from LangGraph memory (expected behavior): {str(e)}")
-        
-        # Fall back to our backup in-memory state
-        state = self.states.get(thread_id)
-        if state:
-            logger.debug(f"Retrieved state from backup memory for thread: {thread_id}")
-        return state
-    
+        entry = self._shard(thread_id).states.get(thread_id)
+        if entry is None:
+            return None
+        if isinstance(entry[0], SpilledState):
+            return self._rehydrate(thread_id, entry)
+        return entry[0]
+
     def clear_state(self, thread_id: str = "default") -> bool:
         """
-        Clear the state for a specific thread.
-        
+        Clear the state for a thread.
+
         Args:
             thread_id: The thread ID to clear
-            
+
         Returns:
             True if state was found and cleared, False otherwise
         """
-        found = False
-        
-        # Clear from our backup dictionary
-        if thread_id in self.states:
-            del self.states[thread_id]
-            found = True
-            logger.info(f"Cleared state from backup memory for thread: {thread_id}")
-        
-        # Try to clear from LangGraph memory
-        try:
-            config = {"configurable": {"thread_id": thread_id}}
-            if self.memory.delete(config):
-                found = True
-                logger.debug(f"Cleared state from LangGraph memory for thread: {thread_id}")
-        except Exception as e:
-            logger.debug(f"Could not clear state from LangGraph memory: {str(e)}")
-        
-        return found
-    
+        shard = self._shard(thread_id)
+        with shard.lock:
+            entry = shard.states.pop(thread_id, None)
+            if entry:
+                self._release(shard, entry)
+        if entry:
+            logger.info(f"Cleared state for thread: {thread_id}")
+        return entry is not None
+
     def list_threads(self) -> list[str]:
         """
         List all thread IDs with saved states.
-        
+
         Returns:
             List of thread IDs
         """
-        return list(self.states.keys()) 
\ No newline at end of file
+        return [thread_id for shard in self.shards for thread_id, _ in self._snapshot(shard)]
+
+    def iter_threads(self) -> Iterator[Tuple[str, Dict[str, Any], float]]:
+        """
+        Iterate over threads shard by shard.
+
+        Each shard is snapshotted on its own, so no lock is held across the
+        whole store. Spilled threads are rehydrated; use iter_summaries to
+        walk the store without loading them.
+
+        Yields:
+            Tuples of (thread_id, state, last_activity)
+        """
+        for shard in self.shards:
+            for thread_id, entry in self._snapshot(shard):
+                state = entry[0]
+                if isinstance(state, SpilledState):
+                    state = self._rehydrate(thread_id, entry)
+                    if state is None:
+                        continue
+                yield thread_id, state, entry[1]
+
+    def iter_summaries(self) -> Iterator[Tuple[str, int, float]]:
+        """
+        Iterate over threads without rehydrating spilled ones.
+
+        Yields:
+            Tuples of (thread_id, message_count, last_activity)
+        """
+        for shard in self.shards:
+            for thread_id, (state, last_activity, _) in self._snapshot(shard):
+                if isinstance(state, SpilledState):
+                    yield thread_id, state.message_count, last_activity
+                else:
+                    yield thread_id, len(state["messages"]), last_activity
+
+    def touch(self, thread_id: str) -> None:
+        """
+        Mark a thread as active without changing its state.
+
+        Args:
+            thread_id: The thread ID to touch
+        """
+        shard = self._shard(thread_id)
+        with shard.lock:
+            entry = shard.states.get(thread_id)
+            if entry:
+                shard.states[thread_id] = (entry[0], time.time(), entry[2])
+
+    def last_activity(self, thread_id: str) -> Optional[float]:
+        """
+        Get the last-activity timestamp of a thread.
+
+        Args:
+            thread_id: The thread ID
+
+        Returns:
+            Unix timestamp of the last save or touch, or None if not found
+        """
+        entry = self._shard(thread_id).states.get(thread_id)
+        return entry[1] if entry else None
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Get resident and spilled session counts and sizes.
+
+        Returns:
+            Dictionary of memory statistics; resident bytes are estimates
+        """
+        sessions = resident_bytes = spilled_bytes = spilled_count = 0
+        for shard in self.shards:
+            with shard.lock:
+                sessions += len(shard.states)
+                resident_bytes += shard.resident_bytes
+                spilled_bytes += shard.spilled_bytes
+                spilled_count += shard.spilled_count
+        return {
+            "resident_sessions": sessions - spilled_count,
+            "resident_bytes": resident_bytes,
+            "spilled_sessions": spilled_count,
+            "spilled_bytes": spilled_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "spill_location": self.spill_storage.spill_dir or "memory"
+        }
+
+    def spill_idle_sessions(self, target_bytes: int) -> int:
+        """
+        Spill the least recently active sessions until the resident size fits.
+
+        Args:
+            target_bytes: Estimated resident size to get down to
+
+        Returns:
+            Number of sessions spilled
+        """
+        resident = []
+        for shard in self.shards:
+            for thread_id, entry in self._snapshot(shard):
+                if not isinstance(entry[0], SpilledState):
+                    resident.append((entry[1], thread_id))
+        resident.sort()
+
+        spilled = 0
+        excess = self._resident_bytes() - target_bytes
+        for _, thread_id in resident:
+            if excess <= 0:
+                break
+            shard = self._shard(thread_id)
+            entry = shard.states.get(thread_id)
+            if entry is None or isinstance(entry[0], SpilledState):
+                continue
+            record = self.spill_storage.spill(thread_id, entry[0])
+            with shard.lock:
+                if shard.states.get(thread_id) is not entry:
+                    # Saved, touched or cleared meanwhile; keep the newer entry
+                    self.spill_storage.discard(record)
+                    continue
+                shard.states[thread_id] = (record, entry[1], entry[2])
+                shard.resident_bytes -= entry[2]
+                shard.spilled_bytes += record.nbytes
+                shard.spilled_count += 1
+            excess -= entry[2]
+            spilled += 1
+
+        if spilled:
+            logger.info(f"Spilled {spilled} idle sessions to keep memory under budget")
+        return spilled
+
+    def after_fork(self) -> None:
+        """Replace the shard and spill locks in a worker forked from the master."""
+        for shard in self.shards:
+            shard.lock = threading.Lock()
+        self.spill_lock = threading.Lock()
+
+    def _rehydrate(self, thread_id: str, entry: Tuple[Any, float, int]) -> Optional[Dict[str, Any]]:
+        record = entry[0]
+        state = freeze_state(self.spill_storage.load(record))
+        shard = self._shard(thread_id)
+        with shard.lock:
+            current = shard.states.get(thread_id)
+            if current is None:
+                return None
+            if current is not entry:
+                # Rehydrated or replaced by another caller meanwhile
+                if not isinstance(current[0], SpilledState):
+                    return current[0]
+                state = freeze_state(self.spill_storage.load(current[0]))
+                entry, record = current, current[0]
+            shard.states[thread_id] = (state, entry[1], entry[2])
+            shard.resident_bytes += entry[2]
+            shard.spilled_bytes -= record.nbytes
+            shard.spilled_count -= 1
+            self.spill_storage.discard(record)
+        logger.debug("Rehydrated spilled state for thread: %s", thread_id)
+        return state
+
+    def _release(self, shard: _Shard, entry: Tuple[Any, float, int]) -> None:
+        # Called with shard.lock held, for an entry that was replaced or removed
+        if isinstance(entry[0], SpilledState):
+            shard.spilled_bytes -= entry[0].nbytes
+            shard.spilled_count -= 1
+            self.spill_storage.discard(entry[0])
+        else:
+            shard.resident_bytes -= entry[2]
+
+    def _resident_bytes(self) -> int:
+        return sum(shard.resident_bytes for shard in self.shards)
+
+    def _enforce_budget(self) -> None:
+        if not self.memory_budget_bytes or self._resident_bytes() <= self.memory_budget_bytes:
+            return
+        if not self.spill_lock.acquire(blocking=False):
+            return
+        try:
+            self.spill_idle_sessions(int(self.memory_budget_bytes * self.spill_target_ratio))
+        except Exception as e:
+            logger.error(f"Error spilling idle sessions: {str(e)}")
+        finally:
+            self.spill_lock.release()
+
+    @staticmethod
+    def _snapshot(shard: _Shard) -> List[Tuple[str, Tuple[Any, float, int]]]:
+        with shard.lock:
+            return list(shard.states.items())
+
+
+def create_checkpointer(db_path: str = None, cache_size: int = 1024, memory_budget_bytes: int = 0,
+                        max_session_messages: int = 0, max_session_bytes: int = 0,
+                        spill_dir: Optional[str] = None, shared_state=None,
+                        session_ttl_seconds: Optional[float] = None) -> ConversationStore:
+    """
+    Create the conversation store for the configured backend.
+
+    Args:
+        db_path: Path to the SQLite database; the in-memory store is used when empty
+        cache_size: Number of hot thread states kept in memory by the SQLite store
+        memory_budget_bytes: Resident budget of the in-memory store (0 for no limit)
+        max_session_messages: Maximum number of messages kept per session (0 for no limit)
+        max_session_bytes: Maximum estimated size of a session's messages (0 for no limit)
+        spill_dir: Directory for sessions spilled by the in-memory store
+        shared_state: SharedStateBackend shared by all workers; takes precedence over db_path
+        session_ttl_seconds: Inactivity after which the shared backend drops a session
+
+    Returns:
+        A SharedCheckpointer when shared_state is set, a SQLiteCheckpointer when db_path
+        is set, otherwise an in-memory Checkpointer
+    """
+    if shared_state is not None:
+        from .shared_checkpointer import SharedCheckpointer
+        return SharedCheckpointer(shared_state, max_session_messages=max_session_messages,
+                                  max_session_bytes=max_session_bytes, ttl_seconds=session_ttl_seconds)
+    if db_path:
+        from .sqlite_checkpointer import SQLiteCheckpointer
+        # The database already holds every state; only the LRU stays resident
+        return SQLiteCheckpointer(db_path, cache_size=cache_size, max_session_messages=max_session_messages,
+                                  max_session_bytes=max_session_bytes)
+    return Checkpointer(memory_budget_bytes=memory_budget_bytes, max_session_messages=max_session_messages,
+                        max_session_bytes=max_session_bytes, spill_dir=spill_dir)
@@ -0,0 +1,164 @@
+"""
+Conversation-state store interface shared by the API and the agent.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+
+
+def freeze_state(state: Dict[str, Any], messages: Optional[Sequence[BaseMessage]] = None) -> Dict[str, Any]:
+    """
+    Make the sequences of a state read-only, as stores keep and share them.
+
+    Args:
+        state: The agent state
+        messages: Messages to keep instead of the state's own (e.g. after the session budget)
+
+    Returns:
+        A new state whose messages, retrieved documents and tool calls are tuples
+    """
+    return {
+        **state,
+        "messages": tuple(state.get("messages", ()) if messages is None else messages),
+        "retrieved_docs": tuple(state.get("retrieved_docs", ())),
+        "tool_calls": tuple(state.get("tool_calls", ()))
+    }
+
+
+class ConversationStore(ABC):
+    """
+    Single source of truth for conversation state.
+
+    Each thread (session) maps to one agent state plus its last-activity
+    timestamp. The agent writes the state once per turn; the API and the
+    session manager only read, touch, list and clear threads.
+    """
+
+    @abstractmethod
+    def save_state(self, state: Dict[str, Any], thread_id: str = "default") -> None:
+        """
+        Save the state for a thread and mark it as active.
+
+        Args:
+            state: The agent state to save
+            thread_id: The thread ID to save the state for
+        """
+
+    @abstractmethod
+    def get_state(self, thread_id: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Get the state for a thread.
+
+        Args:
+            thread_id: The thread ID to get the state for
+
+        Returns:
+            The state for the thread, or None if not found
+        """
+
+    @abstractmethod
+    def clear_state(self, thread_id: str = "default") -> bool:
+        """
+        Clear the state for a thread.
+
+        Args:
+            thread_id: The thread ID to clear
+
+        Returns:
+            True if state was found and cleared, False otherwise
+        """
+
+    @abstractmethod
+    def list_threads(self) -> list[str]:
+        """
+        List all thread IDs with saved states.
+
+        Returns:
+            List of thread IDs
+        """
+
+    @abstractmethod
+    def touch(self, thread_id: str) -> None:
+        """
+        Mark a thread as active without changing its state.
+
+        Args:
+            thread_id: The thread ID to touch
+        """
+
+    @abstractmethod
+    def last_activity(self, thread_id: str) -> Optional[float]:
+        """
+        Get the last-activity timestamp of a thread.
+
+        Args:
+            thread_id: The thread ID
+
+        Returns:
+            Unix timestamp of the last save or touch, or None if not found
+        """
+
+    def iter_threads(self) -> Iterator[Tuple[str, Dict[str, Any], float]]:
+        """
+        Iterate over all threads with their state and last activity.
+
+        Yields:
+            Tuples of (thread_id, state, last_activity)
+        """
+        for thread_id in self.list_threads():
+            state = self.get_state(thread_id)
+            last_activity = self.last_activity(thread_id)
+            if state is not None and last_activity is not None:
+                yield thread_id, state, last_activity
+
+    def iter_summaries(self) -> Iterator[Tuple[str, int, float]]:
+        """
+        Iterate over all threads with their message count and last activity.
+
+        Yields:
+            Tuples of (thread_id, message_count, last_activity)
+        """
+        for thread_id, state, last_activity in self.iter_threads():
+            yield thread_id, len(state["messages"]), last_activity
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Get resident and spilled session counts and sizes.
+
+        Returns:
+            Dictionary of memory statistics
+        """
+        sessions = len(self.list_threads())
+        return {"resident_sessions": sessions, "spilled_sessions": 0}
+
+    def get_messages(self, thread_id: str = "default") -> List[BaseMessage]:
+        """
+        Get a copy of the message history of a thread.
+
+        Args:
+            thread_id: The thread ID
+
+        Returns:
+            List of messages, empty if the thread has no state
+        """
+        state = self.get_state(thread_id)
+        return list(state["messages"]) if state else []
+
+    def after_fork(self) -> None:
+        """
+        Reset process-local resources in a worker forked from the master.
+
+        Locks held by a master thread at fork time would stay locked in the
+        child, and threads do not survive a fork.
+        """
+
+    def get_memory(self):
+        """
+        Get the LangGraph checkpointer to compile the workflow with.
+
+        Returns:
+            A LangGraph checkpoint saver, or None when the store keeps the state itself
+        """
+        return None
@@ -2,126 +2,220 @@
 Session management for conversation history with timeout functionality.
 """
 
+import heapq
 import time
 import threading
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Tuple
 from langchain_core.messages import BaseMessage
 
+from .conversation_store import ConversationStore
+from .checkpointer import Checkpointer
+
 logger = logging.getLogger(__name__)
 
 class SessionManager:
     """
     Manages chat sessions with automatic timeout functionality.
     Sessions inactive for longer than the timeout period will be automatically cleared.
+
+    Conversation state lives in a ConversationStore shared with the agent;
+    the session manager only reads it, tracks activity and expires it.
+
+    Expiry is driven by a min-heap of deadlines with lazy deletion: each
+    session has at most one heap entry, and a sweep only pops the entries
+    that are due. If the session was active since its entry was pushed, it
+    is re-scheduled at its new deadline instead of being expired.
     """
-    
-    def __init__(self, timeout_minutes: int = 30):
+
+    def __init__(self, timeout_minutes: int = 30, store: Optional[ConversationStore] = None):
         """
         Initialize the session manager.
-        
+
         Args:
             timeout_minutes: Number of minutes of inactivity before a session is cleared
+            store: Conversation-state store shared with the agent
         """
-        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.store = store or Checkpointer()
         self.timeout_minutes = timeout_minutes
-        self.lock = threading.RLock()
-        
+        self.timeout_seconds = timeout_minutes * 60
+
+        # (deadline, session_id) min-heap; `scheduled` holds the sessions that have an entry
+        self.expiry_heap: List[Tuple[float, str]] = []
+        self.scheduled: set = set()
+        self.heap_lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+        # Schedule sessions already present in a durable store
+        for session_id in self.store.list_threads():
+            last_activity = self.store.last_activity(session_id)
+            if last_activity is not None:
+                self._schedule(session_id, last_activity + self.timeout_seconds)
+
         # Start the cleanup thread
         self.cleanup_thread = threading.Thread(target=self._cleanup_expired_sessions, daemon=True)
         self.cleanup_thread.start()
-        
+
         logger.info(f"Session manager initialized with {timeout_minutes} minute timeout")
-    
+
     def get_session(self, session_id: str) -> List[BaseMessage]:
         """
         Get the message history for a session.
-        
+
         Args:
             session_id: The session identifier
-            
+
         Returns:
-            List of messages in the session
-        """
-        with self.lock:
-            if session_id not in self.sessions:
-                self.sessions[session_id] = {
-                    "messages": [],
-                    "last_activity": time.time()
-                }
-            else:
-                # Update last activity time
-                self.sessions[session_id]["last_activity"] = time.time()
-                
-            return self.sessions[session_id]["messages"]
-    
+            A copy of the messages in the session
+        """
+        self.store.touch(session_id)
+        if session_id not in self.scheduled:
+            self._schedule(session_id, time.time() + self.timeout_seconds)
+        return self.store.get_messages(session_id)
+
     def update_session(self, session_id: str, messages: List[BaseMessage]) -> None:
         """
-        Update the message history for a session.
-        
+        Replace the message history for a session.
+
+        The agent already saves the state once per turn; this is only for
+        callers that modify a history outside of an agent turn.
+
         Args:
             session_id: The session identifier
             messages: The updated list of messages
         """
-        with self.lock:
-            self.sessions[session_id] = {
-                "messages": messages,
-                "last_activity": time.time()
-            }
-    
+        state = self.store.get_state(session_id) or {
+            "retrieved_docs": [],
+            "current_query": "",
+            "tool_calls": []
+        }
+        self.store.save_state({**state, "messages": messages}, session_id)
+
     def clear_session(self, session_id: str) -> bool:
         """
         Clear a session's message history.
-        
+
         Args:
             session_id: The session identifier
-            
+
         Returns:
             True if session was found and cleared, False otherwise
         """
-        with self.lock:
-            if session_id in self.sessions:
-                del self.sessions[session_id]
-                logger.info(f"Cleared session {session_id}")
-                return True
-            return False
-    
+        if self.store.clear_state(session_id):
+            logger.info(f"Cleared session {session_id}")
+            return True
+        return False
+
     def get_all_sessions(self) -> Dict[str, Dict[str, Any]]:
         """
         Get all active sessions.
-        
+
         Returns:
             Dictionary of session data
         """
-        with self.lock:
-            return self.sessions.copy()
-    
+        return {
+            session_id: {"messages": messages, "last_activity": last_activity}
+            for session_id, messages, last_activity in self.iter_sessions()
+        }
+
+    def iter_sessions(self) -> Iterator[Tuple[str, Sequence[BaseMessage], float]]:
+        """
+        Iterate over active sessions without copying the whole store.
+
+        Yields:
+            Tuples of (session_id, messages, last_activity)
+        """
+        for session_id, state, last_activity in self.store.iter_threads():
+            yield session_id, state["messages"], last_activity
+
+    def iter_session_summaries(self) -> Iterator[Tuple[str, int, float]]:
+        """
+        Iterate over active sessions without loading spilled histories.
+
+        Yields:
+            Tuples of (session_id, message_count, last_activity)
+        """
+        return self.store.iter_summaries()
+
+    def expire_due_sessions(self, now: Optional[float] = None) -> int:
+        """
+        Expire the sessions whose deadline has passed.
+
+        Only heap entries that are due are examined. Sessions that were
+        active since they were scheduled are pushed back at their new
+        deadline; the others are cleared from the store, which removes
+        their only copy of the conversation state.
+
+        Args:
+            now: Current time, defaults to time.time()
+
+        Returns:
+            Number of sessions expired
+        """
+        now = now if now is not None else time.time()
+        expired = 0
+        while True:
+            with self.heap_lock:
+                if not self.expiry_heap or self.expiry_heap[0][0] > now:
+                    break
+                _, session_id = heapq.heappop(self.expiry_heap)
+                self.scheduled.discard(session_id)
+
+            last_activity = self.store.last_activity(session_id)
+            if last_activity is None:
+                # Already cleared
+                continue
+            deadline = last_activity + self.timeout_seconds
+            if deadline > now:
+                self._schedule(session_id, deadline)
+                continue
+
+            self.store.clear_state(session_id)
+            expired += 1
+            logger.info(f"Session {session_id} expired after {self.timeout_minutes} minutes of inactivity")
+
+        return expired
+
+    def after_fork(self) -> None:
+        """
+        Restart expiry in a worker forked from the master.
+
+        Threads do not survive a fork, so the cleanup thread is started
+        again, with fresh locks, after the store has reset its own.
+        """
+        self.store.after_fork()
+        self.heap_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.cleanup_thread = threading.Thread(target=self._cleanup_expired_sessions, daemon=True)
+        self.cleanup_thread.start()
+
+    def _schedule(self, session_id: str, deadline: float) -> None:
+        with self.heap_lock:
+            if session_id in self.scheduled:
+                return
+            heapq.heappush(self.expiry_heap, (deadline, session_id))
+            self.scheduled.add(session_id)
+
+    def _next_deadline(self) -> Optional[float]:
+        with self.heap_lock:
+            return self.expiry_heap[0][0] if self.expiry_heap else None
+
     def _cleanup_expired_sessions(self) -> None:
         """
-        Periodically clean up expired sessions.
+        Expire sessions as their deadlines come due.
         This runs in a background thread.
         """
         while True:
             try:
-                # Sleep for 5 minutes between cleanup checks
-                time.sleep(300)
-                
-                current_time = time.time()
-                timeout_seconds = self.timeout_minutes * 60
-                
-                with self.lock:
-                    # Find expired sessions
-                    expired_sessions = [
-                        session_id for session_id, data in self.sessions.items()
-                        if current_time - data["last_activity"] > timeout_seconds
-                    ]
-                    
-                    # Remove expired sessions
-                    for session_id in expired_sessions:
-                        del self.sessions[session_id]
-                        logger.info(f"Session {session_id} expired after {self.timeout_minutes} minutes of inactivity")
-                
-                logger.debug(f"Cleaned up {len(expired_sessions)} expired sessions")
-                
+                # Sleep until the earliest deadline (or at most a minute when idle)
+                next_deadline = self._next_deadline()
+                wait = 60.0 if next_deadline is None else max(0.0, min(60.0, next_deadline - time.time()))
+                self.wakeup.wait(wait)
+                self.wakeup.clear()
+
+                expired = self.expire_due_sessions()
+                if expired:
+                    logger.debug("Cleaned up %d expired sessions", expired)
+
             except Exception as e:
-                logger.error(f"Error in session cleanup: {str(e)}") 
\ No newline at end of file
+                logger.error(f"Error in session cleanup: {str(e)}")
@@ -0,0 +1,155 @@
+"""
+Conversation store over the shared state backend, for multi-worker deployments.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .conversation_store import ConversationStore, freeze_state
+from .shared_state import SharedStateBackend
+from .spill import apply_session_budget
+from .state_codec import StateCodec
+
+logger = logging.getLogger(__name__)
+
+# Namespaces of the shared state backend
+STATE_NAMESPACE = "state"
+ACTIVITY_NAMESPACE = "activity"
+
+
+class SharedCheckpointer(ConversationStore):
+    """
+    Conversation store whose states live in a SharedStateBackend.
+
+    Every worker reads and writes the same backend, so any worker can
+    serve the next turn of a session. States are encoded with the compact
+    StateCodec; activity timestamps are kept under their own keys so that
+    touching a session does not rewrite its state.
+
+    With `ttl_seconds`, both expire in the backend after that long without
+    a save or touch. A worker only expires the sessions it has seen itself,
+    and a recycled worker starts from the master's memory, so without a
+    TTL a session whose worker went away would never be removed.
+    """
+
+    def __init__(self, backend: SharedStateBackend, max_session_messages: int = 0,
+                 max_session_bytes: int = 0, serde=None, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the checkpointer.
+
+        Args:
+            backend: Shared state backend
+            max_session_messages: Maximum number of messages kept per session (0 for no limit)
+            max_session_bytes: Maximum estimated size of a session's messages (0 for no limit)
+            serde: Optional LangGraph serializer (defaults to the compact StateCodec)
+            ttl_seconds: Inactivity after which the backend drops a session (normally the session timeout)
+        """
+        self.backend = backend
+        self.max_session_messages = max_session_messages
+        self.max_session_bytes = max_session_bytes
+        self.serde = serde or StateCodec()
+        self.ttl_seconds = ttl_seconds
+        logger.info("Initialized shared checkpointer for multi-worker memory")
+
+    def save_state(self, state: Dict[str, Any], thread_id: str = "default") -> None:
+        """
+        Save the state for a thread and mark it as active.
+
+        Args:
+            state: The state to save
+            thread_id: The thread ID to save the state for
+        """
+        state = freeze_state(state, apply_session_budget(
+            tuple(state.get("messages", ())), self.max_session_messages, self.max_session_bytes))
+        state_type, blob = self.serde.dumps_typed(state)
+        self.backend.set(STATE_NAMESPACE, thread_id, state_type.encode("utf-8") + b"\0" + blob,
+                         ttl_seconds=self.ttl_seconds)
+        self.backend.set(ACTIVITY_NAMESPACE, thread_id, repr(time.time()).encode("ascii"),
+                         ttl_seconds=self.ttl_seconds)
+
+    def get_state(self, thread_id: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Get the state for a thread.
+
+        Args:
+            thread_id: The thread ID to get the state for
+
+        Returns:
+            The state for the thread, or None if not found
+        """
+        value = self.backend.get(STATE_NAMESPACE, thread_id)
+        if value is None:
+            return None
+        state_type, _, blob = value.partition(b"\0")
+        return freeze_state(self.serde.loads_typed((state_type.decode("utf-8"), blob)))
+
+    def clear_state(self, thread_id: str = "default") -> bool:
+        """
+        Clear the state for a thread.
+
+        Args:
+            thread_id: The thread ID to clear
+
+        Returns:
+            True if state was found and cleared, False otherwise
+        """
+        found = self.backend.delete(STATE_NAMESPACE, thread_id)
+        self.backend.delete(ACTIVITY_NAMESPACE, thread_id)
+        if found:
+            logger.info(f"Cleared state for thread: {thread_id}")
+        return found
+
+    def list_threads(self) -> list[str]:
+        """
+        List all thread IDs with saved states.
+
+        Returns:
+            List of thread IDs
+        """
+        return self.backend.keys(STATE_NAMESPACE)
+
+    def touch(self, thread_id: str) -> None:
+        """
+        Mark a thread as active without changing its state.
+
+        Args:
+            thread_id: The thread ID to touch
+        """
+        self.backend.set(ACTIVITY_NAMESPACE, thread_id, repr(time.time()).encode("ascii"),
+                         ttl_seconds=self.ttl_seconds)
+        if self.ttl_seconds:
+            self.backend.expire(STATE_NAMESPACE, thread_id, self.ttl_seconds)
+
+    def last_activity(self, thread_id: str) -> Optional[float]:
+        """
+        Get the last-activity timestamp of a thread.
+
+        Args:
+            thread_id: The thread ID
+
+        Returns:
+            Unix timestamp of the last save or touch, or None if not found
+        """
+        value = self.backend.get(ACTIVITY_NAMESPACE, thread_id)
+        # Existence only: the state blob is not read or decoded
+        if value is None or not self.backend.exists(STATE_NAMESPACE, thread_id):
+            return None
+        return float(value)
+
+    def after_fork(self) -> None:
+        """Reset the backend's connection in a worker forked from the master."""
+        self.backend.after_fork()
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Get session counts; states are held by the shared backend, not by this worker.
+
+        Returns:
+            Dictionary of memory statistics
+        """
+        return {
+            "resident_sessions": 0,
+            "shared_sessions": len(self.list_threads()),
+            "backend": type(self.backend).__name__
+        }
@@ -0,0 +1,333 @@
+"""
+Key-value state shared by all worker processes of a deployment.
+
+Sessions, checkpoints and the RAG cache use this backend when the API runs
+with more than one worker, so a follow-up that lands on another worker
+still sees the conversation. `SQLiteSharedState` is the local-only
+implementation (one database file on the host, e.g. under /dev/shm);
+external stores plug in through `register_backend`.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+_SELECT = "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?"
+_UPSERT = (
+    "INSERT INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at")
+_DELETE = "DELETE FROM kv WHERE namespace = ? AND key = ?"
+_SELECT_KEYS = "SELECT key FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)"
+_PURGE_EXPIRED = "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?"
+_EXISTS = "SELECT 1 FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)"
+_EXPIRE = ("UPDATE kv SET expires_at = ? WHERE namespace = ? AND key = ? "
+           "AND (expires_at IS NULL OR expires_at > ?)")
+# Seconds between purges of expired rows, done by whichever worker writes next
+PURGE_INTERVAL_SECONDS = 60
+
+
+class SharedStateBackend(ABC):
+    """Namespaced byte key-value store visible to every worker process."""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """
+        Get a value.
+
+        Args:
+            namespace: Namespace of the key (e.g. "state", "rag_cache")
+            key: The key
+
+        Returns:
+            The value, or None if missing or expired
+        """
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Set a value.
+
+        Args:
+            namespace: Namespace of the key
+            key: The key
+            value: The value
+            ttl_seconds: Optional time to live
+        """
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        """
+        Delete a value.
+
+        Args:
+            namespace: Namespace of the key
+            key: The key
+
+        Returns:
+            True if the key existed, False otherwise
+        """
+
+    @abstractmethod
+    def keys(self, namespace: str) -> List[str]:
+        """
+        List the live keys of a namespace.
+
+        Args:
+            namespace: The namespace
+
+        Returns:
+            List of keys
+        """
+
+    def exists(self, namespace: str, key: str) -> bool:
+        """
+        Check that a value exists, without reading it.
+
+        Args:
+            namespace: Namespace of the key
+            key: The key
+
+        Returns:
+            True if the key exists and has not expired, False otherwise
+        """
+        return self.get(namespace, key) is not None
+
+    def expire(self, namespace: str, key: str, ttl_seconds: float) -> bool:
+        """
+        Set the time to live of an existing value, without rewriting it.
+
+        Args:
+            namespace: Namespace of the key
+            key: The key
+            ttl_seconds: New time to live, from now
+
+        Returns:
+            True if the key exists, False otherwise
+        """
+        value = self.get(namespace, key)
+        if value is None:
+            return False
+        self.set(namespace, key, value, ttl_seconds)
+        return True
+
+    def close(self) -> None:
+        """Release the backend's resources."""
+
+    def after_fork(self) -> None:
+        """Reset process-local resources in a worker forked from the master."""
+
+
+class SQLiteSharedState(SharedStateBackend):
+    """
+    Shared state in a local SQLite database.
+
+    WAL mode lets every worker read while one writes. Connections are
+    opened per process, so the backend can be created before workers are
+    forked.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000):
+        """
+        Initialize the backend.
+
+        Args:
+            db_path: Path to the database file, shared by all workers of the host
+            busy_timeout_ms: How long a writer waits for another worker's write lock
+        """
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.pid: Optional[int] = None
+        self.last_purge = 0.0
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection()
+        logger.info(f"Initialized SQLite shared state at {db_path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Called with self.lock held (or from __init__); reconnects after a fork
+        if self.conn is None or self.pid != os.getpid():
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                                        timeout=self.busy_timeout_ms / 1000)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(_SCHEMA)
+            self.pid = os.getpid()
+        return self.conn
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self.lock:
+            row = self._connection().execute(_SELECT, (namespace, key)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        with self.lock:
+            self._connection().execute(_UPSERT, (namespace, key, value, expires_at))
+            # Expired rows are invisible but stay in the file until purged
+            if now - self.last_purge > PURGE_INTERVAL_SECONDS:
+                self.last_purge = now
+                self._connection().execute(_PURGE_EXPIRED, (now,))
+
+    def exists(self, namespace: str, key: str) -> bool:
+        with self.lock:
+            return self._connection().execute(_EXISTS, (namespace, key, time.time())).fetchone() is not None
+
+    def expire(self, namespace: str, key: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self.lock:
+            return self._connection().execute(_EXPIRE, (now + ttl_seconds, namespace, key, now)).rowcount > 0
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self.lock:
+            return self._connection().execute(_DELETE, (namespace, key)).rowcount > 0
+
+    def keys(self, namespace: str) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self._connection().execute(_SELECT_KEYS, (namespace, time.time()))]
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired entries.
+
+        Returns:
+            Number of entries deleted
+        """
+        with self.lock:
+            return self._connection().execute(_PURGE_EXPIRED, (time.time(),)).rowcount
+
+    def close(self) -> None:
+        with self.lock:
+            if self.conn is not None and self.pid == os.getpid():
+                self.conn.close()
+            self.conn = None
+
+    def after_fork(self) -> None:
+        # The master's connection is left alone; _connection() opens a new one
+        self.lock = threading.Lock()
+
+
+class RedisSharedState(SharedStateBackend):
+    """
+    Shared state in Redis, for deployments spanning several hosts.
+
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "airtel"):
+        """
+        Initialize the backend.
+
+        Args:
+            url: Redis URL (redis://host:port/db)
+            prefix: Prefix of every key written by this deployment
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The redis package is required for redis:// shared state URLs") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        logger.info(f"Initialized Redis shared state at {url}")
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self.client.get(self._key(namespace, key))
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        self.client.set(self._key(namespace, key), value, px=int(ttl_seconds * 1000) if ttl_seconds else None)
+
+    def delete(self, namespace: str, key: str) -> bool:
+        return self.client.delete(self._key(namespace, key)) > 0
+
+    def exists(self, namespace: str, key: str) -> bool:
+        return self.client.exists(self._key(namespace, key)) > 0
+
+    def expire(self, namespace: str, key: str, ttl_seconds: float) -> bool:
+        return bool(self.client.pexpire(self._key(namespace, key), int(ttl_seconds * 1000)))
+
+    def keys(self, namespace: str) -> List[str]:
+        start = len(self._key(namespace, ""))
+        return [key.decode("utf-8")[start:] for key in self.client.scan_iter(match=self._key(namespace, "*"))]
+
+    def close(self) -> None:
+        self.client.close()
+
+
+# URL scheme -> factory taking the full URL
+_BACKENDS: Dict[str, Callable[[str], SharedStateBackend]] = {
+    "sqlite": lambda url: SQLiteSharedState(urlparse(url).path),
+    "redis": RedisSharedState,
+    "rediss": RedisSharedState,
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], SharedStateBackend]) -> None:
+    """
+    Register a shared state backend for a URL scheme.
+
+    Args:
+        scheme: URL scheme handled by the backend (e.g. "memcached")
+        factory: Callable building the backend from the full URL
+    """
+    _BACKENDS[scheme] = factory
+
+
+def create_shared_state(url: str) -> Optional[SharedStateBackend]:
+    """
+    Create the shared state backend for a URL.
+
+    Args:
+        url: Backend URL, e.g. sqlite:////dev/shm/airtel-state.db or redis://localhost:6379/0
+
+    Returns:
+        The backend, or None when the URL is empty (single-process state)
+    """
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme not in _BACKENDS:
+        raise ValueError(f"Unsupported shared state URL scheme: {scheme}")
+    return _BACKENDS[scheme](url)
+
+
+_shared_state: Optional[SharedStateBackend] = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state() -> Optional[SharedStateBackend]:
+    """
+    Get the process-wide shared state backend configured by SHARED_STATE_URL.
+
+    Returns:
+        The backend, or None when the deployment runs a single worker
+    """
+    global _shared_state
+    if _shared_state is None:
+        from src.config.settings import Settings
+        with _shared_state_lock:
+            if _shared_state is None:
+                _shared_state = create_shared_state(Settings().shared_state_url)
+    return _shared_state
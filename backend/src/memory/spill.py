@@ -0,0 +1,167 @@
+"""
+Memory budgets and compressed spill storage for conversation states.
+"""
+
+import hashlib
+import logging
+import os
+import uuid
+import zlib
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from .state_codec import StateCodec
+
+logger = logging.getLogger(__name__)
+
+# Approximate resident cost of a message object beyond its text (object,
+# kwargs/metadata dicts and their keys); measured with benchmarks.session_memory
+MESSAGE_OVERHEAD_BYTES = 1024
+# Approximate resident cost of the state dict itself
+STATE_OVERHEAD_BYTES = 512
+
+
+def estimate_message_size(message: BaseMessage) -> int:
+    """Estimate the resident size of a message in bytes."""
+    content = message.content
+    text_size = len(content) if isinstance(content, str) else len(str(content))
+    return MESSAGE_OVERHEAD_BYTES + text_size
+
+
+def estimate_state_size(state: Dict[str, Any]) -> int:
+    """
+    Estimate the resident size of an agent state in bytes.
+
+    The estimate is cheap (no serialization) and is meant for budgeting,
+    not exact accounting.
+
+    Args:
+        state: The agent state
+
+    Returns:
+        Estimated size in bytes
+    """
+    size = STATE_OVERHEAD_BYTES
+    for message in state.get("messages", ()):
+        size += estimate_message_size(message)
+    for doc in state.get("retrieved_docs", ()):
+        size += len(doc) if isinstance(doc, str) else len(str(doc))
+    for call in state.get("tool_calls", ()):
+        size += len(str(call))
+    return size
+
+
+def apply_session_budget(messages: Sequence[BaseMessage], max_messages: int = 0,
+                         max_bytes: int = 0) -> Sequence[BaseMessage]:
+    """
+    Drop the oldest messages of a history that exceeds the per-session budget.
+
+    The kept history starts on a human message, like the agent's trimmer.
+
+    Args:
+        messages: The message history
+        max_messages: Maximum number of messages kept (0 for no limit)
+        max_bytes: Maximum estimated size of the kept messages (0 for no limit)
+
+    Returns:
+        The history itself when within budget, otherwise its most recent part
+    """
+    start = 0
+    if max_messages and len(messages) > max_messages:
+        start = len(messages) - max_messages
+    if max_bytes:
+        total = sum(estimate_message_size(message) for message in messages[start:])
+        while total > max_bytes and start < len(messages) - 1:
+            total -= estimate_message_size(messages[start])
+            start += 1
+    if start == 0:
+        return messages
+    while start < len(messages) - 1 and not isinstance(messages[start], HumanMessage):
+        start += 1
+    logger.debug("Session history trimmed from %d to %d messages", len(messages), len(messages) - start)
+    return messages[start:]
+
+
+class SpilledState:
+    """Compressed form of a state that was moved out of the resident set."""
+
+    __slots__ = ("blob", "path", "nbytes", "message_count")
+
+    def __init__(self, blob: Optional[bytes], path: Optional[str], nbytes: int, message_count: int):
+        # Exactly one of blob (kept in memory) and path (kept on disk) is set
+        self.blob = blob
+        self.path = path
+        self.nbytes = nbytes
+        self.message_count = message_count
+
+
+class SpillStorage:
+    """
+    Serializes idle states to compressed bytes, in memory or on local disk.
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None, compress_level: int = 6, serde=None):
+        """
+        Initialize the spill storage.
+
+        Args:
+            spill_dir: Directory for spilled states; kept in memory when None or empty
+            compress_level: zlib compression level
+            serde: Optional LangGraph serializer (defaults to the compact StateCodec)
+        """
+        self.spill_dir = spill_dir or None
+        self.compress_level = compress_level
+        self.serde = serde or StateCodec()
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    def spill(self, thread_id: str, state: Dict[str, Any]) -> SpilledState:
+        """
+        Serialize and compress a state.
+
+        Args:
+            thread_id: The thread the state belongs to
+            state: The state to spill
+
+        Returns:
+            The spilled record
+        """
+        state_type, payload = self.serde.dumps_typed(state)
+        blob = zlib.compress(state_type.encode("utf-8") + b"\0" + payload, self.compress_level)
+        message_count = len(state.get("messages", ()))
+        if not self.spill_dir:
+            return SpilledState(blob, None, len(blob), message_count)
+
+        # A fresh file per spill, so a late discard never removes a newer spill of the thread
+        name = f"{hashlib.sha1(thread_id.encode('utf-8')).hexdigest()}-{uuid.uuid4().hex[:8]}.spill"
+        path = os.path.join(self.spill_dir, name)
+        with open(path, "wb") as f:
+            f.write(blob)
+        return SpilledState(None, path, len(blob), message_count)
+
+    def load(self, spilled: SpilledState) -> Dict[str, Any]:
+        """
+        Decompress and deserialize a spilled state.
+
+        Args:
+            spilled: The spilled record
+
+        Returns:
+            The state, with its message, document and tool-call lists
+        """
+        blob = spilled.blob
+        if blob is None:
+            with open(spilled.path, "rb") as f:
+                blob = f.read()
+        state_type, _, payload = zlib.decompress(blob).partition(b"\0")
+        return self.serde.loads_typed((state_type.decode("utf-8"), payload))
+
+    def discard(self, spilled: SpilledState) -> None:
+        """Release the storage of a spilled record."""
+        if spilled.path:
+            try:
+                os.remove(spilled.path)
+            except FileNotFoundError:
+                pass
+
@@ -0,0 +1,311 @@
+"""
+Durable SQLite-backed checkpointer for conversation memory.
+
+This is a `ConversationStore` backend only, not a LangGraph checkpoint
+saver: the workflow is compiled without one and receives the history from
+the store (see conversation_store.py), so LangGraph checkpoints are never
+written.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .conversation_store import ConversationStore, freeze_state
+from .spill import apply_session_budget
+from .state_codec import StateCodec
+
+logger = logging.getLogger(__name__)
+
+# Statements are kept as constants so sqlite3's statement cache reuses the
+# compiled (prepared) form on every call.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    state_type TEXT NOT NULL,
+    state BLOB NOT NULL,
+    last_activity REAL NOT NULL
+);
+"""
+_UPSERT_THREAD = (
+    "INSERT INTO threads (thread_id, state_type, state, last_activity) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(thread_id) DO UPDATE SET state_type = excluded.state_type, "
+    "state = excluded.state, last_activity = excluded.last_activity")
+_TOUCH_THREAD = "UPDATE threads SET last_activity = ? WHERE thread_id = ?"
+_DELETE_THREAD = "DELETE FROM threads WHERE thread_id = ?"
+_SELECT_THREAD = "SELECT state_type, state, last_activity FROM threads WHERE thread_id = ?"
+_SELECT_LAST_ACTIVITY = "SELECT last_activity FROM threads WHERE thread_id = ?"
+_SELECT_THREAD_IDS = "SELECT thread_id FROM threads"
+_SELECT_THREAD_STATS = "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM threads"
+
+
+class SQLiteCheckpointer(ConversationStore):
+    """
+    SQLite-backed conversation store.
+
+    Conversation states survive restarts and deploys. The database runs in
+    WAL mode; writes are buffered and flushed in batches by a background
+    thread, and recently used states are served from an in-memory LRU so
+    hot sessions never hit the disk on reads.
+    """
+
+    def __init__(self, db_path: str, cache_size: int = 1024, batch_size: int = 64,
+                 flush_interval: float = 0.05, serde=None, max_session_messages: int = 0,
+                 max_session_bytes: int = 0):
+        """
+        Initialize the checkpointer.
+
+        Args:
+            db_path: Path to the SQLite database file
+            cache_size: Maximum number of thread states kept in the in-memory LRU
+            batch_size: Number of pending writes that triggers an immediate flush
+            flush_interval: Maximum seconds a write stays buffered before it is flushed
+            serde: Optional serializer with dumps_typed/loads_typed (defaults to the compact StateCodec)
+            max_session_messages: Maximum number of messages kept per session (0 for no limit)
+            max_session_bytes: Maximum estimated size of a session's messages (0 for no limit)
+        """
+        self.serde = serde or StateCodec()
+        self.db_path = db_path
+        self.max_session_messages = max_session_messages
+        self.max_session_bytes = max_session_bytes
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None,
+                                    cached_statements=64)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        # Guards the connection, the LRU and the pending-write buffer
+        self.lock = threading.RLock()
+        # thread_id -> (state, last_activity), most recently used last
+        self.cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        # thread_id -> ("save", type, blob, ts) | ("touch", ts) | ("delete",)
+        self.pending: Dict[str, tuple] = {}
+        self.flush_event = threading.Event()
+        self.closed = False
+
+        self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flush_thread.start()
+
+        logger.info(f"Initialized SQLite checkpointer at {db_path}")
+
+    def save_state(self, state: Dict[str, Any], thread_id: str = "default") -> None:
+        """
+        Save the state for a thread and mark it as active.
+
+        The state is visible to readers immediately and reaches the
+        database with the next batch flush.
+
+        Args:
+            state: The state to save
+            thread_id: The thread ID to save the state for
+        """
+        state = freeze_state(state, apply_session_budget(
+            tuple(state.get("messages", ())), self.max_session_messages, self.max_session_bytes))
+        state_type, blob = self.serde.dumps_typed(state)
+        now = time.time()
+        with self.lock:
+            self._cache_put(thread_id, state, now)
+            self.pending[thread_id] = ("save", state_type, blob, now)
+            if len(self.pending) >= self.batch_size:
+                self.flush_event.set()
+
+    def get_state(self, thread_id: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Get the state for a thread.
+
+        As with the in-memory store, its message, document and tool-call
+        sequences are tuples; the dictionary itself is a copy, so the
+        cached state cannot be changed through it.
+
+        Args:
+            thread_id: The thread ID to get the state for
+
+        Returns:
+            The state for the thread, or None if not found
+        """
+        with self.lock:
+            entry = self.cache.get(thread_id)
+            if entry is not None:
+                self.cache.move_to_end(thread_id)
+                return dict(entry[0])
+            pending = self.pending.get(thread_id)
+            if pending and pending[0] == "delete":
+                return None
+            if pending and pending[0] == "save":
+                # Evicted from the LRU before its batch was flushed
+                row = pending[1:]
+            else:
+                row = self.conn.execute(_SELECT_THREAD, (thread_id,)).fetchone()
+                if row is None:
+                    return None
+            state = freeze_state(self.serde.loads_typed((row[0], row[1])))
+            last_activity = pending[-1] if pending else row[2]
+            self._cache_put(thread_id, state, last_activity)
+            return dict(state)
+
+    def clear_state(self, thread_id: str = "default") -> bool:
+        """
+        Clear the state of a thread.
+
+        Args:
+            thread_id: The thread ID to clear
+
+        Returns:
+            True if state was found and cleared, False otherwise
+        """
+        with self.lock:
+            found = self.last_activity(thread_id) is not None
+            self.cache.pop(thread_id, None)
+            self.pending[thread_id] = ("delete",)
+            self.flush_event.set()
+        if found:
+            logger.info(f"Cleared state for thread: {thread_id}")
+        return found
+
+    def list_threads(self) -> list[str]:
+        """
+        List all thread IDs with saved states.
+
+        Returns:
+            List of thread IDs
+        """
+        self.flush()
+        with self.lock:
+            return [row[0] for row in self.conn.execute(_SELECT_THREAD_IDS)]
+
+    def touch(self, thread_id: str) -> None:
+        """
+        Mark a thread as active without changing its state.
+
+        Args:
+            thread_id: The thread ID to touch
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.cache.get(thread_id)
+            if entry is not None:
+                self.cache[thread_id] = (entry[0], now)
+            pending = self.pending.get(thread_id)
+            if pending and pending[0] == "save":
+                self.pending[thread_id] = pending[:3] + (now,)
+            elif not pending or pending[0] == "touch":
+                self.pending[thread_id] = ("touch", now)
+
+    def last_activity(self, thread_id: str) -> Optional[float]:
+        """
+        Get the last-activity timestamp of a thread.
+
+        Args:
+            thread_id: The thread ID
+
+        Returns:
+            Unix timestamp of the last save or touch, or None if not found
+        """
+        with self.lock:
+            entry = self.cache.get(thread_id)
+            if entry is not None:
+                return entry[1]
+            pending = self.pending.get(thread_id)
+            if pending and pending[0] == "delete":
+                return None
+            if pending and pending[0] == "save":
+                return pending[-1]
+            row = self.conn.execute(_SELECT_LAST_ACTIVITY, (thread_id,)).fetchone()
+            if row is None:
+                return None
+            return pending[-1] if pending else row[0]
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Get resident (cached) and on-disk session counts and sizes.
+
+        Returns:
+            Dictionary of memory statistics
+        """
+        self.flush()
+        with self.lock:
+            sessions, stored_bytes = self.conn.execute(_SELECT_THREAD_STATS).fetchone()
+            resident = len(self.cache)
+        return {
+            "resident_sessions": resident,
+            "spilled_sessions": max(0, sessions - resident),
+            "stored_bytes": stored_bytes,
+            "spill_location": self.db_path
+        }
+
+    def flush(self) -> None:
+        """Write all buffered changes to the database in a single transaction."""
+        with self.lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+            saves, touches, deletes = [], [], []
+            for thread_id, op in pending.items():
+                if op[0] == "save":
+                    saves.append((thread_id, op[1], op[2], op[3]))
+                elif op[0] == "touch":
+                    touches.append((op[1], thread_id))
+                else:
+                    deletes.append((thread_id,))
+            try:
+                self.conn.execute("BEGIN")
+                if deletes:
+                    self.conn.executemany(_DELETE_THREAD, deletes)
+                if saves:
+                    self.conn.executemany(_UPSERT_THREAD, saves)
+                if touches:
+                    self.conn.executemany(_TOUCH_THREAD, touches)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                # Put the batch back unless newer changes superseded it
+                for thread_id, op in pending.items():
+                    self.pending.setdefault(thread_id, op)
+                raise
+
+    def close(self) -> None:
+        """Flush buffered writes and close the database."""
+        self.closed = True
+        self.flush_event.set()
+        self.flush_thread.join(timeout=5)
+        with self.lock:
+            self.flush()
+            self.conn.close()
+
+    def after_fork(self) -> None:
+        """
+        Reopen the database and restart the flush thread in a forked worker.
+
+        The master must flush before forking; buffered writes are not
+        carried over to the child.
+        """
+        self.lock = threading.RLock()
+        self.pending = {}
+        self.flush_event = threading.Event()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                                    cached_statements=64)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flush_thread.start()
+
+    def _cache_put(self, thread_id: str, state: Dict[str, Any], last_activity: float) -> None:
+        self.cache[thread_id] = (state, last_activity)
+        self.cache.move_to_end(thread_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _flush_loop(self) -> None:
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing SQLite checkpointer: {str(e)}")
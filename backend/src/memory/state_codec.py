@@ -0,0 +1,176 @@
+"""
+Compact binary codec for agent states.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import ormsgpack
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.rag.chunk_registry import ChunkRegistry, chunk_registry
+
+logger = logging.getLogger(__name__)
+
+# Type tag of states written by this codec
+STATE_TYPE = "agentstate"
+FORMAT_VERSION = 1
+
+_AGENT_STATE_KEYS = frozenset(("messages", "retrieved_docs", "current_query", "tool_calls"))
+_MESSAGE_CODES = {HumanMessage: 0, AIMessage: 1, SystemMessage: 2, ToolMessage: 3}
+_MESSAGE_CLASSES = {code: cls for cls, code in _MESSAGE_CODES.items()}
+
+
+class _Unsupported(Exception):
+    """Raised when a state does not fit the compact format."""
+
+
+class StateCodec:
+    """
+    LangGraph serializer with a compact format for agent states.
+
+    Agent states are written as a msgpack array: messages become
+    `[type code, content]` pairs (extra fields only when set), and chunk
+    texts in `retrieved_docs` and RAG tool-call results are stored as the
+    64-bit IDs of the chunk registry instead of their text. Anything else
+    (LangGraph checkpoints, states with unknown message types or fields)
+    goes through the fallback serializer, so the codec can be passed as
+    `serde` to any checkpointer.
+    """
+
+    def __init__(self, registry: Optional[ChunkRegistry] = None, fallback=None):
+        """
+        Initialize the codec.
+
+        Args:
+            registry: Chunk registry used to resolve chunk IDs (defaults to the process-wide one)
+            fallback: Serializer for other values (defaults to JsonPlusSerializer)
+        """
+        self.registry = registry or chunk_registry
+        self.fallback = fallback or JsonPlusSerializer()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        """
+        Serialize a value.
+
+        Args:
+            obj: The value to serialize
+
+        Returns:
+            Tuple of (type tag, bytes)
+        """
+        if isinstance(obj, dict) and "messages" in obj and obj.keys() <= _AGENT_STATE_KEYS:
+            try:
+                return STATE_TYPE, self.encode_state(obj)
+            except (_Unsupported, TypeError) as e:
+                logger.debug("State not encodable in compact format, using fallback: %s", e)
+        return self.fallback.dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        """
+        Deserialize a value written by dumps_typed.
+
+        Args:
+            data: Tuple of (type tag, bytes)
+
+        Returns:
+            The deserialized value
+        """
+        if data[0] == STATE_TYPE:
+            return self.decode_state(data[1])
+        return self.fallback.loads_typed(data)
+
+    def encode_state(self, state: Dict[str, Any]) -> bytes:
+        """
+        Encode an agent state in the compact format.
+
+        Args:
+            state: The agent state
+
+        Returns:
+            The encoded bytes
+        """
+        return ormsgpack.packb([
+            FORMAT_VERSION,
+            state.get("current_query", ""),
+            [self._encode_message(message) for message in state["messages"]],
+            self._encode_texts(state.get("retrieved_docs", ())),
+            [self._encode_tool_call(call) for call in state.get("tool_calls", ())],
+        ])
+
+    def decode_state(self, blob: bytes) -> Dict[str, Any]:
+        """
+        Decode an agent state written by encode_state.
+
+        Args:
+            blob: The encoded bytes
+
+        Returns:
+            The agent state, with lists for its sequences
+        """
+        version, current_query, messages, docs, tool_calls = ormsgpack.unpackb(blob)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported agent state format version: {version}")
+        return {
+            "messages": [self._decode_message(message) for message in messages],
+            "retrieved_docs": self._decode_texts(docs),
+            "current_query": current_query,
+            "tool_calls": [{"tool": tool, "result": self._decode_result(result)} for tool, result in tool_calls],
+        }
+
+    def _encode_message(self, message: BaseMessage) -> list:
+        code = _MESSAGE_CODES.get(type(message))
+        if code is None:
+            raise _Unsupported(f"message type {type(message).__name__}")
+        if (not message.additional_kwargs and not message.response_metadata and message.id is None
+                and message.name is None and code != 3
+                and (code != 1 or (not message.tool_calls and not message.invalid_tool_calls
+                                   and message.usage_metadata is None))):
+            return [code, message.content]
+        extra = message.model_dump(exclude_defaults=True, exclude={"content", "type"})
+        return [code, message.content, extra]
+
+    @staticmethod
+    def _decode_message(data: list) -> BaseMessage:
+        cls = _MESSAGE_CLASSES[data[0]]
+        if len(data) == 2:
+            return cls(content=data[1])
+        return cls(content=data[1], **data[2])
+
+    def _encode_texts(self, texts) -> list:
+        encoded = []
+        for text in texts:
+            if not isinstance(text, str):
+                raise _Unsupported("non-text retrieved document")
+            cid = self.registry.id_for(text)
+            encoded.append(text if cid is None else cid)
+        return encoded
+
+    def _decode_texts(self, items: list) -> List[str]:
+        texts = []
+        for item in items:
+            if isinstance(item, str):
+                texts.append(item)
+                continue
+            text = self.registry.text_for(item)
+            if text is None:
+                logger.warning(f"Chunk {item:016x} is not in the loaded knowledge base")
+                text = f"[chunk {item:016x} unavailable]"
+            texts.append(text)
+        return texts
+
+    def _encode_tool_call(self, call: Dict[str, Any]) -> list:
+        if call.keys() != {"tool", "result"}:
+            raise _Unsupported("tool call with extra fields")
+        result = call["result"]
+        if isinstance(result, (list, tuple)):
+            # List results (RAG chunks, summary points) may reference chunks
+            return [call["tool"], [self._encode_texts(result)]]
+        return [call["tool"], result]
+
+    def _decode_result(self, result: Any) -> Any:
+        # List results are wrapped once so they can be told apart from scalars
+        if isinstance(result, list):
+            return self._decode_texts(result[0])
+        return result
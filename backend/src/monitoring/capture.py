@@ -0,0 +1,120 @@
+"""
+Traffic capture: one compact line per request, for offline replay.
+
+Each captured request is written as a JSON line with its arrival time,
+route, a keyed hash of its session ID (turns of a conversation stay
+linked, the ID itself is not kept), its message with phone numbers,
+e-mail addresses and other long digit runs masked, its status and the
+duration of each pipeline stage. `benchmarks/replay.py` replays the file
+against a test server and compares the stage latencies of two builds.
+
+Capture rides on the request traces (the stages are their spans) and is
+written by the same kind of background, size-rotating writer, so it adds
+no disk I/O to the request path. Enabled by CAPTURE_PATH.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Optional
+
+from src.monitoring.tracing import JsonlSpanExporter, Trace
+
+# Phone, account and card numbers: 6 digits or more, possibly separated; USSD codes (*141#) are kept
+_NUMBER = re.compile(r"\+?\d(?:[\s.-]?\d){5,}")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+
+def anonymize(text: str) -> str:
+    """
+    Mask personal data in a message.
+
+    Args:
+        text: The message
+
+    Returns:
+        The message with e-mail addresses and long numbers replaced by placeholders
+    """
+    return _NUMBER.sub("<number>", _EMAIL.sub("<email>", text))
+
+
+class TrafficCapture(JsonlSpanExporter):
+    """
+    Writes captured requests as compact JSON lines, rotating by size.
+
+    Record fields: `t` (arrival, Unix time), `route`, `session` (keyed hash),
+    `message` (anonymized, or only `chars` when messages are not kept),
+    `status`, `ms` (total), `ttft_ms` (streaming, time to the first token)
+    and `stages` (milliseconds per stage, summed when a stage runs twice).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 20 * 1024 * 1024, backups: int = 5,
+                 sample_rate: float = 1.0, keep_messages: bool = True, salt: str = ""):
+        """
+        Initialize the capture.
+
+        Args:
+            path: JSONL file to write
+            max_bytes: Size at which the file is rotated
+            backups: Number of rotated files kept
+            sample_rate: Fraction of requests recorded
+            keep_messages: Record the anonymized message text (else only its length)
+            salt: Key of the session ID hash; random when empty
+        """
+        super().__init__(path, max_bytes=max_bytes, backups=backups, queue_size=10000)
+        self.sample_rate = sample_rate
+        self.keep_messages = keep_messages
+        self.salt = salt.encode() if salt else os.urandom(16)
+
+    def hash_session(self, session_id: str) -> str:
+        """Keyed hash of a session ID."""
+        return hashlib.blake2b(session_id.encode(), key=self.salt[:64], digest_size=8).hexdigest()
+
+    def to_record(self, trace: Trace) -> Dict[str, Any]:
+        """The capture record of a finished trace."""
+        root = trace.root
+        stages: Dict[str, float] = {}
+        ttft_ms = None
+        for span in trace.spans:
+            if span.duration is None:
+                continue
+            stages[span.name] = round(stages.get(span.name, 0.0) + span.duration * 1000, 3)
+            if span.name == "llm_first_token" and ttft_ms is None:
+                ttft_ms = round((span.start + span.duration - root.start) * 1000, 3)
+        record: Dict[str, Any] = {
+            "t": round(trace.started_at, 3),
+            "route": root.name,
+            "session": self.hash_session(str(root.attributes.get("session_id", ""))),
+        }
+        if self.keep_messages and trace.message is not None:
+            record["message"] = anonymize(trace.message)
+        else:
+            record["chars"] = len(trace.message or "")
+        record["status"] = root.status
+        if root.attributes.get("resumed"):
+            record["resumed"] = True
+        record["ms"] = round(root.duration * 1000, 3)
+        if ttft_ms is not None:
+            record["ttft_ms"] = ttft_ms
+        record["stages"] = stages
+        return record
+
+    def format(self, trace: Trace) -> str:
+        return json.dumps(self.to_record(trace), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def create_capture() -> Optional[TrafficCapture]:
+    """
+    Create the traffic capture configured by the settings.
+
+    Returns:
+        The capture, or None when CAPTURE_PATH is empty
+    """
+    from src.config.settings import Settings
+    settings = Settings()
+    if not settings.capture_path:
+        return None
+    return TrafficCapture(settings.capture_path, max_bytes=int(settings.capture_max_mb * 1024 * 1024),
+                          backups=settings.capture_backups, sample_rate=settings.capture_sample_rate,
+                          keep_messages=settings.capture_messages, salt=settings.capture_salt)
@@ -0,0 +1,154 @@
+"""
+Event-loop lag monitor.
+
+A task sleeps for a fixed interval and records how late it wakes up: that
+delay is the time the loop spent running something else without yielding
+(a synchronous LLM call, embedding, FAISS search or token count inside an
+`async def`), and every request waiting on the loop paid it too. Lags go to
+the `event_loop_lag_seconds` histogram, and lags above the block threshold
+are counted in `event_loop_blocks_total`.
+
+When stack capture is on (DEBUG), a watchdog thread also notices a block
+while it is happening and logs the stack of the loop thread, which points
+at the blocking call; the most recent ones are kept for /performance.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from src.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("event_loop_lag_seconds", "Delay of the event loop in running a due callback")
+metrics.describe("event_loop_blocks_total", "Times the event loop was blocked beyond the block threshold")
+
+
+class LoopLagMonitor:
+    """Measures the lag of the running event loop and reports the calls that block it."""
+
+    def __init__(self, interval_seconds: float = 0.1, block_threshold_seconds: float = 0.1,
+                 capture_stacks: bool = False, keep_blocks: int = 20):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval_seconds: Time between two lag measurements (0 disables the monitor)
+            block_threshold_seconds: Lag from which the loop counts as blocked
+            capture_stacks: Whether to capture the stack of the loop thread during a block
+            keep_blocks: Number of captured blocks kept for /performance
+        """
+        self.interval = interval_seconds
+        self.threshold = block_threshold_seconds
+        self.capture_stacks = capture_stacks
+        self.blocks: Deque[Dict[str, Any]] = deque(maxlen=keep_blocks)
+        self.histogram = metrics.histogram("event_loop_lag_seconds")
+        self.task: Optional[asyncio.Task] = None
+        self.watchdog: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        # Last time the loop ran the monitor, read by the watchdog thread
+        self.heartbeat = 0.0
+        self.loop_thread_id: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self) -> None:
+        """Start monitoring the running loop; must be called from it."""
+        if not self.enabled or (self.task is not None and not self.task.done()):
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.perf_counter()
+        self.stop_event.clear()
+        self.task = asyncio.get_running_loop().create_task(self._measure_loop())
+        if self.capture_stacks:
+            self.watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self.watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self.stop_event.set()
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.watchdog is not None:
+            self.watchdog.join(1.0)
+            self.watchdog = None
+
+    async def _measure_loop(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.heartbeat = now
+            lag = max(now - expected, 0.0)
+            self.histogram.observe(lag)
+            if lag >= self.threshold:
+                metrics.inc("event_loop_blocks_total")
+                if not self.capture_stacks:
+                    logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms")
+
+    def _watch(self) -> None:
+        # The loop is blocked when the monitor is late by more than the threshold;
+        # check often enough to catch the block while it lasts
+        period = max(min(self.interval, self.threshold) / 2, 0.005)
+        reported = 0.0
+        while not self.stop_event.wait(period):
+            heartbeat = self.heartbeat
+            late = time.perf_counter() - heartbeat - self.interval
+            if late < self.threshold or heartbeat == reported:
+                continue
+            # One capture per block: the heartbeat moves once the loop runs again
+            reported = heartbeat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            self.blocks.append({"at": time.time(), "blocked_ms": round(late * 1000, 1), "stack": stack})
+            logger.warning(f"Event loop blocked for over {late * 1000:.0f}ms, in:\n{stack}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the lag distribution and the recently captured blocks.
+
+        Returns:
+            Dictionary with the lag summary (seconds), the block count and
+            the captured blocks, most recent last
+        """
+        blocks: List[Dict[str, Any]] = list(self.blocks)
+        return {
+            "enabled": self.enabled,
+            "lag_seconds": self.histogram.summary(),
+            "blocks": metrics.counter_value("event_loop_blocks_total"),
+            "block_threshold_ms": self.threshold * 1000,
+            "recent_blocks": blocks,
+        }
+
+
+def create_loop_monitor() -> LoopLagMonitor:
+    """
+    Create the loop monitor configured by the settings.
+
+    Returns:
+        The monitor (started by the API lifespan)
+    """
+    from src.config.settings import Settings
+    settings = Settings()
+    return LoopLagMonitor(settings.loop_lag_interval_ms / 1000,
+                          block_threshold_seconds=settings.loop_block_threshold_ms / 1000,
+                          capture_stacks=settings.loop_block_stacks)
+
+
+# Process-wide monitor
+loop_monitor = create_loop_monitor()
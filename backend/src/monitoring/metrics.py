@@ -0,0 +1,306 @@
+"""
+Latency histograms and counters with a Prometheus text export.
+
+Histograms use fixed log-linear buckets (8 per power of two, from 61 µs
+to 256 s), so a series costs the same ~1.4 KB after one request or ten
+million and its percentiles are within ~4% of the exact values. Stage
+timings recorded deep in the agent are attributed to the route of the
+request being served through a context variable, which follows the
+request into thread pools and the background streaming task.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Route of the request being served ("/chat", "/chat/stream", ...); "other"
+# for work outside a request (warm-up, priming)
+current_route: contextvars.ContextVar[str] = contextvars.ContextVar("current_route", default="other")
+
+# Stages timed for each route
+STAGES = ("total", "ttft", "embedding", "search", "llm", "trim")
+
+_MIN_EXPONENT = -14  # 2**-14 s = 61 µs
+_MAX_EXPONENT = 8  # 2**8 s = 256 s
+_SUB_BUCKETS = 8  # buckets per power of two: ~9% wide, ~4% error after interpolation
+
+# Upper bounds of the buckets; values above the last one go to an overflow bucket
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(
+    2.0 ** (_MIN_EXPONENT + i / _SUB_BUCKETS)
+    for i in range(1, (_MAX_EXPONENT - _MIN_EXPONENT) * _SUB_BUCKETS + 1))
+
+# Bounds exported to Prometheus: one per power of two, a subset of the bucket bounds
+EXPORTED_BOUNDS: Tuple[float, ...] = BUCKET_BOUNDS[_SUB_BUCKETS - 1::_SUB_BUCKETS]
+
+
+def _bucket_index(value: float) -> int:
+    if value <= BUCKET_BOUNDS[0]:
+        return 0
+    index = math.ceil((math.log2(value) - _MIN_EXPONENT) * _SUB_BUCKETS) - 1
+    # log2 rounding can land one bucket off at the exact bounds
+    if index < len(BUCKET_BOUNDS) and value > BUCKET_BOUNDS[index]:
+        index += 1
+    elif index > 0 and value <= BUCKET_BOUNDS[index - 1]:
+        index -= 1
+    return min(index, len(BUCKET_BOUNDS))
+
+
+class Histogram:
+    """Distribution of durations in seconds, in constant memory."""
+
+    def __init__(self):
+        # One counter per bucket plus the overflow bucket
+        self.counts = array("Q", bytes(8 * (len(BUCKET_BOUNDS) + 1)))
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """
+        Record one duration.
+
+        Args:
+            seconds: The duration
+        """
+        index = _bucket_index(max(seconds, 0.0))
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate a percentile.
+
+        Args:
+            q: Percentile between 0 and 100
+
+        Returns:
+            The estimated duration in seconds, or None if nothing was recorded
+        """
+        with self.lock:
+            if not self.count:
+                return None
+            counts = list(self.counts)
+            low, high, count = self.min, self.max, self.count
+        rank = q / 100 * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if not bucket_count or seen + bucket_count < rank:
+                seen += bucket_count
+                continue
+            lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+            upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else high
+            # Interpolate inside the bucket, within the observed range
+            value = lower + (upper - lower) * (rank - seen) / bucket_count
+            return min(max(value, low), high)
+        return high
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Get the count, mean, extremes and p50/p90/p99, durations in seconds."""
+        def rounded(value):
+            return round(value, 4) if value is not None else None
+
+        count = self.count
+        return {
+            "count": count,
+            "mean": rounded(self.sum / count) if count else None,
+            "min": rounded(self.min) if count else None,
+            "p50": rounded(self.percentile(50)),
+            "p90": rounded(self.percentile(90)),
+            "p99": rounded(self.percentile(99)),
+            "max": rounded(self.max) if count else None,
+        }
+
+    def cumulative(self) -> Tuple[List[Tuple[float, int]], int, float]:
+        """
+        Get the cumulative counts at the exported bounds.
+
+        Returns:
+            Tuple of ([(upper bound, observations at or below it)], count, sum)
+        """
+        with self.lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        cumulative = []
+        seen = 0
+        exported = iter(EXPORTED_BOUNDS)
+        next_bound = next(exported)
+        for bound, bucket_count in zip(BUCKET_BOUNDS, counts):
+            seen += bucket_count
+            if bound == next_bound:
+                cumulative.append((bound, seen))
+                next_bound = next(exported, None)
+        return cumulative, count, total
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for name, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+class MetricsRegistry:
+    """
+    Named histograms and counters, keyed by a small fixed set of labels.
+
+    Label values come from code (routes, stages, cache tiers), never from
+    user input, so the number of series, and the memory, stays bounded.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.help: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name: str, text: str) -> None:
+        """Set the HELP text of a metric."""
+        self.help[name] = text
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        """
+        Get a histogram, creating it on first use.
+
+        Args:
+            name: Metric name
+            **labels: Label values
+
+        Returns:
+            The histogram
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name: Metric name
+            amount: Increment
+            **labels: Label values
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        """Get the value of a counter (0 if never incremented)."""
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self) -> Dict:
+        """
+        Get every metric as JSON-friendly data.
+
+        Returns:
+            Dictionary with "latency" (histogram summaries by name and labels)
+            and "counters" (values by name and labels)
+        """
+        latency: Dict[str, Dict[str, Dict]] = {}
+        with self.lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+        for (name, labels), histogram in sorted(histograms, key=lambda item: item[0]):
+            label_key = ",".join(f"{key}={value}" for key, value in labels)
+            latency.setdefault(name, {})[label_key] = histogram.summary()
+        counter_values: Dict[str, Dict[str, float]] = {}
+        for (name, labels), value in sorted(counters, key=lambda item: item[0]):
+            label_key = ",".join(f"{key}={value}" for key, value in labels)
+            counter_values.setdefault(name, {})[label_key] = value
+        return {"latency": latency, "counters": counter_values}
+
+    def render_prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format (0.0.4).
+
+        Returns:
+            The exposition text
+        """
+        lines: List[str] = []
+        with self.lock:
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            counters = sorted(self.counters.items(), key=lambda item: item[0])
+
+        described = set()
+        for (name, labels), histogram in histograms:
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative, count, total = histogram.cumulative()
+            for bound, seen in cumulative:
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {seen}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+metrics.describe("chat_stage_duration_seconds",
+                 "Duration of a stage of a chat request (total, ttft, embedding, search, llm, trim)")
+metrics.describe("rag_cache_lookups_total", "RAG cache lookups by result (local_hit, shared_hit, miss)")
+metrics.describe("first_turn_answers_total", "Opening questions answered from precomputed answers")
+metrics.describe("retries_total", "Retried operations (agent_node: LLM turn, warmup: warm-up stage)")
+metrics.describe("errors_total", "Failed requests and degraded answers by route and type")
+metrics.describe("chat_requests_total", "Chat requests by route and HTTP status")
+
+
+def observe_stage(stage: str, seconds: float, route: Optional[str] = None) -> None:
+    """
+    Record the duration of a stage of the current request.
+
+    Args:
+        stage: One of STAGES
+        seconds: The duration
+        route: Route to attribute it to (defaults to the current request's)
+    """
+    metrics.histogram("chat_stage_duration_seconds", route=route or current_route.get(), stage=stage).observe(seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Time the enclosed block as a stage of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def count_error(error_type: str, route: Optional[str] = None) -> None:
+    """
+    Count a failed request or a degraded answer.
+
+    Args:
+        error_type: Kind of error ("exception", "unavailable", "llm_fallback", ...)
+        route: Route to attribute it to (defaults to the current request's)
+    """
+    metrics.inc("errors_total", route=route or current_route.get(), type=error_type)
@@ -0,0 +1,282 @@
+"""
+On-demand sampling profiler for individual chat requests.
+
+A request is profiled when it carries the admin X-Profile-Token header, or
+at random with PROFILE_SAMPLE_RATE. While it runs, a background thread
+samples the stack of the event loop thread every PROFILE_INTERVAL_MS and
+keeps the samples taken while one of the request's tasks was running (the
+request itself and, for streaming, its generation task), so concurrent
+requests on the same loop do not pollute the profile. The agent pipeline
+runs synchronously inside those tasks, so it is included.
+
+Profiles are written as collapsed stacks (`frame;frame;frame count`, the
+input of flamegraph.pl, speedscope and most flame graph viewers) with a
+JSON metadata file, and the most recent PROFILE_KEEP are kept.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+# Project files are labelled relative to the backend directory
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+_labels: Dict[Any, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_PROJECT_ROOT):
+            path = path[len(_PROJECT_ROOT):]
+        elif "site-packages" + os.sep in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        else:
+            path = os.path.basename(path)
+        label = f"{getattr(code, 'co_qualname', code.co_name)} ({path}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+
+class ProfileSession:
+    """The samples of one profiled request."""
+
+    def __init__(self, name: str, route: str, request_id: str, trigger: str):
+        self.name = name
+        self.route = route
+        self.request_id = request_id
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.samples: Counter = Counter()
+        self.tasks: List[asyncio.Task] = []
+        self.finished = False
+
+    def metadata(self, interval: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "route": self.route,
+            "request_id": self.request_id,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "samples": sum(self.samples.values()),
+            "interval_ms": interval * 1000,
+        }
+
+
+class RequestProfiler:
+    """Starts and stops request profiles and runs the stack sampler thread."""
+
+    def __init__(self, directory: str = "", token: str = "", sample_rate: float = 0.0,
+                 interval_seconds: float = 0.005, keep: int = 50):
+        """
+        Initialize the profiler.
+
+        Args:
+            directory: Where profiles are written; profiling is off when empty
+            token: Admin token accepted in the X-Profile-Token header (header trigger off when empty)
+            sample_rate: Fraction of chat requests profiled without the header
+            interval_seconds: Time between two stack samples
+            keep: Number of most recent profiles kept on disk
+        """
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval_seconds
+        self.keep = keep
+        # Task -> (session, thread ident and loop the task runs on)
+        self.tasks: Dict[asyncio.Task, tuple] = {}
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.pid: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Whether a token grants access to profiling (constant-time comparison)."""
+        return bool(self.token and token and hmac.compare_digest(token, self.token))
+
+    def start(self, route: str, request_id: str, token: Optional[str] = None) -> Optional[ProfileSession]:
+        """
+        Profile the current task if the request asks for it or is sampled.
+
+        Must be called from the task serving the request.
+
+        Args:
+            route: The request's route
+            request_id: The request ID, used in the profile name
+            token: Value of the request's X-Profile-Token header
+
+        Returns:
+            The profile session, or None if the request is not profiled
+        """
+        if not self.enabled:
+            return None
+        if self.authorized(token):
+            trigger = "header"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            trigger = "sampled"
+        else:
+            return None
+        slug = route.strip("/").replace("/", "-") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{request_id}"
+        session = ProfileSession(name, route, request_id, trigger)
+        self.attach(session)
+        return session
+
+    def attach(self, session: Optional[ProfileSession]) -> None:
+        """
+        Add the current task to a profile (the generation task of a streaming request).
+
+        Args:
+            session: The profile session, or None
+        """
+        if session is None or session.finished:
+            return
+        task = asyncio.current_task()
+        if task is None:
+            return
+        with self.lock:
+            session.tasks.append(task)
+            self.tasks[task] = (session, threading.get_ident(), asyncio.get_running_loop())
+            if self.thread is None or not self.thread.is_alive() or self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self.thread.start()
+
+    def finish(self, session: Optional[ProfileSession]) -> None:
+        """
+        Stop a profile and write it.
+
+        Args:
+            session: The profile session, or None
+        """
+        if session is None or session.finished:
+            return
+        session.finished = True
+        with self.lock:
+            for task in session.tasks:
+                self.tasks.pop(task, None)
+        try:
+            self._write(session)
+        except OSError as e:
+            logger.warning(f"Could not write profile {session.name}: {str(e)}")
+
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.tasks:
+                    # Started again by the next profiled request
+                    self.thread = None
+                    return
+                watched = list(self.tasks.items())
+            frames = sys._current_frames()
+            seen_threads = set()
+            for task, (session, thread_id, loop) in watched:
+                if thread_id in seen_threads:
+                    continue
+                # Only the task running right now on that loop gets the sample
+                running = asyncio.current_task(loop)
+                entry = self.tasks.get(running) if running is not None else None
+                frame = frames.get(thread_id)
+                if entry is None or frame is None:
+                    continue
+                seen_threads.add(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                entry[0].samples[";".join(reversed(stack))] += 1
+
+    def _write(self, session: ProfileSession) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, session.name)
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in session.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(session.metadata(self.interval), f)
+        logger.info(f"Wrote profile {session.name} ({sum(session.samples.values())} samples)")
+        self._prune()
+
+    def _prune(self) -> None:
+        for metadata in self.list()[self.keep:]:
+            for extension in (".json", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.directory, metadata["name"] + extension))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        List the profiles on disk.
+
+        Returns:
+            Profile metadata, most recent first
+        """
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda profile: profile.get("started_at", 0), reverse=True)
+
+    def read(self, name: str) -> Optional[str]:
+        """
+        Read the collapsed stacks of a profile.
+
+        Args:
+            name: Profile name, as listed by `list`
+
+        Returns:
+            The collapsed stacks, or None if there is no such profile
+        """
+        if not self.enabled or not _NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, f"{name}.collapsed")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+
+def create_profiler() -> RequestProfiler:
+    """
+    Create the profiler configured by the settings (off unless PROFILE_DIR is set).
+
+    Returns:
+        The profiler
+    """
+    from src.config.settings import Settings
+    settings = Settings()
+    return RequestProfiler(settings.profile_dir, token=settings.profile_token,
+                           sample_rate=settings.profile_sample_rate,
+                           interval_seconds=settings.profile_interval_ms / 1000, keep=settings.profile_keep)
+
+
+# Process-wide profiler
+profiler = create_profiler()
@@ -0,0 +1,253 @@
+"""
+Logging off the request path: JSON records written by a background thread.
+
+`configure_logging()` replaces the root handlers with a single queue
+handler. The request thread only builds the record, merges its arguments
+and tags it with the request ID and route; JSON encoding and console/file
+I/O happen on a listener thread. The queue is bounded: when the writer
+falls behind, records are dropped and counted instead of slowing requests.
+
+Per-request DEBUG logs (queries, tool choices, cache hits) are kept only
+for a LOG_DEBUG_SAMPLE_RATE fraction of requests, chosen by request ID so a
+sampled request keeps all its lines, and at most LOG_DEBUG_MAX_PER_SECOND
+of them. Use %-style arguments (`logger.debug("Query: %s", query)`) so
+nothing is formatted when a record is filtered out.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from src.monitoring.metrics import current_route, metrics
+from src.monitoring.tracing import current_request_id
+
+metrics.describe("log_records_dropped_total", "Log records dropped because the log writer fell behind")
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes of every LogRecord; the others come from `extra=` and are added to the JSON record
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_writer: Optional["LogWriter"] = None
+_queue_handler: Optional["RequestQueueHandler"] = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request ID, route and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestDebugSampler(logging.Filter):
+    """
+    Keeps records below the configured level only for sampled requests, rate-limited.
+
+    Records at or above `level` always pass. The loggers run at DEBUG when
+    sampling is on, so their DEBUG records reach this filter: they are kept
+    if they belong to a request whose ID falls in the sample, within a
+    per-second budget shared by all requests.
+    """
+
+    def __init__(self, level: int, sample_rate: float, max_per_second: float):
+        super().__init__()
+        self.level = level
+        self.threshold = int(sample_rate * 2 ** 32)
+        self.max_per_second = max_per_second
+        self.tokens = max_per_second
+        self.refilled_at = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.level:
+            return True
+        request_id = current_request_id.get()
+        if request_id is None or zlib.crc32(request_id.encode()) >= self.threshold:
+            return False
+        now = time.monotonic()
+        self.tokens = min(self.max_per_second, self.tokens + (now - self.refilled_at) * self.max_per_second)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """Queues records tagged with the current request, dropping them when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Context variables are not visible from the listener thread: read them here.
+        # Arguments are merged now, since they may change once the call returns;
+        # the rest of the formatting is left to the listener
+        record.request_id = current_request_id.get()
+        route = current_route.get()
+        record.route = route if route != "other" else None
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("log_records_dropped_total")
+
+
+class LogWriter:
+    """
+    Background thread writing queued records to the real handlers.
+
+    It wakes up every `flush_interval` and writes what accumulated, rather
+    than once per record, so logging a line never hands the GIL to it in
+    the middle of a request.
+    """
+
+    def __init__(self, log_queue: queue.Queue, handlers: List[logging.Handler], flush_interval: float = 0.2):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.flush_interval = flush_interval
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while True:
+            stopping = self.stop_event.wait(self.flush_interval)
+            self.drain()
+            if stopping:
+                return
+
+    def drain(self) -> None:
+        """Write the queued records."""
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write the queued records and stop the thread."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+
+def configure_logging(log_file: Optional[str] = None, force: bool = False) -> None:
+    """
+    Route all logging through the background writer, as configured by the settings.
+
+    Does nothing if logging is already configured, unless `force` is set.
+
+    Args:
+        log_file: File to write besides stdout, overriding LOG_FILE
+        force: Reconfigure even if already configured
+    """
+    global _writer, _queue_handler
+    from src.config.settings import Settings
+    settings = Settings()
+
+    with _lock:
+        if _writer is not None and not force:
+            return
+        _stop_writer()
+
+        level = logging.getLevelName(settings.log_level.upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+        formatter = JsonFormatter() if settings.log_format == "json" else logging.Formatter(TEXT_FORMAT)
+        handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+        log_file = settings.log_file if log_file is None else log_file
+        if log_file:
+            handlers.append(logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=int(settings.log_max_mb * 1024 * 1024),
+                backupCount=settings.log_backups, encoding="utf-8"))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        _queue_handler = RequestQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+        sampling = settings.log_debug_sample_rate > 0 and level > logging.DEBUG
+        if sampling:
+            _queue_handler.addFilter(RequestDebugSampler(level, settings.log_debug_sample_rate,
+                                                         settings.log_debug_max_per_second))
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(logging.DEBUG if sampling else level)
+
+        _writer = LogWriter(_queue_handler.queue, handlers)
+        _writer.start()
+
+
+def _stop_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def shutdown_logging() -> None:
+    """Write the queued records and stop the writer thread (before `os._exit`)."""
+    with _lock:
+        _stop_writer()
+
+
+def dropped_records() -> int:
+    """Number of log records dropped because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def _after_fork_in_child() -> None:
+    # The writer thread does not survive fork, and the queue may be locked by it:
+    # give the worker its own queue and writer
+    global _writer, _lock
+    _lock = threading.Lock()
+    if _writer is None:
+        return
+    _queue_handler.queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+    _writer = LogWriter(_queue_handler.queue, _writer.handlers, _writer.flush_interval)
+    _writer.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(shutdown_logging)
@@ -0,0 +1,394 @@
+"""
+Lightweight request tracing: one span per pipeline stage, exported as JSONL.
+
+A trace is opened per chat request under the request ID returned in the
+X-Request-ID header. Pipeline code opens spans with `span()`, which costs a
+single context-variable lookup when tracing is off or the code runs
+outside a request. Finished traces are exported when sampled, slow or
+failed, by a background thread writing to size-rotated JSONL files, so
+the request path never waits on disk. With a traffic capture (see
+capture.py), a fraction of all requests is also recorded for replay.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Request ID of the request being served, set by RequestIdMiddleware
+current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_request_id", default=None)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def new_request_id() -> str:
+    """Generate a request ID."""
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """A timed stage of a request, with attributes."""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "duration", "attributes", "status")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any], start: Optional[float] = None):
+        self.name = name
+        self.span_id = f"{random.getrandbits(32):08x}"
+        self.parent_id = parent_id
+        self.start = time.perf_counter() if start is None else start
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.start
+
+
+class _NoopSpan:
+    """Span returned when no trace is being recorded."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """The spans of one request."""
+
+    def __init__(self, request_id: str, name: str, attributes: Dict[str, Any], sampled: bool):
+        self.request_id = request_id
+        self.sampled = sampled
+        # Set by fail_trace when the request degrades without raising (fallback answer)
+        self.error: Optional[str] = None
+        # Wall-clock time of the root span's start, to date the perf_counter offsets
+        self.started_at = time.time()
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = []
+        # Set when the request is recorded by the traffic capture, with its message
+        self.captured = False
+        self.message: Optional[str] = None
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Get one JSON-friendly record per span, the root span first."""
+        records = []
+        for span in [self.root] + self.spans:
+            records.append({
+                "trace_id": self.request_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start": round(self.started_at + span.start - self.root.start, 6),
+                "duration_ms": round(span.duration * 1000, 3) if span.duration is not None else None,
+                "status": span.status,
+                "attributes": span.attributes,
+            })
+        return records
+
+
+class JsonlSpanExporter:
+    """
+    Writes spans as JSON lines on a background thread, rotating by size.
+
+    `path` grows up to `max_bytes`, then becomes `path.1` (and `path.1`
+    becomes `path.2`, ...), keeping `backups` old files. Traces are dropped,
+    and counted, when the queue is full rather than slowing requests down.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 3, queue_size: int = 1000,
+                 flush_interval: float = 1.0):
+        """
+        Initialize the exporter.
+
+        Args:
+            path: JSONL file to write
+            max_bytes: Size at which the file is rotated
+            backups: Number of rotated files kept
+            queue_size: Traces waiting to be written before new ones are dropped
+            flush_interval: Seconds between two writes of the queued traces
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.exported = 0
+        self.queue: Optional[queue.Queue] = None
+        self.stop: Optional[threading.Event] = None
+        self.thread: Optional[threading.Thread] = None
+        self.pid: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        """
+        Queue a finished trace for writing.
+
+        Args:
+            trace: The trace
+        """
+        if self.pid != os.getpid():
+            # Started lazily, and again in a forked worker (threads do not survive fork)
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.queue = queue.Queue(maxsize=self.queue_size)
+                    self.stop = threading.Event()
+                    self.thread = threading.Thread(target=self._write_loop, args=(self.queue, self.stop),
+                                                   name="trace-exporter", daemon=True)
+                    self.thread.start()
+                    self.pid = os.getpid()
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self, traces: queue.Queue, stop: threading.Event) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = None
+        while True:
+            # Wake up periodically rather than per trace, so the request path
+            # never hands the GIL to this thread, and flush once per batch
+            stopping = stop.wait(self.flush_interval)
+            batch = []
+            while True:
+                try:
+                    batch.append(traces.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for trace in batch:
+                    lines = self.format(trace)
+                    if f is None:
+                        f = open(self.path, "a", encoding="utf-8")
+                    if f.tell() and f.tell() + len(lines) > self.max_bytes:
+                        f.close()
+                        f = None
+                        self._rotate()
+                        f = open(self.path, "a", encoding="utf-8")
+                    f.write(lines)
+                    self.exported += 1
+                if f is not None:
+                    f.flush()
+            except OSError as e:
+                logger.warning(f"Could not write traces to {self.path}: {str(e)}")
+                f = None
+            if stopping:
+                break
+        if f is not None:
+            f.close()
+
+    def format(self, trace: Trace) -> str:
+        """Lines written for a trace: one JSON record per span."""
+        return "".join(json.dumps(record, default=str) + "\n" for record in trace.to_records())
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the queued traces and stop the writer thread."""
+        if self.thread is None or self.pid != os.getpid():
+            return
+        self.stop.set()
+        self.thread.join(timeout)
+        self.pid = None
+
+
+class Tracer:
+    """
+    Opens traces and decides which ones are exported.
+
+    Every trace is recorded (the cost is a few spans per request); it is
+    exported if it was sampled at `sample_rate`, or took at least
+    `slow_seconds`, or failed, so the slow requests users complain about
+    are always on disk.
+    """
+
+    def __init__(self, exporter: Optional[JsonlSpanExporter] = None, sample_rate: float = 0.05,
+                 slow_seconds: float = 5.0, capture=None):
+        """
+        Initialize the tracer.
+
+        Args:
+            exporter: Where finished traces go; no trace is exported without one
+            sample_rate: Fraction of traces exported regardless of their duration
+            slow_seconds: Duration from which a trace is always exported (0 to disable)
+            capture: Optional TrafficCapture recording a fraction of all requests
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.capture = capture
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None or self.capture is not None
+
+    def start_trace(self, name: str, message: Optional[str] = None, **attributes: Any) -> Optional[Trace]:
+        """
+        Open the trace of the current request; spans opened in this context join it.
+
+        Args:
+            name: Name of the root span (the route)
+            message: User message, kept only if the traffic capture records the request
+            **attributes: Attributes of the root span
+
+        Returns:
+            The trace, or None when tracing and capture are off
+        """
+        if not self.enabled:
+            return None
+        request_id = current_request_id.get() or new_request_id()
+        trace = Trace(request_id, name, attributes, random.random() < self.sample_rate)
+        if self.capture is not None and random.random() < self.capture.sample_rate:
+            trace.captured = True
+            trace.message = message
+        _current_trace.set(trace)
+        _current_span.set(trace.root)
+        return trace
+
+    def finish_trace(self, trace: Optional[Trace], status: str = "ok", **attributes: Any) -> None:
+        """
+        Close a trace and export it if it is sampled, slow or failed.
+
+        May be called from another task than the one that opened the trace
+        (streaming responses finish in the generation task).
+
+        Args:
+            trace: The trace returned by `start_trace`
+            status: "ok" or "error"
+            **attributes: Attributes added to the root span
+        """
+        if trace is None or trace.root.duration is not None:
+            return
+        trace.root.end()
+        trace.root.status = "error" if trace.error else status
+        trace.root.attributes.update(attributes)
+        if trace.error:
+            trace.root.attributes["error"] = trace.error
+        if self.exporter is not None and (
+                trace.sampled or trace.root.status != "ok"
+                or (self.slow_seconds and trace.root.duration >= self.slow_seconds)):
+            trace.root.attributes["sampled"] = trace.sampled
+            self.exporter.export(trace)
+        if trace.captured:
+            self.capture.export(trace)
+
+    def close(self) -> None:
+        """Flush the exporter and the capture."""
+        if self.exporter is not None:
+            self.exporter.close()
+        if self.capture is not None:
+            self.capture.close()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Time the enclosed block as a span of the current trace.
+
+    Args:
+        name: Span name (the pipeline stage)
+        **attributes: Span attributes; more can be added with `.set()` on the yielded span
+
+    Yields:
+        The span, or a no-op span when no trace is being recorded
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.status = "error"
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+        trace.spans.append(current)
+
+
+def add_span(name: str, start: float, **attributes: Any) -> None:
+    """
+    Record a span that ended now, for stages that cannot be wrapped in `span()`.
+
+    Used inside async generators, where a context variable set in one
+    iteration may not be reset in the same context.
+
+    Args:
+        name: Span name
+        start: `time.perf_counter()` at the start of the stage
+        **attributes: Span attributes
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, attributes, start=start)
+    current.end()
+    trace.spans.append(current)
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the current span, if a trace is being recorded."""
+    current = _current_span.get()
+    if current is not None and _current_trace.get() is not None:
+        current.set(**attributes)
+
+
+def fail_trace(reason: str) -> None:
+    """Mark the current request's trace as failed, so that it is exported."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.error = reason
+
+
+def create_tracer() -> Tracer:
+    """
+    Create the tracer configured by the settings (off unless TRACE_PATH or CAPTURE_PATH is set).
+
+    Returns:
+        The tracer
+    """
+    from src.config.settings import Settings
+    from src.monitoring.capture import create_capture
+    settings = Settings()
+    exporter = None
+    if settings.trace_path:
+        exporter = JsonlSpanExporter(settings.trace_path, max_bytes=int(settings.trace_max_mb * 1024 * 1024),
+                                     backups=settings.trace_backups)
+    return Tracer(exporter, sample_rate=settings.trace_sample_rate, slow_seconds=settings.trace_slow_seconds,
+                  capture=create_capture())
+
+
+# Process-wide tracer
+tracer = create_tracer()
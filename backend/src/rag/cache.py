@@ -2,33 +2,52 @@
 Simple in-memory cache for RAG queries to improve performance.
 """
 
+import threading
 import time
 from typing import Dict, Any, Optional
 import hashlib
+import json
 import logging
 
+from .query_popularity import normalize_query
+from src.monitoring.metrics import metrics
+from src.monitoring.tracing import annotate
+
 logger = logging.getLogger(__name__)
 
 
 class RAGCache:
-    """Simple in-memory cache for RAG query results."""
+    """
+    Simple in-memory cache for RAG query results.
+
+    With a shared state backend, results are also written there so every
+    worker benefits from a retrieval done by another one; the in-memory
+    dict stays in front of it as a per-worker first level.
+    """
 
-    def __init__(self, max_size: int = 1000, ttl_seconds: int = 3600):
+    # Namespace of the shared state backend
+    SHARED_NAMESPACE = "rag_cache"
+
+    def __init__(self, max_size: int = 1000, ttl_seconds: int = 3600, backend=None):
         """
         Initialize the cache.
 
         Args:
             max_size: Maximum number of cached items
             ttl_seconds: Time to live for cached items in seconds
+            backend: Optional SharedStateBackend shared by all workers
         """
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
+        self.backend = backend
         self.cache: Dict[str, Dict[str, Any]] = {}
         self.access_times: Dict[str, float] = {}
+        # Sync endpoints run in a thread pool: eviction must not see the dicts change
+        self._lock = threading.Lock()
 
     def _generate_key(self, query: str) -> str:
-        """Generate a cache key from the query."""
-        return hashlib.md5(query.encode()).hexdigest()
+        """Generate a cache key from the query; trivial variants (case, spacing, final "?") share it."""
+        return hashlib.md5(normalize_query(query).encode()).hexdigest()
 
     def get(self, query: str) -> Optional[list]:
         """
@@ -42,20 +61,31 @@ class RAGCache:
         """
         key = self._generate_key(query)
 
-        if key not in self.cache:
+        with self._lock:
+            entry = self.cache.get(key)
+            expired = entry is not None and time.time() - self.access_times[key] > self.ttl_seconds
+            if expired:
+                del self.cache[key]
+                del self.access_times[key]
+            elif entry is not None:
+                # Update access time
+                self.access_times[key] = time.time()
+
+        if entry is None:
+            result = self._get_shared(key, query)
+            metrics.inc("rag_cache_lookups_total", result="shared_hit" if result is not None else "miss")
+            annotate(cache="shared_hit" if result is not None else "miss")
+            return result
+
+        if expired:
+            metrics.inc("rag_cache_lookups_total", result="miss")
+            annotate(cache="miss")
             return None
 
-        # Check if expired
-        if time.time() - self.access_times[key] > self.ttl_seconds:
-            del self.cache[key]
-            del self.access_times[key]
-            return None
-
-        # Update access time
-        self.access_times[key] = time.time()
-
-        logger.info(f"Cache hit for query: {query[:50]}...")
-        return self.cache[key]["result"]
+        metrics.inc("rag_cache_lookups_total", result="local_hit")
+        annotate(cache="local_hit")
+        logger.debug("Cache hit for query: %.50s...", query)
+        return entry["result"]
 
     def set(self, query: str, result: list):
         """
@@ -66,28 +96,53 @@ class RAGCache:
             result: The search result
         """
         key = self._generate_key(query)
-        current_time = time.time()
+        self._set_local(key, result)
 
-        # Remove oldest items if cache is full
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.access_times.keys(),
-                             key=lambda k: self.access_times[k])
-            del self.cache[oldest_key]
-            del self.access_times[oldest_key]
-
-        # Add new item
-        self.cache[key] = {
-            "result": result,
-            "timestamp": current_time
-        }
-        self.access_times[key] = current_time
+        if self.backend is not None:
+            self.backend.set(self.SHARED_NAMESPACE, key, json.dumps(result).encode("utf-8"),
+                             ttl_seconds=self.ttl_seconds)
+
+        logger.debug("Cached result for query: %.50s...", query)
+
+    def _set_local(self, key: str, result: list):
+        """Add a result to the in-memory cache, evicting the oldest item if full."""
+        current_time = time.time()
 
-        logger.info(f"Cached result for query: {query[:50]}...")
+        with self._lock:
+            # Remove oldest items if cache is full
+            if key not in self.cache and len(self.cache) >= self.max_size:
+                oldest_key = min(self.access_times.keys(),
+                                 key=lambda k: self.access_times[k])
+                del self.cache[oldest_key]
+                del self.access_times[oldest_key]
+
+            # Add new item
+            self.cache[key] = {
+                "result": result,
+                "timestamp": current_time
+            }
+            self.access_times[key] = current_time
+
+    def _get_shared(self, key: str, query: str) -> Optional[list]:
+        """Look a result up in the shared backend and keep it in the local cache."""
+        if self.backend is None:
+            return None
+        value = self.backend.get(self.SHARED_NAMESPACE, key)
+        if value is None:
+            return None
+        result = json.loads(value)
+        self._set_local(key, result)
+        logger.debug("Shared cache hit for query: %.50s...", query)
+        return result
 
     def clear(self):
-        """Clear all cached items."""
-        self.cache.clear()
-        self.access_times.clear()
+        """Clear all cached items, including those shared with the other workers."""
+        with self._lock:
+            self.cache.clear()
+            self.access_times.clear()
+        if self.backend is not None:
+            for key in self.backend.keys(self.SHARED_NAMESPACE):
+                self.backend.delete(self.SHARED_NAMESPACE, key)
         logger.info("RAG cache cleared")
 
     def get_stats(self) -> Dict[str, Any]:
@@ -95,5 +150,6 @@ class RAGCache:
         return {
             "size": len(self.cache),
             "max_size": self.max_size,
-            "ttl_seconds": self.ttl_seconds
+            "ttl_seconds": self.ttl_seconds,
+            "shared": self.backend is not None
         }
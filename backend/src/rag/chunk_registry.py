@@ -0,0 +1,74 @@
+"""
+Content-addressed IDs for knowledge-base chunks.
+"""
+
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional
+
+
+def chunk_id(text: str) -> int:
+    """
+    Compute the stable ID of a chunk text.
+
+    The ID is a 64-bit hash of the text, so it is the same across processes
+    and restarts as long as the knowledge base is unchanged.
+
+    Args:
+        text: The chunk text
+
+    Returns:
+        The chunk ID
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ChunkRegistry:
+    """Maps chunk IDs to the chunk texts of the loaded knowledge base."""
+
+    def __init__(self):
+        self.texts: Dict[int, str] = {}
+        self.lock = threading.Lock()
+
+    def register(self, texts: Iterable[str]) -> None:
+        """
+        Register chunk texts so states can reference them by ID.
+
+        Args:
+            texts: Chunk texts of the knowledge base
+        """
+        entries = {chunk_id(text): text for text in texts}
+        with self.lock:
+            self.texts.update(entries)
+
+    def id_for(self, text: str) -> Optional[int]:
+        """
+        Get the ID of a registered chunk text.
+
+        Args:
+            text: The chunk text
+
+        Returns:
+            The chunk ID, or None if the text is not a registered chunk
+        """
+        cid = chunk_id(text)
+        return cid if self.texts.get(cid) == text else None
+
+    def text_for(self, cid: int) -> Optional[str]:
+        """
+        Get the text of a chunk ID.
+
+        Args:
+            cid: The chunk ID
+
+        Returns:
+            The chunk text, or None if the chunk is not loaded
+        """
+        return self.texts.get(cid)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+
+# Registry of the chunks loaded in this process, filled by the vector store
+chunk_registry = ChunkRegistry()
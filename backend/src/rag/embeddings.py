@@ -1,30 +1,106 @@
 """
-Google embeddings wrapper for text-embedding-004.
+Embedding backends: Google text-embedding-004 and a deterministic local hashing model.
 """
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import hashlib
 import os
+import re
 import time
+from typing import List, Optional
+
+import numpy as np
+
+from src.config.settings import Settings
+
+# Dimension of the Google embedding model, used by default for the local backend too
+GOOGLE_EMBEDDING_DIM = 768
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings:
+    """
+    Deterministic local embeddings from hashed word and word-bigram features.
+
+    Needs no API key or network and gives identical vectors on every machine,
+    so CI and offline builds produce reproducible indexes. Retrieval quality is
+    lexical (shared words), not semantic.
+    """
+
+    def __init__(self, dimension: int = GOOGLE_EMBEDDING_DIM):
+        """
+        Initialize the model.
+
+        Args:
+            dimension: Dimension of the embedding vectors
+        """
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            # Signed hashing keeps collisions from only ever adding up
+            vector[value % self.dimension] += 1.0 if (value >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        else:
+            # Texts without words (separators, punctuation) get a unit vector too,
+            # otherwise every query would be closer to them than to any real match
+            vector[0] = 1.0
+        return vector.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query text."""
+        return self._embed(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of document texts."""
+        return [self._embed(text) for text in texts]
 
 
 class Embeddings:
-    """Wrapper for Google text-embedding-004 model."""
+    """Embedding model selected by the EMBEDDINGS_BACKEND setting."""
+
+    def __init__(self, backend: Optional[str] = None, dimension: int = GOOGLE_EMBEDDING_DIM):
+        """
+        Initialize the embedding model.
+
+        Args:
+            backend: "google" (text-embedding-004) or "hashing" (local); defaults to the setting
+            dimension: Dimension of the local backend's vectors
+        """
+        self.backend = backend or Settings().embeddings_backend
+        if self.backend == "hashing":
+            self.embeddings = HashingEmbeddings(dimension)
+            self.rate_limited = False
+        elif self.backend == "google":
+            # Imported here: the Google client is slow to import and not needed offline
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
-    def __init__(self):
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",  # Correct model name format with no tabs
-            google_api_key=os.environ.get("GOOGLE_API_KEY"),
-            task_type="retrieval_query"  # Optimized for retrieval tasks
-        )
+            self.embeddings = GoogleGenerativeAIEmbeddings(
+                model="models/embedding-001",  # Correct model name format with no tabs
+                google_api_key=os.environ.get("GOOGLE_API_KEY"),
+                task_type="retrieval_query"  # Optimized for retrieval tasks
+            )
+            self.rate_limited = True
+        else:
+            raise ValueError(f"Unknown embeddings backend: {self.backend}")
 
     def embed_query(self, text: str):
         """Embed a query text."""
         # Add small delay to avoid rate limiting
-        time.sleep(0.1)
+        if self.rate_limited:
+            time.sleep(0.1)
         return self.embeddings.embed_query(text)
 
     def embed_documents(self, texts: list[str]):
         """Embed a list of document texts."""
         # Add delay between batches to avoid rate limiting
-        time.sleep(0.2)
+        if self.rate_limited:
+            time.sleep(0.2)
         return self.embeddings.embed_documents(texts)
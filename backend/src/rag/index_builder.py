@@ -0,0 +1,261 @@
+"""
+Offline build of the knowledge-base index into a deployable artifact.
+
+An artifact is a directory that the server loads read-only (see
+`VectorStore.load`):
+
+    manifest.json   format version, content version, embedding model, chunker, sources
+    index.faiss     FAISS index of the chunk embeddings
+    documents.pkl   chunk store: text and metadata of every chunk, in index order
+    lexical.json    optional BM25 index of the same chunks
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .chunk_registry import chunk_id
+from .document_processor import DocumentProcessor
+from .embeddings import Embeddings
+from .lexical_index import LexicalIndex
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the layout of the artifact changes
+ARTIFACT_FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+DOCUMENTS_FILE = "documents.pkl"
+LEXICAL_FILE = "lexical.json"
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the manifest of an artifact.
+
+    Args:
+        directory: Artifact directory
+
+    Returns:
+        The manifest, or None for a directory saved without one (`VectorStore.save`)
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported index artifact format {manifest.get('format_version')} in {directory}, "
+            f"expected {ARTIFACT_FORMAT_VERSION}")
+    return manifest
+
+
+def _check_output_dir(output_dir: str, force: bool) -> None:
+    """
+    Refuse to replace a directory that is not an index artifact.
+
+    Args:
+        output_dir: Artifact directory about to be replaced
+        force: Replace it anyway
+
+    Raises:
+        FileExistsError: If `output_dir` exists, is not empty and holds no manifest written by this builder
+    """
+    if force or not os.path.exists(output_dir):
+        return
+    if os.path.isdir(output_dir):
+        if not os.listdir(output_dir):
+            return
+        try:
+            with open(os.path.join(output_dir, MANIFEST_FILE), encoding="utf-8") as f:
+                if "format_version" in json.load(f):
+                    return
+        except (OSError, ValueError):
+            pass
+    raise FileExistsError(f"{output_dir} exists and is not an index artifact (no {MANIFEST_FILE}); "
+                          f"choose another output directory or force the replacement (--force)")
+
+
+def _chunk_file(path: str, chunk_size: int, chunk_overlap: int) -> List[Dict[str, Any]]:
+    # Module-level so that the process pool can pickle it
+    return DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap).load_file(path)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def deduplicate(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Drop chunks whose text repeats an earlier chunk, ignoring whitespace.
+
+    Args:
+        documents: Chunks with 'text' and 'metadata' keys
+
+    Returns:
+        The chunks kept, in their original order
+    """
+    seen = set()
+    kept = []
+    for document in documents:
+        key = chunk_id(" ".join(document["text"].split()))
+        if key not in seen:
+            seen.add(key)
+            kept.append(document)
+    return kept
+
+
+def embed_parallel(embeddings: Embeddings, texts: List[str], batch_size: int = 64,
+                   workers: int = 4) -> List[List[float]]:
+    """
+    Embed texts in batches on a thread pool, logging progress.
+
+    Threads overlap the latency of the embedding API calls; results keep
+    the order of `texts`.
+
+    Args:
+        embeddings: Embedding model
+        texts: Texts to embed
+        batch_size: Texts per embedding call
+        workers: Concurrent embedding calls
+
+    Returns:
+        One vector per text
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    vectors: List[List[float]] = []
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map() yields in submission order while later batches are still running
+        for batch_vectors in pool.map(embeddings.embed_documents, batches):
+            vectors.extend(batch_vectors)
+            elapsed = time.time() - start
+            logger.info(f"Embedded {len(vectors)}/{len(texts)} chunks "
+                        f"({len(vectors) / elapsed if elapsed else 0:.0f} chunks/s)")
+    return vectors
+
+
+def build_index(document_paths: List[str], output_dir: str, chunk_size: int = 400, chunk_overlap: int = 50,
+                embeddings_backend: Optional[str] = None, batch_size: int = 64, workers: int = 4,
+                lexical: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Chunk, deduplicate and embed documents into an index artifact.
+
+    The artifact is written to a temporary directory next to `output_dir`
+    and moved into place once complete, so a server never loads a
+    half-written index. An existing `output_dir` is only replaced if it
+    holds a previous artifact (or is empty), unless `force` is set.
+
+    Args:
+        document_paths: Text files of the knowledge base
+        output_dir: Artifact directory to create or replace
+        chunk_size: Chunk size in characters
+        chunk_overlap: Overlap between consecutive chunks in characters
+        embeddings_backend: "google" or "hashing" (defaults to the EMBEDDINGS_BACKEND setting)
+        batch_size: Chunks per embedding call
+        workers: Processes for chunking and concurrent embedding calls
+        lexical: Whether to also write a BM25 lexical index
+        force: Replace `output_dir` even if it is not an index artifact
+
+    Returns:
+        The artifact manifest
+
+    Raises:
+        FileExistsError: If `output_dir` is not an index artifact and `force` is not set
+    """
+    import faiss
+    import numpy as np
+
+    missing = [path for path in document_paths if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Documents not found: {', '.join(missing)}")
+    output_dir = os.path.abspath(output_dir)
+    _check_output_dir(output_dir, force)
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(document_paths)))) as pool:
+        chunked = list(pool.map(_chunk_file, document_paths,
+                                [chunk_size] * len(document_paths), [chunk_overlap] * len(document_paths)))
+    sources = [{"path": path, "sha256": _file_sha256(path), "chunks": len(chunks)}
+               for path, chunks in zip(document_paths, chunked)]
+    all_chunks = [chunk for chunks in chunked for chunk in chunks]
+    documents = deduplicate(all_chunks)
+    logger.info(f"Chunked {len(document_paths)} documents into {len(all_chunks)} chunks, "
+                f"{len(all_chunks) - len(documents)} duplicates removed")
+    if not documents:
+        raise ValueError("The documents contain no text to index")
+
+    embeddings = Embeddings(embeddings_backend)
+    texts = [document["text"] for document in documents]
+    vectors = np.array(embed_parallel(embeddings, texts, batch_size, workers), dtype=np.float32)
+    dimension = vectors.shape[1]
+
+    # Same chunks, chunker and vectors give the same version
+    version = hashlib.blake2b(digest_size=8)
+    version.update(json.dumps([embeddings.backend, dimension, chunk_size, chunk_overlap]).encode("utf-8"))
+    for text in texts:
+        version.update(chunk_id(text).to_bytes(8, "big"))
+    version.update(vectors.tobytes())
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "version": version.hexdigest(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embeddings": {"backend": embeddings.backend, "dimension": dimension},
+        "chunking": {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap},
+        "sources": sources,
+        "num_chunks": len(documents),
+        "duplicates_removed": len(all_chunks) - len(documents),
+        "files": [INDEX_FILE, DOCUMENTS_FILE] + ([LEXICAL_FILE] if lexical else []),
+    }
+
+    staging_dir = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    try:
+        index = faiss.IndexFlatL2(dimension)
+        index.add(vectors)
+        faiss.write_index(index, os.path.join(staging_dir, INDEX_FILE))
+        with open(os.path.join(staging_dir, DOCUMENTS_FILE), "wb") as f:
+            pickle.dump(documents, f)
+        if lexical:
+            LexicalIndex.build(texts).save(os.path.join(staging_dir, LEXICAL_FILE))
+        # Written last: a directory with a manifest is a complete artifact
+        with open(os.path.join(staging_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Checked again: the directory may have appeared during the build
+        _check_output_dir(output_dir, force)
+        if os.path.isdir(output_dir):
+            # A directory cannot be replaced in one rename: move the old
+            # artifact aside first and delete it once the new one is in place
+            previous_dir = f"{output_dir}.old-{os.getpid()}"
+            shutil.rmtree(previous_dir, ignore_errors=True)
+            os.rename(output_dir, previous_dir)
+            os.rename(staging_dir, output_dir)
+            shutil.rmtree(previous_dir, ignore_errors=True)
+        else:
+            if os.path.exists(output_dir):
+                # A file, replaced with force
+                os.remove(output_dir)
+            os.rename(staging_dir, output_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Built index {manifest['version']} ({len(documents)} chunks) in {output_dir} "
+                f"in {time.time() - start:.2f}s")
+    return manifest
@@ -0,0 +1,109 @@
+"""
+BM25 lexical index over the knowledge-base chunks.
+"""
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a text into lowercase word tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalIndex:
+    """Inverted index scoring chunks with BM25, for exact-term matches (plan names, prices, codes)."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        # term -> list of (chunk position, term frequency)
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+
+    @classmethod
+    def build(cls, texts: List[str]) -> "LexicalIndex":
+        """
+        Build the index of a list of chunk texts.
+
+        Args:
+            texts: Chunk texts, in the order of the vector index
+
+        Returns:
+            The index
+        """
+        index = cls()
+        postings = defaultdict(list)
+        for position, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            index.lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings[term].append((position, count))
+        index.postings = dict(postings)
+        return index
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """
+        Find the chunks that best match a query's terms.
+
+        Args:
+            query: The search query
+            k: Number of results to return
+
+        Returns:
+            List of (chunk position, score), best first
+        """
+        if not self.lengths:
+            return []
+        average_length = sum(self.lengths) / len(self.lengths)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self.lengths) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / average_length)
+                scores[position] += idf * count * (self.k1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def save(self, path: str) -> None:
+        """
+        Save the index as JSON.
+
+        Args:
+            path: File to write
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "lengths": self.lengths, "postings": self.postings}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """
+        Load an index saved with `save`.
+
+        Args:
+            path: File to read
+
+        Returns:
+            The index
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["k1"], data["b"])
+        index.lengths = data["lengths"]
+        index.postings = {term: [tuple(posting) for posting in postings]
+                          for term, postings in data["postings"].items()}
+        return index
@@ -0,0 +1,270 @@
+"""
+Bounded-memory log of the most frequent user queries, for cache priming.
+
+Counts are kept in a count-min sketch, and the heavy hitters (the top-K
+queries by estimated count) in a small dict, so memory does not grow with
+the number of distinct queries. Counts are halved periodically so the
+ranking follows current traffic, and the log is saved to a JSON file so
+a restarted server can prime its caches with yesterday's top queries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n?!.,;:¿¡"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivial variants count (and cache) as one.
+
+    Case, Unicode form, repeated whitespace and leading/trailing punctuation
+    are ignored: "Forfaits  internet ?" and "forfaits internet" are the same.
+
+    Args:
+        query: Raw query text
+
+    Returns:
+        The normalized query
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return _SPACES.sub(" ", text).strip(_EDGE_PUNCTUATION)
+
+
+class CountMinSketch:
+    """Count-min sketch with conservative update: never underestimates, bounded memory."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        """
+        Initialize the sketch.
+
+        Args:
+            width: Counters per row (error ~ total count / width)
+            depth: Rows (probability of exceeding the error ~ e^-depth)
+        """
+        self.width = width
+        self.depth = depth
+        self.rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[8 * i:8 * i + 8], "little") % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """
+        Count occurrences of a key.
+
+        Args:
+            key: The key
+            count: Occurrences to add
+
+        Returns:
+            The new estimated count of the key
+        """
+        positions = self._positions(key)
+        estimate = min(row[position] for row, position in zip(self.rows, positions)) + count
+        # Conservative update: only raise the counters that are below the new estimate
+        for row, position in zip(self.rows, positions):
+            if row[position] < estimate:
+                row[position] = estimate
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        """Get the estimated count of a key (never lower than the true count)."""
+        return min(row[position] for row, position in zip(self.rows, self._positions(key)))
+
+    def decay(self) -> None:
+        """Halve every counter."""
+        for row in self.rows:
+            for i, value in enumerate(row):
+                if value:
+                    row[i] = value >> 1
+
+    def to_dict(self) -> Dict:
+        return {"width": self.width, "depth": self.depth, "rows": [list(row) for row in self.rows]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        for row, values in zip(sketch.rows, data["rows"]):
+            row[:] = array("Q", values)
+        return sketch
+
+
+class QueryPopularity:
+    """
+    Frequencies of normalized queries: count-min sketch plus top-K heavy hitters.
+
+    Thread-safe; `record` is O(depth) except when a query enters the top-K,
+    which scans it once to evict the least frequent entry.
+    """
+
+    def __init__(self, top_k: int = 200, width: int = 2048, depth: int = 4, path: str = "",
+                 decay_seconds: float = 24 * 3600, save_interval_seconds: float = 60):
+        """
+        Initialize the log.
+
+        Args:
+            top_k: Number of most frequent queries tracked
+            width: Count-min sketch width
+            depth: Count-min sketch depth
+            path: JSON file the log is loaded from and saved to (in memory only when empty)
+            decay_seconds: Interval after which all counts are halved (0 to never decay)
+            save_interval_seconds: Minimum interval between two saves triggered by `record`
+        """
+        self.top_k = top_k
+        self.path = path
+        self.decay_seconds = decay_seconds
+        self.save_interval_seconds = save_interval_seconds
+        self.sketch = CountMinSketch(width, depth)
+        # Normalized query -> estimated count
+        self.heavy_hitters: Dict[str, int] = {}
+        self.floor = 0
+        self.total = 0
+        self.last_decay = time.time()
+        self.last_saved = time.time()
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def record(self, query: str) -> None:
+        """
+        Count one occurrence of a user query.
+
+        Args:
+            query: Raw query text
+        """
+        key = normalize_query(query)
+        if not key:
+            return
+        now = time.time()
+        with self.lock:
+            if self.decay_seconds and now - self.last_decay >= self.decay_seconds:
+                self._decay()
+                self.last_decay = now
+            self.total += 1
+            estimate = self.sketch.add(key)
+            if key in self.heavy_hitters or len(self.heavy_hitters) < self.top_k:
+                self.heavy_hitters[key] = estimate
+            elif estimate > self.floor:
+                # The floor is a lower bound of the smallest tracked count, so most
+                # infrequent queries are rejected without scanning the top-K
+                weakest = min(self.heavy_hitters, key=self.heavy_hitters.get)
+                self.floor = self.heavy_hitters[weakest]
+                if estimate > self.floor:
+                    del self.heavy_hitters[weakest]
+                    self.heavy_hitters[key] = estimate
+        if self.path and now - self.last_saved >= self.save_interval_seconds and not self.save_lock.locked():
+            self.last_saved = now
+            threading.Thread(target=self.save, daemon=True).start()
+
+    def _decay(self) -> None:
+        # Called with self.lock held
+        self.sketch.decay()
+        self.heavy_hitters = {key: count >> 1 for key, count in self.heavy_hitters.items() if count >> 1}
+        self.floor = 0
+        self.total >>= 1
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        """
+        Get the most frequent queries.
+
+        Args:
+            n: Number of queries
+
+        Returns:
+            List of (normalized query, estimated count), most frequent first
+        """
+        with self.lock:
+            items = list(self.heavy_hitters.items())
+        return sorted(items, key=lambda item: item[1], reverse=True)[:n]
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Save the log atomically.
+
+        Args:
+            path: File to write (defaults to the configured path)
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self.save_lock:
+            with self.lock:
+                data = {
+                    "version": 1,
+                    "saved_at": time.time(),
+                    "last_decay": self.last_decay,
+                    "total": self.total,
+                    "heavy_hitters": sorted(self.heavy_hitters.items(), key=lambda item: item[1], reverse=True),
+                    "sketch": self.sketch.to_dict(),
+                }
+            temp_path = f"{path}.tmp-{os.getpid()}"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning(f"Could not save the query popularity log to {path}: {str(e)}")
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Load a log saved with `save`, replacing the current counts.
+
+        Args:
+            path: File to read (defaults to the configured path)
+        """
+        path = path or self.path
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            sketch = CountMinSketch.from_dict(data["sketch"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable query popularity log {path}: {str(e)}")
+            return
+        with self.lock:
+            self.sketch = sketch
+            self.heavy_hitters = dict(list(map(tuple, data["heavy_hitters"]))[:self.top_k])
+            self.floor = 0
+            self.total = data["total"]
+            self.last_decay = data["last_decay"]
+        logger.info(f"Loaded query popularity log with {len(self.heavy_hitters)} top queries from {path}")
+
+    def stats(self) -> Dict:
+        """Get the log's size and top queries."""
+        return {"total": self.total, "tracked": len(self.heavy_hitters), "top": self.top(10)}
+
+
+_query_popularity: Optional[QueryPopularity] = None
+_query_popularity_lock = threading.Lock()
+
+
+def get_query_popularity() -> QueryPopularity:
+    """
+    Get the process-wide query popularity log configured by the settings.
+
+    Returns:
+        The log
+    """
+    global _query_popularity
+    if _query_popularity is None:
+        from src.config.settings import Settings
+        with _query_popularity_lock:
+            if _query_popularity is None:
+                settings = Settings()
+                _query_popularity = QueryPopularity(
+                    top_k=settings.query_log_top_k, path=settings.query_log_path,
+                    decay_seconds=settings.query_log_decay_hours * 3600)
+    return _query_popularity
@@ -8,21 +8,31 @@ from typing import List, Dict, Any, Optional
 import pickle
 import os
 from .embeddings import Embeddings
+from .chunk_registry import chunk_registry
+from .index_builder import LEXICAL_FILE, read_manifest
+from .lexical_index import LexicalIndex
+from src.monitoring.metrics import timed_stage
+from src.monitoring.tracing import span
 
 class VectorStore:
     """FAISS-based vector store for document embeddings and similarity search."""
     
-    def __init__(self, embedding_dim: int = 768):
+    def __init__(self, embedding_dim: int = 768, embeddings_model: Optional[Embeddings] = None):
         """
         Initialize a new FAISS vector store.
         
         Args:
             embedding_dim: Dimension of the embedding vectors
+            embeddings_model: Optional embedding model (defaults to the EMBEDDINGS_BACKEND setting)
         """
         self.embedding_dim = embedding_dim
         self.index = faiss.IndexFlatL2(embedding_dim)  # L2 distance for similarity
         self.documents = []  # Store document texts and metadata
-        self.embeddings_model = Embeddings()
+        self.embeddings_model = embeddings_model or Embeddings()
+        # Manifest of the artifact this store was loaded from, if any
+        self.manifest = None
+        # BM25 index of the artifact, fused with the vector results when loaded
+        self.lexical_index: Optional[LexicalIndex] = None
     
     def add_documents(self, documents: List[Dict[str, Any]]):
         """
@@ -48,6 +58,9 @@ class VectorStore:
         
         # Store documents
         self.documents.extend(documents)
+
+        # Let stored conversation states reference these chunks by ID
+        chunk_registry.register(texts)
     
     def similarity_search(self, query: str, k: int = 4) -> List[Dict[str, Any]]:
         """
@@ -61,7 +74,8 @@ class VectorStore:
             List of similar documents with scores
         """
         # Embed the query
-        query_embedding = self.embeddings_model.embed_query(query)
+        with timed_stage("embedding"), span("embedding", query_chars=len(query)):
+            query_embedding = self.embeddings_model.embed_query(query)
         query_array = np.array([query_embedding]).astype('float32')
         
         # Ensure k is not larger than the number of documents
@@ -70,8 +84,16 @@ class VectorStore:
         if k == 0:
             return []
         
+        # With a lexical index, more candidates are drawn from each side for the fusion
+        candidates = min(k * 2, len(self.documents)) if self.lexical_index else k
+
         # Search the index
-        distances, indices = self.index.search(query_array, k)
+        with timed_stage("search"), span("faiss_search", k=candidates, index_size=len(self.documents)):
+            distances, indices = self.index.search(query_array, candidates)
+        if self.lexical_index:
+            with span("lexical_search", k=candidates):
+                lexical = self.lexical_index.search(query, candidates)
+            return self._fuse(indices[0], lexical, k)
         
         # Prepare results
         results = []
@@ -85,6 +107,18 @@ class VectorStore:
                 })
         
         return results
+
+    def _fuse(self, vector_positions, lexical: List, k: int, rrf_k: int = 60) -> List[Dict[str, Any]]:
+        """Merge vector and BM25 rankings by reciprocal rank fusion; `score` is the fused score."""
+        scores: Dict[int, float] = {}
+        rankings = ([int(position) for position in vector_positions if 0 <= position < len(self.documents)],
+                    [position for position, _ in lexical])
+        for ranking in rankings:
+            for rank, position in enumerate(ranking):
+                scores[position] = scores.get(position, 0.0) + 1.0 / (rrf_k + rank + 1)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [{"text": self.documents[position]["text"], "metadata": self.documents[position]["metadata"],
+                 "score": score} for position, score in best]
     
     def save(self, directory: str):
         """
@@ -103,24 +137,49 @@ class VectorStore:
             pickle.dump(self.documents, f)
     
     @classmethod
-    def load(cls, directory: str):
+    def load(cls, directory: str, lexical: bool = True):
         """
         Load a vector store from disk.
+
+        Artifacts written by `build-index` carry a manifest: queries are then
+        embedded with the model the index was built with, and the index is
+        memory-mapped read-only, so workers share its pages. Their optional
+        BM25 index is loaded too, and searches then fuse both rankings.
         
         Args:
             directory: Directory containing the vector store
+            lexical: Load the artifact's lexical index, if it has one
             
         Returns:
             Loaded VectorStore instance
         """
+        manifest = read_manifest(directory)
+
         # Create a new instance
-        vector_store = cls()
+        if manifest:
+            config = manifest["embeddings"]
+            vector_store = cls(config["dimension"], Embeddings(config["backend"], config["dimension"]))
+            vector_store.manifest = manifest
+        else:
+            vector_store = cls()
         
         # Load FAISS index
-        vector_store.index = faiss.read_index(os.path.join(directory, "index.faiss"))
+        index_path = os.path.join(directory, "index.faiss")
+        if manifest:
+            try:
+                vector_store.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Index types without mmap support are read into memory
+                vector_store.index = faiss.read_index(index_path)
+        else:
+            vector_store.index = faiss.read_index(index_path)
         
         # Load documents
         with open(os.path.join(directory, "documents.pkl"), "rb") as f:
             vector_store.documents = pickle.load(f)
+        chunk_registry.register(doc["text"] for doc in vector_store.documents)
+
+        if lexical and manifest and LEXICAL_FILE in manifest.get("files", []):
+            vector_store.lexical_index = LexicalIndex.load(os.path.join(directory, LEXICAL_FILE))
         
         return vector_store 
\ No newline at end of file
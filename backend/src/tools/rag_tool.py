@@ -6,17 +6,23 @@ from .base_tool import BaseTool
 from src.rag.document_processor import DocumentProcessor
 from src.rag.vector_store import VectorStore
 from src.rag.cache import RAGCache
+from src.memory.shared_state import get_shared_state
 from src.config.settings import Settings
+from src.monitoring.metrics import count_error
 from typing import List, Optional
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 
 class RAGTool(BaseTool):
     """RAG tool that retrieves relevant chunks using vector similarity search."""
     name = "rag_search"
     description = "Search the knowledge base for relevant information."
 
-    def __init__(self, document_path_or_content: str, is_file_path: bool = True, additional_documents: Optional[List[str]] = None):
+    def __init__(self, document_path_or_content: str, is_file_path: bool = True, additional_documents: Optional[List[str]] = None,
+                 embeddings_model=None):
         # Load settings
         self.settings = Settings()
         """
@@ -26,14 +32,15 @@ class RAGTool(BaseTool):
             document_path_or_content: Path to document file or raw document content
             is_file_path: Whether the first argument is a file path (True) or raw content (False)
             additional_documents: List of additional document paths to load
+            embeddings_model: Optional embedding model (defaults to the EMBEDDINGS_BACKEND setting)
         """
         # OPTIMIZED FOR SPEED - Smaller chunks and overlap for faster processing
         self.processor = DocumentProcessor(chunk_size=400, chunk_overlap=50)
         self.vector_store = VectorStore(
-            embedding_dim=768)  # Google embedding dimension
+            embedding_dim=768, embeddings_model=embeddings_model)  # Google embedding dimension
 
-        # Initialize cache if enabled
-        self.cache = RAGCache() if self.settings.rag_cache_enabled else None
+        # Initialize cache if enabled (shared by all workers when a shared state backend is configured)
+        self.cache = RAGCache(backend=get_shared_state()) if self.settings.rag_cache_enabled else None
 
         # Process the main document
         if is_file_path and os.path.exists(document_path_or_content):
@@ -57,17 +64,17 @@ class RAGTool(BaseTool):
                         additional_docs = self.processor.load_file(doc_path)
                         self.vector_store.add_documents(additional_docs)
                         total_chunks += len(additional_docs)
-                        print(
+                        logger.info(
                             f"Loaded additional document: {doc_path} ({len(additional_docs)} chunks)")
                     except Exception as e:
-                        print(
+                        logger.error(
                             f"Error loading additional document {doc_path}: {e}")
                 else:
-                    print(f"Additional document not found: {doc_path}")
+                    logger.warning(f"Additional document not found: {doc_path}")
 
         # Store the number of chunks for logging
         self.num_chunks = total_chunks
-        print(
+        logger.info(
             f"RAG Tool initialized with {self.num_chunks} total document chunks")
 
     def __call__(self, query: str) -> List[str]:
@@ -103,7 +110,8 @@ class RAGTool(BaseTool):
             return texts
 
         except Exception as e:
-            print(f"Error in RAG search: {e}")
+            logger.error("Error in RAG search: %s", e)
+            count_error("retrieval")
             return ["Error retrieving information from the knowledge base."]
 
     def save(self, directory: str):
@@ -124,17 +132,18 @@ class RAGTool(BaseTool):
         """
         try:
             # Try to load from disk
-            vector_store = VectorStore.load(directory)
+            settings = Settings()
+            vector_store = VectorStore.load(directory, lexical=settings.lexical_search)
             rag_tool = cls.__new__(cls)
-            rag_tool.settings = Settings()
+            rag_tool.settings = settings
             rag_tool.processor = DocumentProcessor(
                 chunk_size=400, chunk_overlap=50)
             rag_tool.vector_store = vector_store
-            rag_tool.cache = RAGCache() if rag_tool.settings.rag_cache_enabled else None
+            rag_tool.cache = RAGCache(backend=get_shared_state()) if rag_tool.settings.rag_cache_enabled else None
             rag_tool.num_chunks = len(vector_store.documents)
             return rag_tool
         except Exception as e:
-            print(f"Error loading RAG tool from disk: {e}")
+            logger.error(f"Error loading RAG tool from disk: {e}")
             # Fallback to loading from document
             if document_path:
                 return cls(document_path)
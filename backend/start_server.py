@@ -10,15 +10,10 @@ import logging
 from dotenv import load_dotenv
 load_dotenv()
 
-# Configuration des logs
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('server.log')
-    ]
-)
+# Configuration des logs : écrits par un thread d'arrière-plan, dans la console
+# et dans server.log (rotation à LOG_MAX_MB), sauf si LOG_FILE est défini
+from src.monitoring.structured_logging import configure_logging  # noqa: E402
+configure_logging(log_file=os.environ.get("LOG_FILE") or "server.log")
 logger = logging.getLogger(__name__)
 
 
@@ -26,7 +21,11 @@ def check_environment():
     """Vérifier la configuration de l'environnement."""
     logger.info("🔍 Vérification de l'environnement...")
 
-    required_vars = ['GOOGLE_API_KEY']
+    # Pas de clé nécessaire quand le LLM et les embeddings sont locaux
+    # (LLM_BACKEND=fake, EMBEDDINGS_BACKEND=hashing)
+    local = (os.environ.get("LLM_BACKEND") == "fake"
+             and os.environ.get("EMBEDDINGS_BACKEND") == "hashing")
+    required_vars = [] if local else ['GOOGLE_API_KEY']
     missing_vars = []
 
     for var in required_vars:
@@ -63,38 +62,23 @@ def preload_documents():
     logger.info("🚀 Démarrage du préchargement des documents...")
 
     try:
-        # Import après vérification de l'environnement
-        from src.agent.rag_agent import LangGraphRAGAgent
-        from src.memory.checkpointer import Checkpointer
-        from src.config.settings import Settings
+        # Import après vérification de l'environnement ; l'agent est construit
+        # avec le checkpointer de l'application, qui le réutilise tel quel
+        from src.api import main as api
 
         start_time = time.time()
 
-        # Initialisation des composants
-        settings = Settings()
-        checkpointer = Checkpointer(db_path=settings.checkpoint_db_path)
-
-        # Chemin du document
+        # Vérifier le document
         document_path = os.environ.get(
             "DOCUMENT_PATH", "src/rag/static_document.txt")
-        model_name = os.environ.get("MODEL_NAME", "gemini-1.5-flash")
-
-        # Vérifier le document
         if not os.path.exists(document_path):
             logger.error("❌ Document à précharger non trouvé!")
             return False
 
-        # Initialiser l'agent avec document unique
-        agent = LangGraphRAGAgent(
-            document_path=document_path,
-            model_name=model_name,
-            checkpointer=checkpointer
-        )
-
-        # Test de requête pour réchauffer le système
-        logger.info("🔥 Test de requête pour réchauffer le système...")
-        test_query = "Airtel Niger services"
-        agent.rag_tool(test_query)  # Warm up the system
+        agent = api.preload_documents()
+        if agent is None:
+            return False
+        api.agent = agent
 
         preload_time = time.time() - start_time
         logger.info(f"✅ Préchargement terminé en {preload_time:.2f} secondes")
@@ -122,15 +106,19 @@ def start_server():
         host = "0.0.0.0" if os.environ.get("VERCEL") else "127.0.0.1"
 
         logger.info(f"🚀 Serveur démarré sur {host}:{port}")
-        logger.info("📝 Logs disponibles dans server.log")
+        logger.info(f"📝 Logs disponibles dans {os.environ.get('LOG_FILE') or 'server.log'}")
 
-        # Démarrer le serveur
+        # Servir l'application déjà préchargée dans ce processus. Pas de
+        # reload : il relancerait l'import et le préchargement dans un
+        # sous-processus (pour le développement : uvicorn src.api.main:app --reload)
+        from src.api import main as api
         uvicorn.run(
-            "src.api.main:app",
+            api.app,
             host=host,
             port=port,
-            reload=True,
-            log_level="info"
+            log_level="info",
+            # Logs d'uvicorn (dont les accès) via la même file que l'application
+            log_config=None
         )
 
     except Exception as e:
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests of the SQLite conversation store: read-only states, cached and from disk.
+"""
+
+import os
+import tempfile
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.memory.sqlite_checkpointer import SQLiteCheckpointer
+
+
+def _store(cache_size=16):
+    return SQLiteCheckpointer(os.path.join(tempfile.mkdtemp(), "checkpoints.db"), cache_size=cache_size)
+
+
+def _state(text):
+    return {"messages": [HumanMessage(content=text), AIMessage(content="Bonjour")],
+            "retrieved_docs": [], "current_query": text, "tool_calls": []}
+
+
+def test_returned_state_does_not_change_the_cache():
+    store = _store()
+    store.save_state(_state("Forfaits internet ?"), "t1")
+
+    state = store.get_state("t1")
+    assert isinstance(state["messages"], tuple)
+    state["messages"] = ()
+    state["current_query"] = "changed"
+
+    again = store.get_state("t1")
+    assert [m.content for m in again["messages"]] == ["Forfaits internet ?", "Bonjour"]
+    assert again["current_query"] == "Forfaits internet ?"
+    store.close()
+
+
+def test_state_loaded_from_disk_is_frozen():
+    store = _store(cache_size=1)
+    store.save_state(_state("Forfaits internet ?"), "t1")
+    store.flush()
+    # Evicts t1 from the LRU, so the next read decodes it from the database
+    store.save_state(_state("Roaming ?"), "t2")
+    store.cache.pop("t1", None)
+
+    state = store.get_state("t1")
+    assert isinstance(state["messages"], tuple) and isinstance(state["tool_calls"], tuple)
+    assert state["messages"][0].content == "Forfaits internet ?"
+    assert store.get_memory() is None
+    store.close()
+
+
+if __name__ == "__main__":
+    test_returned_state_does_not_change_the_cache()
+    test_state_loaded_from_disk_is_frozen()
+    print("✅ SQLite checkpointer tests passed")
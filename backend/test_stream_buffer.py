@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests of the resumable SSE stream: completion and error events.
+"""
+
+import asyncio
+
+from src.api.main import _sse_events
+from src.api.stream_buffer import StreamRegistry
+
+
+async def _producer(chunks, error=None):
+    for chunk in chunks:
+        yield chunk
+    if error is not None:
+        raise error
+
+
+async def _read(buffer, after_seq=-1):
+    return [event async for event in _sse_events(buffer, after_seq)]
+
+
+def _run_generation(chunks, error=None):
+    async def run():
+        registry = StreamRegistry()
+        buffer = registry.start("session", _producer(chunks, error))
+        await buffer.task
+        return buffer, await _read(buffer), await _read(buffer, after_seq=0)
+    return asyncio.run(run())
+
+
+def test_completed_generation_ends_with_done():
+    buffer, events, resumed = _run_generation(["Bonjour", " !"])
+
+    assert buffer.error is None
+    assert events[-1] == f"id: {buffer.turn_id}:2\ndata: [DONE]\n\n"
+    assert [event.split("data: ")[1] for event in events[:-1]] == ["Bonjour\n\n", " !\n\n"]
+    assert resumed[-1].endswith("data: [DONE]\n\n")
+
+
+def test_failed_generation_ends_with_error_event():
+    buffer, events, resumed = _run_generation(["Bonjour"], RuntimeError("LLM connection lost"))
+
+    assert buffer.error == "LLM connection lost"
+    assert events[0] == f"id: {buffer.turn_id}:0\ndata: Bonjour\n\n"
+    assert events[-1] == f"id: {buffer.turn_id}:1\nevent: error\ndata: [GENERATION_ERROR]\n\n"
+    assert not any("[DONE]" in event for event in events)
+    # A client resuming after the failure is told too
+    assert resumed == [f"id: {buffer.turn_id}:1\nevent: error\ndata: [GENERATION_ERROR]\n\n"]
+
+
+if __name__ == "__main__":
+    test_completed_generation_ends_with_done()
+    test_failed_generation_ends_with_error_event()
+    print("✅ Stream buffer tests passed")
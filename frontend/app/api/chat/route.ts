@@ -10,15 +10,29 @@ export async function POST(req: NextRequest) {
     
     // For streaming responses, we need to forward the stream directly
     if (stream) {
+      // Forward Last-Event-ID so a reconnecting client resumes the buffered generation
+      const headers: Record<string, string> = { "Content-Type": "application/json" };
+      const lastEventId = req.headers.get("last-event-id");
+      if (lastEventId) {
+        headers["Last-Event-ID"] = lastEventId;
+      }
+
       const backendRes = await fetch(`https://airtel-chatbot-backend-4v9u.onrender.com/${endpoint}`, {
       // const backendRes = await fetch(`http://localhost:8000/${endpoint}`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers,
         body: JSON.stringify({
           session_id: body.session_id,
           message: body.message
         }),
       });
+
+      if (!backendRes.ok) {
+        return NextResponse.json(
+          { error: `Backend returned ${backendRes.status}` },
+          { status: backendRes.status }
+        );
+      }
       
       // Create a TransformStream to forward the SSE events
       const { readable, writable } = new TransformStream();
@@ -32,6 +46,7 @@ export async function POST(req: NextRequest) {
           "Content-Type": "text/event-stream",
           "Cache-Control": "no-cache",
           "Connection": "keep-alive",
+          "X-Turn-Id": backendRes.headers.get("x-turn-id") ?? "",
         },
       });
     } else {